@@ -0,0 +1,179 @@
+"""
+This module exposes the bulk loading of catalog dumps into the database, used to provision a mall.
+
+Functions:
+    read_catalog: Reads the rows of each table from a JSON or CSV catalog dump.
+    load_catalog: Validates and inserts catalog rows in batches, in a single transaction.
+    main: Command line entry point loading catalog dumps into a database.
+"""
+import argparse
+import csv
+import json
+from contextlib import contextmanager
+from functools import partial
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from backend.db.database_connection import DatabaseConnection
+from backend.db.init_db import init_db_if_needed
+from backend.db.sqlite_connection import get_db, DEFAULT_DB_PATH
+from backend.db.db_models import StoreEntry, CouponEntry, StoreNavigationRow, ProductRow, AdRow
+from db.queries import INSERT_STORE, INSERT_STORE_NAVIGATION, INSERT_COUPON, INSERT_PRODUCT, \
+    INSERT_AD, GET_TABLE_INDEXES_AND_TRIGGERS, CHECK_FTS_EXISTS, CLEAR_PRODUCTS_FTS, \
+    POPULATE_PRODUCTS_FTS
+
+# Loadable tables, in foreign key order, alongside the model validating their rows and the
+# statement inserting them. The statement parameters follow the model fields order.
+CATALOG_TABLES: Dict[str, Tuple[Type[BaseModel], str]] = {
+    "stores": (StoreEntry, INSERT_STORE),
+    "store_navigation": (StoreNavigationRow, INSERT_STORE_NAVIGATION),
+    "coupons": (CouponEntry, INSERT_COUPON),
+    "products": (ProductRow, INSERT_PRODUCT),
+    "ads": (AdRow, INSERT_AD),
+}
+
+
+def read_catalog(path: Path) -> Dict[str, Iterable[Dict[str, Any]]]:
+    """
+    Reads a catalog dump. A JSON dump holds an object mapping table names to lists of rows, while
+    a CSV dump holds the rows of the single table it is named after, e.g. products.csv.
+    CSV rows are streamed from the file rather than read at once.
+
+    :param path: The path of the dump.
+    :return: The rows of each table in the dump.
+    :raises ValueError: If the dump format is not supported.
+    """
+    if path.suffix.lower() == ".json":
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    if path.suffix.lower() == ".csv":
+        return {path.stem: _read_csv(path)}
+    raise ValueError(f"Unsupported catalog dump format: {path}")
+
+
+def _read_csv(path: Path) -> Iterator[Dict[str, Any]]:
+    """
+    :param path: The path of the CSV file, its first line holds the column names.
+    :return: An iterator over the rows, empty values are read as missing.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            yield {k: v for k, v in row.items() if v not in (None, "")}
+
+
+def load_catalog(conn: DatabaseConnection, catalog: Dict[str, Iterable[Dict[str, Any]]],
+                 batch_size: int = 5000) -> Dict[str, int]:
+    """
+    Validates and inserts the given catalog rows in a single transaction, rolled back if any row
+    is invalid or rejected by the database. Rows are inserted through executemany in batches, so
+    large dumps are never held in memory twice. The indexes and triggers of each loaded table are
+    dropped during its load and recreated once it is done, and the products full text index is
+    rebuilt in bulk rather than row by row. Must not be called while a transaction is open
+    on the connection. When loading in process, the versions of the loaded tables should be bumped
+    by the caller, e.g. through 'pool.writer(tables)', while running servers detect the loads of
+    other processes through 'SQLitePool.poll_external_writes'.
+
+    :param conn: The writer database connection.
+    :param catalog: The rows of each table, as returned by read_catalog.
+    :param batch_size: The number of rows inserted at once.
+    :return: The number of rows inserted in each table.
+    :raises ValueError: If a table is unknown or a row is invalid.
+    """
+    unknown = set(catalog) - set(CATALOG_TABLES)
+    if unknown:
+        raise ValueError(f"Unknown catalog tables: {sorted(unknown)}, "
+                         f"expected some of {list(CATALOG_TABLES)}")
+    counts = {}
+    cursor = conn.cursor()
+    conn.begin()
+    try:
+        for table, (model, insert) in CATALOG_TABLES.items():
+            if table not in catalog:
+                continue
+            rows = _validated_rows(table, model, catalog[table])
+            counts[table] = 0
+            with _deferred_indexes(conn, table):
+                for batch in iter(partial(_take, rows, batch_size), []):
+                    cursor.executemany(insert, batch)
+                    counts[table] += len(batch)
+        if "products" in counts and cursor.execute(CHECK_FTS_EXISTS).fetchone() is not None:
+            cursor.execute(CLEAR_PRODUCTS_FTS)
+            cursor.execute(POPULATE_PRODUCTS_FTS)
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+    return counts
+
+
+@contextmanager
+def _deferred_indexes(conn: DatabaseConnection, table: str):
+    """
+    Drops the indexes and triggers of the given table, and recreates them on exit.
+    Meant to be used inside a transaction, so they are restored as well on rollback.
+
+    :param conn: The database connection.
+    :param table: The name of the table.
+    """
+    cursor = conn.cursor()
+    definitions = cursor.execute(GET_TABLE_INDEXES_AND_TRIGGERS, (table,)).fetchall()
+    for d in definitions:
+        cursor.execute(f'DROP {d["type"].upper()} "{d["name"]}";')
+    yield
+    # Indexes first, so the recreated triggers do not fire on their creation.
+    for d in sorted(definitions, key=lambda d: d["type"] != "index"):
+        cursor.execute(d["sql"])
+
+
+def _validated_rows(table: str, model: Type[BaseModel],
+                    rows: Iterable[Dict[str, Any]]) -> Iterator[Tuple[Any, ...]]:
+    """
+    :param table: The name of the table, for error messages.
+    :param model: The model validating the rows.
+    :param rows: The rows to validate.
+    :return: An iterator over the validated rows, as parameter tuples of the insert statement.
+    :raises ValueError: On the first invalid row.
+    """
+    for i, row in enumerate(rows):
+        try:
+            yield tuple(model.model_validate(row).model_dump().values())
+        except ValidationError as e:
+            raise ValueError(f"Invalid {table} row #{i} {row}: {e}") from e
+
+
+def _take(rows: Iterator[Tuple[Any, ...]], count: int) -> List[Tuple[Any, ...]]:
+    """
+    :param rows: An iterator over rows.
+    :param count: The maximal number of rows to take.
+    :return: The next rows of the iterator, an empty list once exhausted.
+    """
+    return list(islice(rows, count))
+
+
+def main():
+    """
+    Loads the given catalog dumps into the database, creating it without the demo seed if needed.
+    """
+    parser = argparse.ArgumentParser(description="Loads catalog dumps into the database.")
+    parser.add_argument("dumps", nargs="+", type=Path,
+                        help="JSON dumps mapping tables to rows, or CSV dumps named after a table.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Path of the database.")
+    parser.add_argument("--batch-size", type=int, default=5000,
+                        help="Number of rows inserted at once.")
+    args = parser.parse_args()
+
+    init_db_if_needed(partial(get_db, args.db), args.db, seed=False)
+    conn = get_db(args.db)
+    try:
+        for dump in args.dumps:
+            counts = load_catalog(conn, read_catalog(dump), args.batch_size)
+            print(f"Loaded {dump}: {counts}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
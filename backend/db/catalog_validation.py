@@ -0,0 +1,57 @@
+"""
+This module exposes the validation of the catalog served by the tools.
+The tools return the database rows as is, so the rows are validated once against the db_models
+when the catalog is loaded, instead of on every tool call.
+
+Functions:
+    validate_rows: Validates rows against a db model.
+    validate_catalog: Validates all the catalog tables read by the tools.
+"""
+from typing import Any, Dict, Iterable, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from backend.db.database_connection import DatabaseConnection
+from backend.db.db_models import StoreEntry, ProductEntry, CouponEntry, NavigationEntry
+from db.queries import GET_STORES, GET_ALL_PRODUCTS, GET_ALL_COUPONS, GET_ALL_NAVIGATION_ASSETS
+
+# Queries covering every row the tools may return, alongside the model the rows must match.
+CATALOG_MODELS: Tuple[Tuple[str, Type[BaseModel]], ...] = (
+    (GET_STORES, StoreEntry),
+    (GET_ALL_PRODUCTS, ProductEntry),
+    (GET_ALL_COUPONS, CouponEntry),
+    (GET_ALL_NAVIGATION_ASSETS, NavigationEntry),
+)
+
+
+def validate_rows(model: Type[BaseModel], rows: Iterable[Dict[str, Any]]) -> int:
+    """
+    Validates the given rows against the given model. Validation is strict, so the rows already
+    hold the exact types the model would have dumped, and can be serialized as is.
+
+    :param model: The db model the rows must match.
+    :param rows: The rows to validate.
+    :return: The number of validated rows.
+    :raises ValueError: If a row does not match the model.
+    """
+    count = 0
+    for row in rows:
+        try:
+            model.model_validate(row, strict=True)
+        except ValidationError as e:
+            raise ValueError(f"Invalid {model.__name__} row {row}: {e}") from e
+        count += 1
+    return count
+
+
+def validate_catalog(conn: DatabaseConnection) -> int:
+    """
+    Validates all the catalog tables read by the tools.
+
+    :param conn: The database connection.
+    :return: The number of validated rows.
+    :raises ValueError: If a row does not match its model.
+    """
+    cursor = conn.cursor()
+    return sum(validate_rows(model, cursor.execute(query).iter_dicts())
+               for query, model in CATALOG_MODELS)
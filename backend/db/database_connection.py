@@ -7,7 +7,7 @@ Classes:
 """
 
 from abc import ABC, abstractmethod
-from typing import Protocol, Any, Dict, List, Optional, Iterable, Sequence
+from typing import Protocol, Any, Dict, List, Optional, Iterable, Iterator, Sequence
 
 
 class IDictCursor(Protocol):
@@ -49,6 +49,12 @@ class IDictCursor(Protocol):
         """
         ...
 
+    def iter_dicts(self, batch_size: int = ...) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the remaining rows of a query result, fetching them in batches.
+        """
+        ...
+
     def close(self) -> None:
         """
         Close the cursor.
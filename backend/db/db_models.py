@@ -1,8 +1,8 @@
 """
 This module exposes the database entries as pydantic models.
 """
-from pydantic import BaseModel, ConfigDict
-from typing import List
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional
 
 
 class StoreEntry(BaseModel):
@@ -69,6 +69,8 @@ class AllStoreAdEntry(BaseModel):
     category: str
     is_active: bool
     created_at: str
+    weight: float = 1.0
+    max_impressions_per_hour: Optional[int] = None
 
 
 class DefaultAdEntry(BaseModel):
@@ -90,3 +92,37 @@ class AdByStoreEntry(BaseModel):
     ad_type: str
     asset_url: str
     category: str
+
+
+class StoreNavigationRow(BaseModel):
+    """
+    Store navigation row, as loaded into the store_navigation table.
+    """
+    store_id: int
+    map_target_id: str
+    route_path_d: str
+
+
+class ProductRow(BaseModel):
+    """
+    Product row, as loaded into the products table. The id is assigned if missing.
+    """
+    product_id: Optional[int] = None
+    product_name: str
+    category: str
+    store_id: int
+
+
+class AdRow(BaseModel):
+    """
+    Ad row, as loaded into the ads table. The id is assigned if missing.
+    """
+    ad_id: Optional[int] = None
+    store_id: int
+    ad_type: str
+    asset_url: str
+    logo_url: str
+    category: str
+    is_active: bool = True
+    weight: float = Field(1.0, ge=0)
+    max_impressions_per_hour: Optional[int] = Field(None, ge=0)
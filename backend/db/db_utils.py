@@ -2,37 +2,89 @@
 This model exposes utility functions for database interactions.
 
 Functions:
-    execute_sql_script: Executes a multi-statement SQL script on 
-    any PEP 249 DatabaseConnection, committing the transaction if commit is 
+    execute_sql_script: Executes a multi-statement SQL script on
+    any PEP 249 DatabaseConnection, committing the transaction if commit is
     True.
+    execute_sql_scripts: Executes multiple SQL scripts in a single transaction, deferring the
+    index creation until the data is loaded.
+    split_sql_script: Splits a SQL script into its statements.
 """
+import re
+import sqlite3
 from backend.db.database_connection import DatabaseConnection
-from typing import List
+from typing import List, Sequence
+
+_PRAGMA = re.compile(r"^\s*PRAGMA\b", re.IGNORECASE)
+_CREATE_INDEX = re.compile(r"^\s*CREATE\s+(UNIQUE\s+)?INDEX\b", re.IGNORECASE)
+_LEADING_COMMENTS = re.compile(r"^(\s*(--[^\n]*\n|/\*.*?\*/))*\s*", re.DOTALL)
 
 
 def execute_sql_script(connection: DatabaseConnection, script: str, commit: bool = True) -> None:
     """
-    Executes a multi-statement SQL script on any PEP 249 DatabaseConnection, 
+    Executes a multi-statement SQL script on any PEP 249 DatabaseConnection,
     committing the transaction if commit is True.
-    
+
     :param connection: The database connection.
     :param script: The SQL script to execute.
     :param commit: Whether to commit the transaction.
     """
-    statements = split_sql_script(script)
+    execute_sql_scripts(connection, [script], commit)
+
+
+def execute_sql_scripts(connection: DatabaseConnection, scripts: Sequence[str],
+                        commit: bool = True) -> None:
+    """
+    Executes the given SQL scripts, in order, in a single explicit transaction, rolled back if
+    any statement fails. PRAGMA statements are run before the transaction starts, as most have
+    no effect inside one, and CREATE INDEX statements are run last, so the indexes are built
+    once over the loaded data instead of being updated on every insert.
+    Must not be called while a transaction is open on the connection.
+
+    :param connection: The database connection.
+    :param scripts: The SQL scripts to execute.
+    :param commit: Whether to commit the transaction, otherwise it is left open for the caller.
+    """
+    pragmas, statements, indexes = [], [], []
+    for script in scripts:
+        for statement in split_sql_script(script):
+            body = _LEADING_COMMENTS.sub("", statement, count=1)
+            if _PRAGMA.match(body):
+                pragmas.append(statement)
+            elif _CREATE_INDEX.match(body):
+                indexes.append(statement)
+            else:
+                statements.append(statement)
     cursor = connection.cursor()
-    for statement in statements:
-        clean_statement = statement.strip()
-        if clean_statement:
-            cursor.execute(clean_statement)
+    for statement in pragmas:
+        cursor.execute(statement)
+    connection.begin()
+    try:
+        for statement in statements + indexes:
+            cursor.execute(statement)
+    except BaseException:
+        connection.rollback()
+        raise
     if commit:
         connection.commit()
 
 
 def split_sql_script(script: str) -> List[str]:
     """
-    Splits the given SQL script into a list of queries.
+    Splits the given SQL script into a list of queries. Statements are only split on semicolons
+    that complete them, so semicolons inside string literals, comments or trigger bodies are kept.
+
     :param script: The script to be split
     :return: list of containing queries defined in the given script.
     """
-    return [query.strip() + ';' for query in script.split(';') if query.strip()]
+    statements = []
+    current = ""
+    for part in script.split(";"):
+        current += part + ";"
+        if sqlite3.complete_statement(current):
+            if _LEADING_COMMENTS.sub("", current, count=1).strip(" \t\r\n;"):
+                statements.append(current.strip())
+            current = ""
+    # A trailing statement without a semicolon is still executed.
+    if _LEADING_COMMENTS.sub("", current[:-1], count=1).strip():
+        statements.append(current[:-1].strip() + ";")
+    return statements
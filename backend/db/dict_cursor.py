@@ -1,19 +1,39 @@
-from typing import Any, Dict, List, Optional, Iterable, Sequence
+"""
+This module exposes a cursor wrapper returning rows as dictionaries.
+
+Classes:
+    DictCursor: A wrapper for PEP 249 cursors returning dictionaries.
+"""
+import sqlite3
+from typing import Any, Dict, Iterator, List, Optional, Iterable, Sequence, Tuple
 from backend.db.database_connection import IDictCursor
 
+# Supported row modes: plain dictionaries, the raw tuples of the driver, or sqlite3.Row objects,
+# which support access by column name without building a dictionary per row.
+ROW_MODES = ("dict", "tuple", "row")
+
 
 class DictCursor(IDictCursor):
     """
     A wrapper for PEP 249 cursors that ensures all fetch  operations return 
     dictionaries instead of tuples.
+    The column names are computed once per execute. Other row modes may be picked for hot paths
+    that do not need actual dictionaries.
     """
-    def __init__(self, real_cursor: Any):
+    def __init__(self, real_cursor: Any, row_mode: str = "dict"):
         """
         Initializes the wrapper with the given cursor.
 
         :param real_cursor: The cursor to wrap.
+        :param row_mode: One of ROW_MODES, the "row" mode is only supported by sqlite3 cursors.
         """
+        if row_mode not in ROW_MODES:
+            raise ValueError(f"Unknown row mode {row_mode}, expected one of {ROW_MODES}.")
         self._cursor = real_cursor
+        self._row_mode = row_mode
+        self._columns: Optional[Tuple[str, ...]] = None
+        if row_mode == "row":
+            self._cursor.row_factory = sqlite3.Row
 
     @property
     def description(self) -> Optional[Sequence[Any]]:
@@ -38,6 +58,7 @@ class DictCursor(IDictCursor):
         :return: The cursor.
         """
         self._cursor.execute(sql, params)
+        self._update_columns()
         return self
 
     def executemany(self, sql: str, seq_of_params: Iterable[Any]) -> 'DictCursor':
@@ -49,19 +70,40 @@ class DictCursor(IDictCursor):
         @return: The cursor.
         """
         self._cursor.executemany(sql, seq_of_params)
+        self._update_columns()
         return self
 
+    def _update_columns(self) -> None:
+        """
+        Caches the column names of the last executed statement.
+        """
+        description = self._cursor.description
+        self._columns = None if description is None else tuple(col[0] for col in description)
+
     def _row_to_dict(self, row: Optional[Sequence[Any]]) -> Optional[Dict[str, Any]]:
         """
-        Helper to convert a single tuple row into a dictionary.
+        Helper to convert a single tuple row into a dictionary, or to pass it through in the
+        other row modes.
 
         :param row: The row to convert.
         @return: The dictionary.
         """
-        if row is None:
-            return None
-        column_names = [col[0] for col in self._cursor.description]
-        return dict(zip(column_names, row))
+        if row is None or self._row_mode != "dict":
+            return row
+        return dict(zip(self._columns, row))
+
+    def _rows_to_dicts(self, rows: List[Sequence[Any]]) -> List[Dict[str, Any]]:
+        """
+        Helper to convert a list of tuple rows into dictionaries, or to pass it through in the
+        other row modes.
+
+        :param rows: The rows to convert.
+        @return: The dictionaries.
+        """
+        if self._row_mode != "dict":
+            return rows
+        columns = self._columns
+        return [dict(zip(columns, row)) for row in rows]
 
     def fetchone(self) -> Optional[Dict[str, Any]]:
         """
@@ -82,7 +124,7 @@ class DictCursor(IDictCursor):
         is available.
         """
         rows = self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany()
-        return [self._row_to_dict(row) for row in rows]
+        return self._rows_to_dicts(rows)
 
     def fetchall(self) -> List[Dict[str, Any]]:
         """
@@ -92,7 +134,21 @@ class DictCursor(IDictCursor):
         available.
         """
         rows = self._cursor.fetchall()
-        return [self._row_to_dict(row) for row in rows] 
+        return self._rows_to_dicts(rows)
+
+    def iter_dicts(self, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Streams the remaining rows of a query result, fetching them in batches, so large reads
+        never hold the whole result twice.
+
+        :param batch_size: The number of rows fetched from the driver at once.
+        @return: An iterator over the rows of the query result.
+        """
+        while True:
+            rows = self._cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield from self._rows_to_dicts(rows)
 
     def close(self) -> None:
         """
@@ -104,8 +160,12 @@ class DictCursor(IDictCursor):
         """
         Allows: for row in cursor: ...
         """
+        if self._row_mode != "dict":
+            yield from self._cursor
+            return
+        columns = self._columns
         for row in self._cursor:
-            yield self._row_to_dict(row) 
+            yield dict(zip(columns, row))
 
     def __getattr__(self, name: str) -> Any:
         """
@@ -5,42 +5,92 @@ Functions:
     init_db_if_needed: Initialize the database if it doesn't exist at the path specified in its
     db_path_str parameter, defaulting to ./pharmacy.db if the variable is not set. 
     Applies the schema as defined in the schema.sql file, and populates the DB 
-    using the seed.sql file.
+    using the seed.sql file. Creates the full text search index, the ad scheduling columns and
+    the store aliases if missing.
 """
 
 import os
 from pathlib import Path
 from typing import Callable
-from backend.db.db_utils import execute_sql_script
+from backend.db.db_utils import execute_sql_script, execute_sql_scripts, split_sql_script
 from backend.db.database_connection import DatabaseConnection
-from db.queries import CHECK_DB_EXISTS
+from backend.db.sqlite_connection import DEFAULT_DB_PATH
+from db.queries import CHECK_DB_EXISTS, CHECK_FTS_EXISTS, POPULATE_PRODUCTS_FTS, GET_ADS_COLUMNS
+
+# Scheduling columns added to the ads table after its creation, alongside their definition.
+AD_SCHEDULING_COLUMNS = (
+    ("weight", "REAL NOT NULL DEFAULT 1.0 CHECK (weight >= 0)"),
+    ("max_impressions_per_hour", "INTEGER"),
+)
 
 
 def init_db_if_needed(connection_factory: Callable[[], DatabaseConnection],
-                      db_path_str="pharmacy.db") -> None:
+                      db_path_str=DEFAULT_DB_PATH, seed: bool = True) -> None:
     """
     Initialize the database if it doesn't exist at the path specified in its
     db_path_str parameter, defaulting to ./pharmacy.db if the variable is not set. 
     Applies the schema as defined in the schema.sql file, and populates the DB 
-    using the seed.sql file.
+    using the seed.sql file. Creates the full text search index, the ad scheduling columns and
+    the store aliases if missing, including on databases created before they were introduced.
 
     :param connection_factory: Function that creates the database connection.
     :param db_path_str: String representing the path to initialize the database at.
+    :param seed: Whether to populate a newly created database with the demo seed.
     """
     db_path = Path(db_path_str)
     db_path.parent.mkdir(parents=True, exist_ok=True)
     conn = connection_factory()
-    if _check_db_exists(conn):
-        return
-
-    schema_sql = Path("./db/schema.sql").read_text(encoding="utf-8")
-    seed_sql = Path("./db/db_seed.sql").read_text(encoding="utf-8")
+    if not _check_db_exists(conn):
+        schema_sql = Path("./db/schema.sql").read_text(encoding="utf-8")
+        seed_sql = Path("./db/db_seed.sql").read_text(encoding="utf-8") if seed else ""
 
-    execute_sql_script(conn, schema_sql)
-    execute_sql_script(conn, seed_sql)
+        # Loaded together, so the seed is inserted before the schema indexes are built.
+        execute_sql_scripts(conn, [schema_sql, seed_sql])
+    _ensure_search_index(conn)
+    _ensure_ad_scheduling_columns(conn)
+    _ensure_store_aliases(conn)
     conn.commit()
 
 
+def _ensure_store_aliases(conn: DatabaseConnection) -> None:
+    """
+    Creates the store aliases table and adds the missing seed aliases, as defined in the
+    store_aliases.sql file. Runs in the transaction left open by '_ensure_search_index'.
+
+    :param conn: The database connection.
+    """
+    aliases_sql = Path("./db/store_aliases.sql").read_text(encoding="utf-8")
+    cursor = conn.cursor()
+    for statement in split_sql_script(aliases_sql):
+        cursor.execute(statement)
+
+
+def _ensure_ad_scheduling_columns(conn: DatabaseConnection) -> None:
+    """
+    Adds the ad scheduling columns to databases created before they were introduced.
+
+    :param conn: The database connection.
+    """
+    columns = {r["name"] for r in conn.cursor().execute(GET_ADS_COLUMNS).fetchall()}
+    for name, definition in AD_SCHEDULING_COLUMNS:
+        if name not in columns:
+            conn.cursor().execute(f"ALTER TABLE ads ADD COLUMN {name} {definition};")
+
+
+def _ensure_search_index(conn: DatabaseConnection) -> None:
+    """
+    Creates the products full text search table and the triggers keeping it in sync, as defined
+    in the fts.sql file, populating it from the products table when it is first created.
+
+    :param conn: The database connection.
+    """
+    exists = conn.cursor().execute(CHECK_FTS_EXISTS).fetchone() is not None
+    fts_sql = Path("./db/fts.sql").read_text(encoding="utf-8")
+    execute_sql_script(conn, fts_sql, commit=False)
+    if not exists:
+        conn.cursor().execute(POPULATE_PRODUCTS_FTS)
+
+
 def _check_db_exists(conn: DatabaseConnection) -> bool:
     """
     Check if the database exists by checking if the users table exists
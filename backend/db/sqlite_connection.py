@@ -5,12 +5,15 @@ This module exposes classes and functions for interacting with the
 Classes:
     SQLiteWrapper: A wrapper for a SQLite connection that implements
      the DatabaseConnection interface.
+    ConnectionProfile: Data class holding the tuning PRAGMAs applied to every connection.
 
 Functions:
-    get_db: Returns a connection to the SQLite database.
+    get_db: Returns a connection to the SQLite database, defaulting to ./pharmacy.db.
 """
 import sqlite3
 import os
+from dataclasses import dataclass
+from pathlib import Path
 from typing import Optional
 from backend.db.database_connection import DatabaseConnection
 from backend.db.dict_cursor import DictCursor
@@ -25,8 +28,8 @@ class SQLiteWrapper(DatabaseConnection):
     def __init__(self, db_path: str, **kwargs):
         self._conn = sqlite3.connect(db_path, **kwargs)
 
-    def cursor(self):
-        return DictCursor(self._conn.cursor())
+    def cursor(self, row_mode: str = "dict"):
+        return DictCursor(self._conn.cursor(), row_mode)
 
     def begin(self, modifiers: Optional[str] = "IMMEDIATE"):
         self._conn.execute(f"BEGIN {modifiers if modifiers is not None else ''};")
@@ -54,11 +57,71 @@ class SQLiteWrapper(DatabaseConnection):
             self._conn.commit()
 
 
-def get_db(db_path="pharmacy.db") -> DatabaseConnection:
+@dataclass(frozen=True)
+class ConnectionProfile:
+    """
+    Tuning applied to every connection. The defaults favor read latency on slow storage (e.g. SD
+    cards): the database is memory mapped and a large page cache is kept, so hot pages are not
+    read again from the disk.
+    """
+    # Durable across application crashes, only the last transactions may be lost on power loss
+    # in WAL mode, in exchange for not syncing on every commit.
+    synchronous: str = "NORMAL"
+    mmap_size: int = 256 * 1024 * 1024
+    cache_size_kib: int = 16 * 1024
+    temp_store: str = "MEMORY"
+    cached_statements: int = 256
+    busy_timeout_ms: int = 5000
+
+    def __post_init__(self):
+        # The values are interpolated into the PRAGMAs, so they are checked upfront.
+        if self.synchronous.upper() not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+            raise ValueError(f"Invalid synchronous mode: {self.synchronous}")
+        if self.temp_store.upper() not in ("DEFAULT", "FILE", "MEMORY"):
+            raise ValueError(f"Invalid temp_store mode: {self.temp_store}")
+
+
+# The profile used when none is given.
+DEFAULT_PROFILE = ConnectionProfile()
+
+# The database opened when no path is given. The server opens DB_PATH from cfg.json instead if set.
+DEFAULT_DB_PATH = "pharmacy.db"
+
+
+def get_db(db_path=DEFAULT_DB_PATH, readonly: bool = False,
+           profile: ConnectionProfile = DEFAULT_PROFILE) -> DatabaseConnection:
     """
     :param db_path: The path to the SQLite database.
+    :param readonly: Whether to open the database in read-only mode. The database must exist.
+    :param profile: The tuning to apply to the connection.
     :return: A connection to the SQLite database.
     """
-    conn = SQLiteWrapper(db_path, check_same_thread=False)
-    conn.cursor().execute("PRAGMA foreign_keys = ON;")
+    if readonly:
+        uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+        conn = SQLiteWrapper(uri, uri=True, check_same_thread=False,
+                             cached_statements=profile.cached_statements)
+        conn.cursor().execute("PRAGMA query_only = ON;")
+    else:
+        conn = SQLiteWrapper(db_path, check_same_thread=False,
+                             cached_statements=profile.cached_statements)
+        conn.cursor().execute("PRAGMA foreign_keys = ON;")
+        # WAL lets the read-only connections of the pool run alongside the writer.
+        conn.cursor().execute("PRAGMA journal_mode = WAL;")
+        conn.cursor().execute(f"PRAGMA synchronous = {profile.synchronous};")
+    _apply_profile(conn, profile)
     return conn
+
+
+def _apply_profile(conn: DatabaseConnection, profile: ConnectionProfile) -> None:
+    """
+    Applies the connection level PRAGMAs of the given profile.
+
+    :param conn: The connection to tune.
+    :param profile: The tuning to apply.
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"PRAGMA mmap_size = {int(profile.mmap_size)};")
+    # A negative cache size is in KiB rather than in pages.
+    cursor.execute(f"PRAGMA cache_size = {-int(profile.cache_size_kib)};")
+    cursor.execute(f"PRAGMA temp_store = {profile.temp_store};")
+    cursor.execute(f"PRAGMA busy_timeout = {int(profile.busy_timeout_ms)};")
@@ -0,0 +1,256 @@
+"""
+This module exposes a bounded connection pool for SQLite databases.
+
+Classes:
+    PoolStats: Data class holding a snapshot of the pool metrics.
+    SQLitePool: A connection pool holding N read-only connections and a single writer connection.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+from backend.db.connection_pool import ConnectionPool
+from backend.db.database_connection import DatabaseConnection
+from backend.db.table_versions import TableVersions
+
+
+@dataclass
+class PoolStats:
+    """
+    Data class holding a snapshot of the pool metrics.
+    """
+    size: int
+    open: int
+    in_use: int
+    idle: int
+    acquired: int
+    waited: int
+    timeouts: int
+    discarded: int
+
+
+class SQLitePool(ConnectionPool):
+    """
+    A bounded connection pool for SQLite, meant to be used in WAL mode.
+    Borrowed connections are read-only and may be used concurrently by different threads, while
+    all writes go through a single writer connection guarded by a lock, as SQLite only allows one
+    writer at a time anyway.
+    It is advised to use 'with pool.connection() as conn:' for reads and
+    'with pool.writer() as conn:' for writes.
+    """
+
+    def __init__(self, writer_factory: Callable[[], DatabaseConnection],
+                 reader_factory: Callable[[], DatabaseConnection], size: int = 4,
+                 acquire_timeout_s: float = 5.0, health_check_interval_s: float = 30.0):
+        """
+        Initializes the pool with the given factories. Connections are created lazily, so the
+        database file may be created by the writer before any reader is opened.
+
+        :param writer_factory: A function that returns a read-write connection.
+        :param reader_factory: A function that returns a read-only connection.
+        :param size: The maximal number of read-only connections.
+        :param acquire_timeout_s: Default time to wait for a free connection before giving up.
+        :param health_check_interval_s: Connections idle for longer than this are checked before
+            being handed out, and replaced if broken.
+        """
+        if size < 1:
+            raise ValueError("The pool size must be at least 1.")
+        self._writer_factory = writer_factory
+        self._reader_factory = reader_factory
+        self._size = size
+        self._acquire_timeout = acquire_timeout_s
+        self._health_check_interval = health_check_interval_s
+        self._cond = threading.Condition()
+        # Idle connections alongside the time they were returned, used as a LIFO stack so the
+        # hottest connections are reused first.
+        self._idle: List[Tuple[DatabaseConnection, float]] = []
+        self._open = 0
+        self._in_use = 0
+        self._acquired = 0
+        self._waited = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._closed = False
+        self._writer: Optional[DatabaseConnection] = None
+        self._writer_lock = threading.Lock()
+        # The data_version of the writer at the last poll, see 'poll_external_writes'.
+        self._data_version: Optional[int] = None
+        self.table_versions = TableVersions()
+
+    def get_connection(self, timeout: Optional[float] = None) -> DatabaseConnection:
+        """
+        Borrow a read-only connection, opening a new one if the pool is not full.
+
+        :param timeout: Time to wait for a free connection, defaults to the pool timeout.
+        :return: A read-only connection to the database.
+        :raises TimeoutError: If no connection was freed in time.
+        """
+        timeout = self._acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("The connection pool is closed.")
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    break
+                if self._open < self._size:
+                    self._open += 1
+                    conn, returned_at = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise TimeoutError(f"No database connection was freed within {timeout}s.")
+                if not waited:
+                    self._waited += 1
+                    waited = True
+                self._cond.wait(remaining)
+            self._in_use += 1
+            self._acquired += 1
+
+        # Opening and checking connections is done outside the lock, so slow IO does not block
+        # other threads returning connections.
+        try:
+            if conn is None:
+                conn = self._reader_factory()
+            elif time.monotonic() - returned_at > self._health_check_interval and \
+                    not self._is_healthy(conn):
+                self._discard(conn)
+                conn = self._reader_factory()
+        except BaseException:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def return_connection(self, conn: DatabaseConnection) -> None:
+        """
+        Return the given read-only connection to the pool.
+
+        :param conn: The connection to return.
+        """
+        with self._cond:
+            self._in_use -= 1
+            if self._closed:
+                self._open -= 1
+                conn.close()
+                return
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def get_writer(self) -> DatabaseConnection:
+        """
+        Returns the writer connection, opening it if needed. Access is not serialized, prefer
+        'writer()' unless the caller is the only thread using the database (e.g. on startup).
+
+        :return: The read-write connection to the database.
+        """
+        if self._writer is None:
+            self._writer = self._writer_factory()
+            self._data_version = self._read_data_version(self._writer)
+        return self._writer
+
+    def poll_external_writes(self, tables: Tuple[str, ...]) -> bool:
+        """
+        Detects the writes committed by other processes, e.g. the catalog loader, which the
+        versions bumped by 'writer()' do not cover. SQLite changes the data_version seen by a
+        connection on every commit made by another one, and the writer is the only connection of
+        this process allowed to write, so its data_version only changes on external writes.
+
+        :param tables: The tables whose versions are bumped on external writes, as the tables
+            actually written are unknown.
+        :return: Whether an external write was committed since the previous poll.
+        """
+        with self._writer_lock:
+            if self._closed:
+                return False
+            conn = self.get_writer()
+            version = self._read_data_version(conn)
+            changed = version != self._data_version
+            self._data_version = version
+        if changed:
+            self.table_versions.bump(*tables)
+        return changed
+
+    @contextmanager
+    def writer(self, tables: Tuple[str, ...] = ()):
+        """
+        Exclusive access to the writer connection. Commits on success, rolls back otherwise.
+
+        :param tables: The tables modified through the connection, whose versions are bumped
+            once the transaction is committed.
+        """
+        with self._writer_lock:
+            conn = self.get_writer()
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+                self.table_versions.bump(*tables)
+
+    def stats(self) -> PoolStats:
+        """
+        :return: A snapshot of the pool metrics.
+        """
+        with self._cond:
+            return PoolStats(size=self._size, open=self._open, in_use=self._in_use,
+                             idle=len(self._idle), acquired=self._acquired, waited=self._waited,
+                             timeouts=self._timeouts, discarded=self._discarded)
+
+    def close(self) -> None:
+        """
+        Closes all idle connections and the writer. Borrowed connections are closed once returned.
+        """
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            conn.close()
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    @staticmethod
+    def _read_data_version(conn: DatabaseConnection) -> int:
+        """
+        :param conn: A connection to the database.
+        :return: The data_version of the database as seen by the connection.
+        """
+        return conn.cursor().execute("PRAGMA data_version;").fetchone()["data_version"]
+
+    def _discard(self, conn: DatabaseConnection) -> None:
+        """
+        Closes a broken connection, ignoring any error raised while doing so.
+
+        :param conn: The connection to discard.
+        """
+        with self._cond:
+            self._discarded += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _is_healthy(conn: DatabaseConnection) -> bool:
+        """
+        :param conn: The connection to check.
+        :return: True if the connection can still run queries, False otherwise.
+        """
+        try:
+            conn.cursor().execute("SELECT 1;").fetchone()
+            return True
+        except Exception:
+            return False
@@ -0,0 +1,74 @@
+"""
+This module exposes a registry of the SQL statements used by the application, compiled against the
+database on startup so a schema drift fails fast instead of on the first matching request.
+This is only a startup check: the connections prepare and cache the statements themselves on
+first use, as sqlite3 caches them by their exact text.
+
+Classes:
+    StatementRegistry: Collects SQL statements and compiles them against a database.
+"""
+import sqlite3
+from types import ModuleType
+from typing import Dict, List, Tuple
+
+from backend.db.database_connection import DatabaseConnection
+
+# Leading keywords of the statements collected from a module.
+_SQL_KEYWORDS = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE")
+
+
+class StatementRegistry:
+    """
+    Registry of named SQL statements. Compiling a statement prepares it with EXPLAIN, which
+    resolves every table and column it references without running it, so writes can be checked
+    from a read-only connection as well.
+    """
+
+    def __init__(self):
+        self.statements: Dict[str, str] = {}
+
+    def register(self, name: str, sql: str) -> None:
+        """
+        :param name: The name of the statement.
+        :param sql: The statement.
+        """
+        self.statements[name] = sql
+
+    def register_module(self, module: ModuleType) -> int:
+        """
+        Registers every upper case string constant of the given module holding a SQL statement,
+        e.g. db.queries.
+
+        :param module: The module to collect the statements from.
+        :return: The number of registered statements.
+        """
+        count = 0
+        for name, value in vars(module).items():
+            if name.isupper() and isinstance(value, str) and \
+                    value.lstrip().upper().startswith(_SQL_KEYWORDS):
+                self.register(name, value)
+                count += 1
+        return count
+
+    def compile(self, conn: DatabaseConnection) -> int:
+        """
+        Compiles all the registered statements against the given connection, to check them. The
+        EXPLAIN statements are not the ones executed later, so the statement cache of the
+        connection is not warmed up.
+
+        :param conn: The database connection.
+        :return: The number of compiled statements.
+        :raises RuntimeError: Listing every statement that failed to compile.
+        """
+        errors: List[Tuple[str, str]] = []
+        cursor = conn.cursor()
+        for name, sql in self.statements.items():
+            try:
+                cursor.execute(f"EXPLAIN {sql}", (None,) * sql.count("?")).fetchall()
+            except sqlite3.Error as e:
+                errors.append((name, str(e)))
+        if errors:
+            details = "\n".join(f"  {name}: {error}" for name, error in errors)
+            raise RuntimeError(f"{len(errors)} SQL statements do not match the database "
+                               f"schema:\n{details}")
+        return len(self.statements)
@@ -0,0 +1,48 @@
+"""
+This module exposes a registry of in-process table versions, used to invalidate data derived from
+the database.
+
+Classes:
+    TableVersions: Thread safe counters of the writes committed to each table.
+"""
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, Tuple
+
+
+class TableVersions:
+    """
+    Thread safe counters of the writes committed to each table. Writers bump the tables they
+    modified, and readers compare snapshots to detect that their derived data is stale.
+    Writes made by other processes are not seen by the writers, see
+    'SQLitePool.poll_external_writes' which bumps the tables they may have modified.
+    """
+
+    def __init__(self):
+        self._versions: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def bump(self, *tables: str) -> None:
+        """
+        Marks the given tables as modified.
+
+        :param tables: The names of the modified tables.
+        """
+        with self._lock:
+            for table in tables:
+                self._versions[table] += 1
+
+    def get(self, table: str) -> int:
+        """
+        :param table: The name of the table.
+        :return: The current version of the table.
+        """
+        return self._versions.get(table, 0)
+
+    def snapshot(self, tables: Iterable[str]) -> Tuple[int, ...]:
+        """
+        :param tables: The names of the tables.
+        :return: The current versions of the given tables, in the given order.
+        """
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in tables)
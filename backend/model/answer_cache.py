@@ -0,0 +1,107 @@
+"""
+This module exposes a cache of the answers to repeated questions, in front of a response provider.
+
+Classes:
+    CachingResponseProvider: Response provider replaying the cached answers of opening questions.
+"""
+from typing import Any, AsyncGenerator, List, Optional, Tuple
+
+from backend.language_utils import detect_supported_language
+from backend.model.chat_events_factory import ChatEvent, ChatEventType, done_event
+from backend.model.message import Message
+from backend.model.response_provider import ResponseProvider
+from backend.model.tool_cache import ToolResultCache
+from backend.tools.catalog_index import normalize_text
+
+# Tables the answers are derived from, any write to them invalidates the cached answers.
+ANSWER_TABLES = ("stores", "store_navigation", "products", "coupons")
+
+# Events recorded for replay: the tool events carry the side effects of the answer (e.g. the
+# signage navigation), and the text done events carry its text.
+_RECORDED_EVENTS = (ChatEventType.TOOL_CALL_GENERATED, ChatEventType.TOOL_OUTPUT_GENERATED,
+                    ChatEventType.TEXT_DONE)
+
+
+class CachingResponseProvider(ResponseProvider):
+    """
+    Answers the opening question of a conversation from the cache when it was already answered
+    for the same catalog. Only opening questions are cached, as later answers depend on the
+    conversation history. Answers are keyed on the normalized question, its language, the
+    instructions and the versions of the ANSWER_TABLES, so an answer is never served for another
+    catalog. The versions are bumped by the writes of the server and, once polled, by the writes
+    of other processes such as the catalog loader.
+    A hit replays the recorded tool events, followed by the answer text as a single delta, so
+    the chat stream renders it and re-applies its side effects as for a fresh answer. Answers
+    which failed or were interrupted are not cached.
+    """
+
+    def __init__(self, response_provider: ResponseProvider, cache: ToolResultCache):
+        """
+        :param response_provider: The provider answering the cache misses.
+        :param cache: The cache holding the answers, invalidated by the catalog table versions.
+        """
+        self.response_provider = response_provider
+        self.cache = cache
+
+    async def warm_up(self) -> None:
+        await self.response_provider.warm_up()
+
+    async def get_response(self, messages: List[Message],
+                           instructions: str) -> AsyncGenerator[ChatEvent, None]:
+        # Taken before answering, so a write racing with the answer invalidates it.
+        versions = self.cache.versions(ANSWER_TABLES)
+        key = self._cache_key(messages, instructions, versions)
+        if key is None:
+            async for event in self.response_provider.get_response(messages, instructions):
+                yield event
+            return
+        recorded = self.cache.get(key)
+        if recorded is not None:
+            for event in self._replay(recorded):
+                yield event
+            return
+
+        events: List[ChatEvent] = []
+        failed = False
+        async for event in self.response_provider.get_response(messages, instructions):
+            if event.type == ChatEventType.ERROR:
+                failed = True
+            elif event.type in _RECORDED_EVENTS:
+                events.append(event)
+            yield event
+        if not failed and any(e.type == ChatEventType.TEXT_DONE for e in events):
+            self.cache.put(key, tuple(events), ANSWER_TABLES, versions)
+
+    @staticmethod
+    def _cache_key(messages: List[Message], instructions: str,
+                   versions: Tuple[int, ...]) -> Optional[Tuple[Any, ...]]:
+        """
+        :param messages: The messages to answer.
+        :param instructions: Instructions for the model.
+        :param versions: The versions of the ANSWER_TABLES the answer is derived from.
+        :return: The cache key of the answer, or None if it must not be cached.
+        """
+        if len(messages) != 1 or messages[0].role != "user" or not messages[0].content:
+            return None
+        text = messages[0].content
+        normalized = " ".join(normalize_text(text).split())
+        return (normalized, detect_supported_language(text).name, instructions, versions)
+
+    @staticmethod
+    def _replay(recorded: Tuple[ChatEvent, ...]) -> List[ChatEvent]:
+        """
+        :param recorded: The recorded events of an answer.
+        :return: The events replaying the answer. The response ids are dropped, as the stored
+                 response belongs to another conversation.
+        """
+        events = []
+        for event in recorded:
+            data = dict(event.data)
+            if event.type == ChatEventType.TEXT_DONE:
+                data.pop("response_id", None)
+                events.append(ChatEvent(ChatEventType.TEXT_DELTA,
+                                        {"role": data.get("role", "assistant"),
+                                         "content": data.get("content") or ""}))
+            events.append(ChatEvent(event.type, data))
+        events.append(done_event())
+        return events
@@ -32,6 +32,7 @@ class ChatEventType(Enum):
     TOOLS_OUTPUT_STATE = "tool_output_state"
     TOOL_CALL_GENERATED = "tool_call_generated"
     TOOL_OUTPUT_GENERATED = "tool_output_generated"
+    RESPONSE_CREATED = "response_created"
     ERROR = "error"
 
 
@@ -1,8 +1,11 @@
+import asyncio
 import json
+import traceback
 from typing import List, Dict, AsyncGenerator, Optional, Callable, Tuple
 from backend.model.response_provider import ResponseProvider
 from backend.model.chat_events_factory import ChatEventType, ChatEvent, placeholder_event
 from backend.model.message import Message, MessageMetadata
+from backend.model.token_ledger import TokenLedger
 from backend.model.chat_events_factory import chat_event, chat_event_for_message
 from backend.model.response_placeholders import on_invalid_prompt_length, on_initial_prompt
 
@@ -17,7 +20,8 @@ class ChatManager(ResponseProvider):
                  summary_format_provider: Callable,
                  messages_limit: int = 10, keep_count: int = 5, token_limit: int = 10000,
                  token_keep_count: int = 5000, add_summary_to_instructions: bool = True,
-                 token_counter: Optional[Callable[[str], int]] = None, model_name="assistant"):
+                 token_counter: Optional[Callable[[str], int]] = None, model_name="assistant",
+                 soft_watermark: float = 0.8):
         """
         Initialize the object with the given parameters.
 
@@ -34,6 +38,8 @@ class ChatManager(ResponseProvider):
             including the latest message.
         :param add_summary_to_instructions: Whether to add the summary to the instructions.
         :param token_counter: Optional function to use for counting tokens. 
+        :param soft_watermark: Fraction of the messages and token limits at which summarization
+            starts in the background, so the summary is usually ready before the limit is hit.
         """
         self.main_provider = main_provider
         self.summary_provider = summary_provider
@@ -42,14 +48,18 @@ class ChatManager(ResponseProvider):
         self.token_limit = token_limit
         self.token_keep_count = token_keep_count
         self.token_counter = token_counter
+        self.token_ledger = TokenLedger(token_counter) if token_counter is not None else None
         self.previous_summary: Optional[str] = None
         self.tools_used: List[Dict[str, str]] = []
         self.summary_format_provider = summary_format_provider
         self.add_summary_to_instructions = add_summary_to_instructions
         self.model_name = model_name
+        self.soft_watermark = soft_watermark
         # Stores the index of the last kept message, such that any index before that 
         # had already been summarized.
         self.last_kept_index: int = 0
+        # Background summarization, resolving to the summary and the matching last_kept_index.
+        self._summary_task: Optional[asyncio.Task] = None
 
     async def get_response(self, messages: List[Message],
                            instructions: str) -> AsyncGenerator[ChatEvent, None]:
@@ -63,19 +73,15 @@ class ChatManager(ResponseProvider):
 
         message_text = messages[-1].content
         yield placeholder_event(on_initial_prompt(message_text))
-        async for ev in self.summary_provider.get_response([Message("user", "Hi there! how are "
-                                                                          "you?")], "Don't be "
-                                                                                       "kind, "
-                                                                                       "be mean "
-                                                                                       ):
-            yield ev
-        await self.manage_messages_by_length(messages)
+        self._apply_finished_summary()
+        self.manage_messages_by_length(messages)
         try:
-            await self._manage_token_amount(messages)
+            self._manage_token_amount(messages)
         except ValueError:
             yield chat_event(ChatEventType.TEXT_DONE, self.model_name,
                              on_invalid_prompt_length(messages[-1].content))
             return
+        self._enforce_hard_limits(messages)
         messages = messages[self.last_kept_index:]
         if self.previous_summary is not None:
             if self.add_summary_to_instructions:
@@ -97,54 +103,104 @@ class ChatManager(ResponseProvider):
             else:
                 yield event
 
-    async def manage_messages_by_length(self, messages: List[Message]):
+    async def warm_up(self) -> None:
         """
-        Manages the length of the messages array by using this objects limits.
+        Warms up both the main and the summary providers.
+        """
+        await asyncio.gather(self.main_provider.warm_up(), self.summary_provider.warm_up())
+
+    def manage_messages_by_length(self, messages: List[Message]):
+        """
+        Manages the length of the messages array by using this objects limits, starting a
+        background summarization once the soft watermark is passed.
 
         :param messages: The messages to manage the length for.
         """
-        if len(messages[self.last_kept_index:]) > self.messages_length_limit:
-            await self._summarize_from_index(messages, self.keep_count)
+        if len(messages[self.last_kept_index:]) > self.messages_length_limit * self.soft_watermark:
+            self._start_summary(messages, self.keep_count)
 
-    async def _manage_token_amount(self, messages: List[Message]):
+    def _manage_token_amount(self, messages: List[Message]):
         """
-        Manages the token amount in the given messages by using this objects limits.
+        Manages the token amount in the given messages by using this objects limits, starting a
+        background summarization once the soft watermark is passed.
 
         :param messages: The messages to manage the token amount for.
         """
-        if self.token_counter is None:
+        if self.token_ledger is None:
             return
-        latest_count = self.token_counter(messages[-1].content)
+        latest_count = self.token_ledger.count(messages[-1])
         if latest_count > self.token_limit:
             raise ValueError("Latest message token count exceeded the allowed limit.")
-        messages[-1].metadata = MessageMetadata(latest_count)
-        total_count = 0
-        ind_where_passed_keep_limit = None
-        for i in range(len(messages) - 1, self.last_kept_index - 1, -1):
-            msg = messages[i]
-            if msg.metadata is None:
-                raise RuntimeError(f"Message from role {msg.role} and content {msg.content} had no"
-                                   f"metadata object attached.")
-            total_count += msg.metadata.tokens
-            if total_count > self.token_keep_count and ind_where_passed_keep_limit is None:
-                ind_where_passed_keep_limit = i
-            if total_count > self.token_limit:
-                await self._summarize_from_index(messages, ind_where_passed_keep_limit)
-                break
-
-    async def _summarize_from_index(self, messages: List[Message], index: int):
-        """
-        Truncates the messages array from the given index and summarizes 
-        the truncated messages, setting this objects last_kept_index and 
-        previous_summary.
-
-        :param messages: The messages to truncate and summarize.
-        :param index: The index from which to truncate the messages.
-        """
-        to_summarize = messages[self.last_kept_index:-index]
-        self.last_kept_index = len(messages) - index
-        summary = await self._get_summary(to_summarize)
+        self.token_ledger.sync(messages)
+        if self.token_ledger.total(self.last_kept_index) > self.token_limit * self.soft_watermark:
+            keep_count = self.token_ledger.keep_count(self.last_kept_index, self.token_keep_count)
+            self._start_summary(messages, keep_count)
+
+    def _enforce_hard_limits(self, messages: List[Message]):
+        """
+        Drops the oldest messages past the messages and token limits, which only happens when
+        the background summarization did not catch up, e.g. as it keeps failing. The dropped
+        messages are left out of the summary, but the history never grows without bound.
+
+        :param messages: The messages to send.
+        """
+        kept_index = self.last_kept_index
+        if len(messages) - kept_index > self.messages_length_limit:
+            kept_index = len(messages) - self.keep_count
+        if self.token_ledger is not None and self.token_ledger.total(kept_index) > \
+                self.token_limit:
+            kept_index = len(messages) - self.token_ledger.keep_count(kept_index,
+                                                                      self.token_keep_count)
+        if kept_index > self.last_kept_index:
+            print(f"Summarization did not catch up, dropping {kept_index - self.last_kept_index} "
+                  f"messages from the history.")
+            self.last_kept_index = kept_index
+
+    def _start_summary(self, messages: List[Message], keep_count: int):
+        """
+        Starts summarizing in the background all the messages but the given amount of latest
+        ones, unless a summarization is already running. The result is only applied on a later
+        turn, until then the untruncated messages are used.
+
+        :param messages: The messages to summarize.
+        :param keep_count: The number of latest messages to keep.
+        """
+        if self._summary_task is not None:
+            return
+        new_kept_index = len(messages) - keep_count
+        if new_kept_index <= self.last_kept_index:
+            return
+        to_summarize = messages[self.last_kept_index:new_kept_index]
+        self._summary_task = asyncio.create_task(self._summarize(to_summarize, new_kept_index))
+
+    async def _summarize(self, messages: List[Message], new_kept_index: int) -> Tuple[str, int]:
+        """
+        Summarizes the given messages.
+
+        :param messages: The messages to summarize.
+        :param new_kept_index: The last_kept_index to set once the summary is applied.
+        :return: The summary and the last_kept_index it covers.
+        """
+        return await self._get_summary(messages), new_kept_index
+
+    def _apply_finished_summary(self):
+        """
+        Applies the result of the background summarization if it finished, setting this objects
+        previous_summary and last_kept_index.
+        """
+        task = self._summary_task
+        if task is None or not task.done():
+            return
+        self._summary_task = None
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            print("".join(traceback.format_exception(task.exception())))
+            return
+        summary, kept_index = task.result()
         self.previous_summary = summary
+        # The hard limits may have dropped messages past the summarized ones meanwhile.
+        self.last_kept_index = max(self.last_kept_index, kept_index)
 
     async def _get_summary(self, messages: List[Message]) -> str:
         """
@@ -1,10 +1,54 @@
+import asyncio
 import json
 from typing import List, Dict, Any
-from typing import Callable, AsyncGenerator
+from typing import Awaitable, Callable, AsyncGenerator
 from backend.model.chat_events_factory import *
 from backend.model.response_placeholders import on_initial_prompt, on_tool_invocation
 from backend.model.message import Message
 
+# Type alias for functions creating the API specific tool outputs of a single tool call.
+tool_output_fn = Callable[[str, str, str], Awaitable[List[Dict[str, Any]]]]
+
+
+async def run_tool_batch(tool_calls: List[ChatEvent], create_tool_output: tool_output_fn,
+                         user_text: str,
+                         tool_outputs: List[Dict[str, Any]]) -> AsyncGenerator[ChatEvent, None]:
+    """
+    Runs a batch of tool calls generated by the model in the same turn concurrently. The call
+    events are yielded upfront, and each output event is yielded as soon as its tool completes.
+    Once the whole batch is done, the outputs are appended to tool_outputs in the order the calls
+    were generated, so the model sees each call followed by its output.
+
+    :param tool_calls: The TOOL_CALL_GENERATED events of the batch.
+    :param create_tool_output: Receives the tool name, arguments and call_id, and returns the
+        tool call and output entries as expected by the API used.
+    :param user_text: The text of the latest user message, used for placeholders language.
+    :param tool_outputs: The list to extend with the outputs of the batch.
+    :return: An async generator of chat events.
+    """
+    for call in tool_calls:
+        yield call
+        yield placeholder_event(on_tool_invocation(call.data["name"], user_text))
+    tasks = {asyncio.ensure_future(create_tool_output(call.data["name"], call.data["args"],
+                                                      call.data["call_id"])): i
+             for i, call in enumerate(tool_calls)}
+    results: List[List[Dict[str, Any]]] = [[] for _ in tool_calls]
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index = tasks[task]
+                results[index] = task.result()
+                name = tool_calls[index].data["name"]
+                yield ChatEvent(ChatEventType.TOOL_OUTPUT_GENERATED,
+                                results[index][-1] | {"name": name})
+    finally:
+        for task in pending:
+            task.cancel()
+    for result in results:
+        tool_outputs.extend(result)
+
 
 class GenericToolClient:
     """
@@ -13,14 +57,14 @@ class GenericToolClient:
 
     :param iterate_on_stream: The stream generator to use. Expected to receive an async generator
     of events specific to the API used, and return an async generator of chat events.
-    :param create_tool_output: The tool output generator to use. Expected to receive a list of tool
-     calls (names, args and call_id) and return a list of tool calls and outputs as expected by the
-      API used.
+    :param create_tool_output: The tool output generator to use. Expected to receive a tool call
+     (name, args and call_id) and return an awaitable of the tool call and output as expected by
+      the API used. Calls generated in the same turn run concurrently.
     :param tool_call_limit: The maximum number of tool calls to allow.
     """
 
     def __init__(self, iterate_on_stream: Callable,
-                 create_tool_output: Callable[[str, str, str], List[Dict[str, Any]]],
+                 create_tool_output: tool_output_fn,
                  tool_call_limit: int = 100):
         self.iterate_on_stream = iterate_on_stream
         self.create_tool_output = create_tool_output
@@ -41,15 +85,9 @@ class GenericToolClient:
         while True:
             if len(tool_outputs) > self.tool_call_limit * 2:  # Each tool call generated 2 entries.
                 raise ValueError("The given query caused an excessive tool usage, aborting.")
-            for value in pending_tool_calls:
+            async for value in run_tool_batch(pending_tool_calls, self.create_tool_output,
+                                              messages[-1].content, tool_outputs):
                 yield value
-                name = value.data["name"]
-                args_json = value.data["args"]
-                item_id = value.data["call_id"]
-                yield placeholder_event(on_tool_invocation(name, messages[-1].content))
-                tool_outputs.extend(self.create_tool_output(name, args_json, item_id))
-                tool_output = tool_outputs[-1] | {"name": name}
-                yield ChatEvent(ChatEventType.TOOL_OUTPUT_GENERATED, tool_output)
             pending_tool_calls = []
             stream = await stream_generator(tool_outputs, messages)
             print("STEAM CREATED")
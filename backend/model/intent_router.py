@@ -0,0 +1,339 @@
+"""
+This module exposes a local router answering the simplest requests without the model.
+
+Classes:
+    IntentRouter: Response provider answering the requests matching a known intent locally.
+"""
+import asyncio
+import json
+import re
+import uuid
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from backend.db.connection_pool import ConnectionPool
+from backend.model.chat_events_factory import ChatEvent, ChatEventType, chat_event_from_agent, \
+    done_event, placeholder_event
+from backend.model.message import Message
+from backend.model.response_placeholders import on_routed_intent, on_tool_invocation
+from backend.model.response_provider import ResponseProvider
+from backend.model.tool_manager import AsyncToolManager
+from backend.tools.catalog_index import normalize_text
+from db.queries import GET_STORES, GET_STORE_ALIASES, GET_ALL_PRODUCTS, GET_NAVIGATION_ASSETS
+
+# Tables the matchers are compiled from, they are compiled again once any of them is written.
+ROUTER_TABLES = ("stores", "store_aliases", "products", "store_navigation")
+
+# Words that may open or close any request without changing its intent.
+_OPENING_FILLERS = ("please", "hi", "hello", "hey", "excuse me", "sorry",
+                    "בבקשה", "שלום", "היי", "סליחה")
+_CLOSING_FILLERS = ("please", "located", "here", "in the mall", "thanks", "thank you",
+                    "בבקשה", "נמצא", "נמצאת", "פה", "כאן", "בקניון", "תודה")
+
+# Phrases of the requests listing the stores, matched as the whole request.
+_LIST_STORES_PHRASES = (
+    "stores", "shops", "all stores", "which stores", "which shops", "what stores", "what shops",
+    "which stores are there", "what stores are there", "what shops are there", "list stores",
+    "list the stores", "list of stores", "show me the stores", "show stores",
+    "what stores are in the mall", "which stores are in the mall",
+    "חנויות", "כל החנויות", "אילו חנויות", "איזה חנויות", "אילו חנויות יש", "איזה חנויות יש",
+    "רשימת חנויות", "רשימת החנויות", "מה החנויות", "מה החנויות בקניון", "אילו חנויות יש בקניון",
+    "איזה חנויות יש בקניון")
+
+# Phrases preceding the store of the requests for a coupon.
+_COUPON_PHRASES = (
+    "coupon for", "coupon at", "a coupon for", "coupons for", "any coupon for",
+    "is there a coupon for", "do you have a coupon for", "discount at", "discount for",
+    "discount code for", "is there a discount at",
+    "קופון", "קופון של", "יש קופון", "יש קופון של", "יש הנחה", "הנחה", "קוד הנחה",
+    "קוד קופון", "יש קוד הנחה")
+# Phrases following the store of the requests for a coupon.
+_COUPON_TRAILING_PHRASES = ("coupon", "coupons", "discount", "discount code", "קופון")
+
+# Phrases preceding the store of the requests for a navigation.
+_NAVIGATE_PHRASES = (
+    "where is", "where s", "where is the", "where can i find", "how do i get to",
+    "how to get to", "how can i get to", "take me to", "navigate to", "directions to",
+    "the way to", "show me the way to", "route to",
+    "איפה", "איפה נמצא", "איפה נמצאת", "איפה זה", "איך מגיעים", "איך מגיעים אל", "איך להגיע",
+    "איך אני מגיע", "איך אני מגיעה", "נווט", "תנווט", "הדרך", "דרך", "מפה")
+
+# Phrases preceding the product or category of the requests for the stores selling it.
+_PRODUCT_PHRASES = (
+    "where can i buy", "where can i get", "where do i buy", "where to buy", "who sells",
+    "which store sells", "which stores sell", "what store sells", "where can i find",
+    "איפה קונים", "איפה אפשר לקנות", "איפה אני יכול לקנות", "איפה אני יכולה לקנות", "איפה יש",
+    "מי מוכר", "איזו חנות מוכרת", "איזה חנות מוכרת", "באיזו חנות יש", "איפה משיגים",
+    "איפה אפשר למצוא")
+
+# Hebrew single letter prefixes, that may be attached to the store name (e.g. "לארומה").
+_HEBREW_PREFIXES = "והבלמשכ"
+
+
+def _alternation(phrases: Tuple[str, ...]) -> str:
+    """
+    :param phrases: Phrases, normalized with the requests before they are matched.
+    :return: A regex alternation of the normalized phrases, the longest first.
+    """
+    normalized = {" ".join(normalize_text(p).split()) for p in phrases}
+    return "|".join(re.escape(p) for p in sorted(normalized, key=len, reverse=True))
+
+
+def _pattern(body: str) -> "re.Pattern":
+    """
+    :param body: The regex of the request, without its fillers.
+    :return: The compiled regex of the whole request, with optional opening and closing fillers.
+    """
+    return re.compile(rf"^(?:(?:{_alternation(_OPENING_FILLERS)}) )*{body}"
+                      rf"(?: (?:{_alternation(_CLOSING_FILLERS)}))*$")
+
+
+# Matchers of each intent, in priority order, capturing the entity of the request if any.
+_INTENT_PATTERNS: Tuple[Tuple[str, "re.Pattern"], ...] = (
+    ("list_stores", _pattern(rf"(?:{_alternation(_LIST_STORES_PHRASES)})")),
+    ("coupon", _pattern(rf"(?:{_alternation(_COUPON_PHRASES)}) (?P<entity>.+?)")),
+    ("coupon", _pattern(rf"(?P<entity>.+?) (?:{_alternation(_COUPON_TRAILING_PHRASES)})")),
+    ("navigate", _pattern(rf"(?:{_alternation(_NAVIGATE_PHRASES)}) (?P<entity>.+?)")),
+    ("product", _pattern(rf"(?:{_alternation(_PRODUCT_PHRASES)}) (?P<entity>.+?)")),
+)
+
+
+@dataclass(frozen=True)
+class _Catalog:
+    """
+    Data class holding the catalog entities the requests are resolved against, by normalized
+    name.
+    """
+    store_names: Dict[int, str]
+    stores: Dict[str, int]
+    # Ids of the stores which have a navigation asset.
+    navigable_stores: FrozenSet[int]
+    # Product names and categories, alongside the names of the stores selling them.
+    items: Dict[str, Tuple[str, Tuple[str, ...]]]
+
+
+class IntentRouter(ResponseProvider):
+    """
+    Answers the requests that map onto a single tool locally: listing the stores, the coupon of
+    a store, the navigation to a store and the stores selling a product or category. A request
+    is answered locally only when it matches an intent pattern as a whole and its entity is a
+    known store (by name or alias) or product name or category, every other request is passed
+    to the wrapped provider. Navigations are only answered for the stores with a navigation
+    asset.
+    Local answers run the same tool as the model would, and are streamed as the same tool and
+    text events, so the chat stream applies their side effects (e.g. the signage navigation).
+    The replies are templated in the language of the request, from the tool outputs. A request
+    whose tool output cannot be answered from is passed to the wrapped provider as well.
+    """
+
+    def __init__(self, response_provider: ResponseProvider, tool_manager: AsyncToolManager,
+                 db_pool: ConnectionPool):
+        """
+        :param response_provider: The provider answering the requests that are not routed.
+        :param tool_manager: The tool manager running the tools of the routed requests.
+        :param db_pool: The database pool the catalog is read from. Its table versions are used
+            to compile the matchers again once the catalog changes.
+        """
+        self.response_provider = response_provider
+        self.tool_manager = tool_manager
+        self.db_pool = db_pool
+        self._catalog: Optional[_Catalog] = None
+        self._versions: Optional[Tuple[int, ...]] = None
+        self._resolvers: Dict[str, Callable[[_Catalog, str], Optional[Any]]] = {
+            "coupon": self._resolve_store, "navigate": self._resolve_navigable_store,
+            "product": self._resolve_item}
+        self._answers = {"list_stores": self._list_stores, "coupon": self._coupon,
+                         "navigate": self._navigate, "product": self._product}
+
+    async def warm_up(self) -> None:
+        await self._get_catalog()
+        await self.response_provider.warm_up()
+
+    async def get_response(self, messages: List[Message],
+                           instructions: str) -> AsyncGenerator[ChatEvent, None]:
+        text = messages[-1].content if messages and messages[-1].role == "user" else ""
+        catalog = await self._get_catalog()
+        route = self._route(catalog, text) if text else None
+        # The events are only yielded once the answer is complete, so nothing was applied yet
+        # when the request is passed to the wrapped provider.
+        events = await self._answers[route[0]](catalog, text, route[1]) if route else None
+        if events is None:
+            async for event in self.response_provider.get_response(messages, instructions):
+                yield event
+            return
+        for event in events:
+            yield event
+        yield done_event()
+
+    def _route(self, catalog: _Catalog, text: str) -> Optional[Tuple[str, Any]]:
+        """
+        :param catalog: The catalog the entities are resolved against.
+        :param text: The text of the request.
+        :return: The intent of the request and its resolved entity, or None if the request must
+                 be answered by the model.
+        """
+        normalized = " ".join(normalize_text(text).split())
+        for intent, pattern in _INTENT_PATTERNS:
+            match = pattern.match(normalized)
+            if match is None:
+                continue
+            if intent not in self._resolvers:
+                return intent, None
+            entity = self._resolvers[intent](catalog, match.group("entity"))
+            if entity is not None:
+                return intent, entity
+        return None
+
+    @staticmethod
+    def _resolve_store(catalog: _Catalog, entity: str) -> Optional[int]:
+        """
+        :param catalog: The catalog the entity is resolved against.
+        :param entity: The normalized store name or alias, possibly with a hebrew prefix.
+        :return: The id of the store, or None if unknown.
+        """
+        if entity.startswith("the "):
+            entity = entity[len("the "):]
+        if entity in catalog.stores:
+            return catalog.stores[entity]
+        if entity[:1] in _HEBREW_PREFIXES:
+            return catalog.stores.get(entity[1:].lstrip())
+        return None
+
+    @staticmethod
+    def _resolve_navigable_store(catalog: _Catalog, entity: str) -> Optional[int]:
+        """
+        :param catalog: The catalog the entity is resolved against.
+        :param entity: The normalized store name or alias, possibly with a hebrew prefix.
+        :return: The id of the store, or None if unknown or without a navigation asset.
+        """
+        store_id = IntentRouter._resolve_store(catalog, entity)
+        return store_id if store_id in catalog.navigable_stores else None
+
+    @staticmethod
+    def _resolve_item(catalog: _Catalog, entity: str) -> Optional[Tuple[str, Tuple[str, ...]]]:
+        """
+        :param catalog: The catalog the entity is resolved against.
+        :param entity: The normalized product name or category.
+        :return: The product name or category as stored alongside the stores selling it, or None
+                 if unknown.
+        """
+        return catalog.items.get(entity)
+
+    async def _get_catalog(self) -> _Catalog:
+        """
+        :return: The catalog, read again from the database if any table it is derived from was
+                 written since it was last read. Writes by other processes are seen once the
+                 server polls for them, see '_poll_catalog_writes' in the lifespan.
+        """
+        versions = self.db_pool.table_versions.snapshot(ROUTER_TABLES)
+        if self._catalog is None or versions != self._versions:
+            loop = asyncio.get_running_loop()
+            catalog = await loop.run_in_executor(None, self._read_catalog)
+            self._catalog, self._versions = catalog, versions
+            # Returned rather than read back, as a concurrent call may replace it meanwhile.
+            return catalog
+        return self._catalog
+
+    def _read_catalog(self) -> _Catalog:
+        """
+        :return: The catalog, read from the database. Names and aliases shared by several
+                 stores are ambiguous, and left out.
+        """
+        with self.db_pool.connection() as conn:
+            cursor = conn.cursor()
+            store_rows = cursor.execute(GET_STORES).fetchall()
+            alias_rows = cursor.execute(GET_STORE_ALIASES).fetchall()
+            navigable = frozenset(r["store_id"] for r in
+                                  cursor.execute(GET_NAVIGATION_ASSETS).fetchall())
+            item_stores: Dict[str, Tuple[str, Dict[str, None]]] = {}
+            for row in cursor.execute(GET_ALL_PRODUCTS).iter_dicts():
+                for name in (row["product_name"], row["category"]):
+                    _, stores = item_stores.setdefault(" ".join(normalize_text(name).split()),
+                                                       (name, {}))
+                    stores[row["store_name"]] = None
+        store_ids: Dict[str, set] = {}
+        names = [(r["store_name"], r["store_id"]) for r in store_rows] + \
+                [(r["alias"], r["store_id"]) for r in alias_rows]
+        for name, store_id in names:
+            store_ids.setdefault(" ".join(normalize_text(name).split()), set()).add(store_id)
+        stores = {name: ids.pop() for name, ids in store_ids.items() if len(ids) == 1}
+        return _Catalog(store_names={r["store_id"]: r["store_name"] for r in store_rows},
+                        stores=stores, navigable_stores=navigable,
+                        items={k: (name, tuple(s)) for k, (name, s) in item_stores.items()})
+
+    async def _call_tool(self, name: str, args: Dict[str, Any],
+                         text: str) -> Tuple[List[ChatEvent], Dict[str, Any]]:
+        """
+        Runs the given tool, as the model tool calls are run.
+
+        :param name: The name of the tool.
+        :param args: The arguments of the tool.
+        :param text: The text of the request, used for the placeholder language.
+        :return: The tool call and output events, alongside the parsed tool output.
+        """
+        args_json = json.dumps(args)
+        call_id = f"route_{uuid.uuid4().hex}"
+        output = await self.tool_manager.call_tool_json(name, args_json)
+        return [ChatEvent(ChatEventType.TOOL_CALL_GENERATED,
+                          {"name": name, "args": args_json, "call_id": call_id}),
+                placeholder_event(on_tool_invocation(name, text)),
+                ChatEvent(ChatEventType.TOOL_OUTPUT_GENERATED,
+                          {"type": "function_call_output", "call_id": call_id, "output": output,
+                           "name": name})], json.loads(output)
+
+    async def _list_stores(self, catalog: _Catalog, text: str, _: None) -> List[ChatEvent]:
+        events, output = await self._call_tool("get_stores", {}, text)
+        names = [s["store_name"] for s in output["data"].get("stores", [])] \
+            if output["status"] == "success" else []
+        return events + _reply(on_routed_intent("list_stores", text, stores=", ".join(names)))
+
+    async def _coupon(self, catalog: _Catalog, text: str, store_id: int) -> List[ChatEvent]:
+        events, output = await self._call_tool("get_coupon_for_store", {"id": store_id}, text)
+        store = catalog.store_names.get(store_id, "")
+        if output["status"] == "success":
+            reply = on_routed_intent("coupon", text, store=store,
+                                     coupon=output["data"]["coupon"]["coupon_code"])
+        else:
+            reply = on_routed_intent("no_coupon", text, store=store)
+        return events + _reply(reply)
+
+    async def _navigate(self, catalog: _Catalog, text: str,
+                        store_id: int) -> Optional[List[ChatEvent]]:
+        events, output = await self._call_tool("set_navigation_for_store", {"id": store_id}, text)
+        if output["status"] != "success":
+            return None
+        store = catalog.store_names.get(store_id, "")
+        return events + _reply(on_routed_intent("navigate", text, store=store))
+
+    async def _product(self, catalog: _Catalog, text: str,
+                       item: Tuple[str, Tuple[str, ...]]) -> Optional[List[ChatEvent]]:
+        # The search also advertises the product on the signage.
+        name = item[0]
+        events, output = await self._call_tool("search_product", {"query": name}, text)
+        if output["status"] != "success":
+            return None
+        # Only the products matching the request, as the search may return similar ones.
+        key = _normalize(name)
+        stores = {p["store_name"]: None for p in output["data"]["products"]
+                  if key in (_normalize(p["product_name"]), _normalize(p["category"]))}
+        if not stores:
+            return None
+        return events + _reply(on_routed_intent("product", text, item=name,
+                                                stores=", ".join(stores)))
+
+
+def _normalize(text: str) -> str:
+    """
+    :param text: A request or catalog name.
+    :return: The text normalized as the requests are before matching.
+    """
+    return " ".join(normalize_text(text).split())
+
+
+def _reply(text: str) -> List[ChatEvent]:
+    """
+    :param text: The reply text.
+    :return: The events streaming the reply.
+    """
+    return [chat_event_from_agent(ChatEventType.TEXT_DELTA, text),
+            chat_event_from_agent(ChatEventType.TEXT_DONE, text)]
@@ -25,6 +25,13 @@ class Message:
     role: str
     content: str
     metadata: Optional[MessageMetadata] = None
+    # Id of the response stored by the API that produced this message, if any.
+    response_id: Optional[str] = None
+
+    def __post_init__(self):
+        # Messages rebuilt from chat events data carry their metadata as a dictionary.
+        if isinstance(self.metadata, dict):
+            self.metadata = MessageMetadata(**self.metadata)
 
     def to_open_ai_input_dict(self):
         """
@@ -4,9 +4,21 @@ This module exposes utility functions for openAI chat operations.
 Functions:
     count_tokens: Estimates the number of tokens in the given text as perceive by the given model
 """
+from functools import lru_cache
 import tiktoken
 
 
+@lru_cache(maxsize=None)
+def _get_encoding(model: str) -> tiktoken.Encoding:
+    """
+    Loads the encoding of the given model once, as loading it parses the whole BPE ranks file.
+
+    :param model: Model to be used.
+    :return: The encoding used by the model.
+    """
+    return tiktoken.encoding_for_model(model)
+
+
 def count_tokens(text: str, model="gpt-5"):
     """
     Estimates the number of tokens in the given text as perceive by the given model
@@ -15,5 +27,4 @@ def count_tokens(text: str, model="gpt-5"):
     :param model: Model to be used.
     :return: Estimated token amount.
     """
-    encoding = tiktoken.encoding_for_model(model)
-    return len(encoding.encode(text))
+    return len(_get_encoding(model).encode(text))
@@ -6,29 +6,55 @@ Classes:
         and sends the text.
     OpenAIToolResponseProvider: Provides the API with tools, manages tool calls and stream all
         tool and text events, using the agents reply or premade placeholders..
+
+Functions:
+    warm_up_client: Opens a connection to the API ahead of the next request.
 """
-from openai import AsyncOpenAI
+from openai import AsyncOpenAI, BadRequestError, NotFoundError
 
 from backend.model.message import Message
 from backend.model.response_provider import ResponseProvider
 from backend.model.openai.tool_schema import OPEN_AI_TOOL_SCHEMA
-from backend.model.tool_manager import ToolManager
+from backend.model.tool_manager import AsyncToolManager
 from backend.model.openai.event_types import OpenAIEventType
+from backend.model.generic_tool_client import run_tool_batch
 from backend.model.response_placeholders import on_initial_prompt, on_tool_invocation
-from typing import Any, AsyncGenerator, List
+from typing import Any, AsyncGenerator, List, Optional, Tuple
 from backend.model.chat_events_factory import *
 from collections import defaultdict
 import json
 
 
+async def warm_up_client(client: AsyncOpenAI, model: str, warm_up_model: bool) -> None:
+    """
+    Opens a connection to the API ahead of the next request, so it does not pay for the TCP and
+    TLS handshakes.
+
+    :param client: The client to warm up.
+    :param model: The model used by the client.
+    :param warm_up_model: Whether to also send a minimal, unstored response request to the model,
+        which costs a few tokens.
+    """
+    client = client.with_options(max_retries=0)
+    await client.models.retrieve(model)
+    if warm_up_model:
+        await client.responses.create(model=model, input="ping", max_output_tokens=16,
+                                      store=False)
+
+
 class OpenAISimpleResponseProvider(ResponseProvider):
     """
     Object implementing the ResponseProvider interface for OpenAI API response creations.
     """
 
-    def __init__(self, api_key: str, model_name: str = "gpt-5"):
-        self.client = AsyncOpenAI(api_key=api_key)
+    def __init__(self, api_key: str, model_name: str = "gpt-5", warm_up_model: bool = False,
+                 base_url: Optional[str] = None):
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url)
         self.model = model_name
+        self.warm_up_model = warm_up_model
+
+    async def warm_up(self) -> None:
+        await warm_up_client(self.client, self.model, self.warm_up_model)
 
     async def get_response(self, messages: List[Message],
                            instructions: str) -> AsyncGenerator[ChatEvent, None]:
@@ -49,36 +75,49 @@ class OpenAIToolResponseProvider(ResponseProvider):
     usage.
     """
 
-    def __init__(self, tool_manager: ToolManager, api_key: str, model_name: str = "gpt-5",
-                 tool_call_limit: int = 100):
+    def __init__(self, tool_manager: AsyncToolManager, api_key: str, model_name: str = "gpt-5",
+                 tool_call_limit: int = 100, chain_responses: bool = False,
+                 warm_up_model: bool = False, base_url: Optional[str] = None):
         """
         Initialize the object with the given arguments.
 
-        :param tool_manager: Object that manage tool calls and return an output.
+        :param tool_manager: Object that manage tool calls off the event loop and return an output.
         :param api_key: API Key used to create the AsyncOpenAI object used to make API calls.
         :param model_name: Name of the LLM model to use.
         :param tool_call_limit: Limit on the number of tool calls that can be made for a single
             user prompt. Needed to prevent queries that could make the token usage explode.
+        :param chain_responses: Whether to chain requests to the responses stored by the API
+            through previous_response_id, sending only the new messages and tool outputs instead
+            of the whole history. Falls back to sending the whole history if the stored response
+            is not available.
+        :param warm_up_model: Whether warming up also sends a minimal request to the model,
+            rather than only opening a connection.
+        :param base_url: URL of the API, defaults to the OpenAI API. Used to point the provider
+            at a compatible server, e.g. the stub of loadtest/openai_stub.py.
         """
-        self.client = AsyncOpenAI(api_key=api_key)
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url)
         self.model = model_name
         self.tool_manager = tool_manager
         self.tool_call_limit = tool_call_limit
+        self.chain_responses = chain_responses
+        self.warm_up_model = warm_up_model
+
+    async def warm_up(self) -> None:
+        await warm_up_client(self.client, self.model, self.warm_up_model)
 
     async def get_response(self, messages: List[Message],
                            instructions: str) -> AsyncGenerator[ChatEvent, None]:
         input_messages = [m.to_open_ai_input_dict()  for m in messages]
-        stream = await self.client.responses.create(model=self.model, instructions=instructions,
-                                                    input=input_messages, tools=OPEN_AI_TOOL_SCHEMA,
-                                                    stream=True)
+        previous_response_id, new_messages = self._split_chained_history(messages)
+        stream = await self._create_stream(instructions,
+                                           [m.to_open_ai_input_dict() for m in new_messages],
+                                           previous_response_id, input_messages)
         pending_tool_calls = []
-        async for value in self._iterate_on_stream(stream):
-            if value.type == ChatEventType.TOOL_CALL_GENERATED:
-                pending_tool_calls.append(value)
-            else:
-                yield value
-                if value.type == ChatEventType.ERROR:
-                    return
+        stream_state = {}
+        async for value in self._consume_stream(stream, pending_tool_calls, stream_state):
+            yield value
+            if value.type == ChatEventType.ERROR:
+                return
 
         if not pending_tool_calls:
             yield done_event()
@@ -88,31 +127,91 @@ class OpenAIToolResponseProvider(ResponseProvider):
         while len(pending_tool_calls) > 0:
             if len(tool_outputs) > self.tool_call_limit * 2:  # Each tool call generated 2 entries.
                 raise ValueError("The given query caused an excessive tool usage, aborting.")
-            for value in pending_tool_calls:
+            batch_start = len(tool_outputs)
+            async for value in run_tool_batch(pending_tool_calls, self._create_tool_output,
+                                              messages[-1].content, tool_outputs):
                 yield value
-                name = value.data["name"]
-                args_json = value.data["args"]
-                item_id = value.data["call_id"]
-                yield placeholder_event(on_tool_invocation(name, messages[-1].content))
-                tool_outputs.extend(self._create_tool_output(name, args_json, item_id))
-                tool_output = tool_outputs[-1] | {"name": name}
-                yield ChatEvent(ChatEventType.TOOL_OUTPUT_GENERATED, tool_output)
             pending_tool_calls = []
-            stream = await self.client.responses.create(model=self.model, instructions=instructions,
-                                                        input=input_messages + tool_outputs,
-                                                        tools=OPEN_AI_TOOL_SCHEMA, stream=True)
-            async for value in self._iterate_on_stream(stream):
-                if value.type == ChatEventType.TOOL_CALL_GENERATED:
-                    pending_tool_calls.append(value)
-                else:
-                    yield value
-                    if value.type == ChatEventType.ERROR:
-                        return
+            # The function calls themselves are already part of the stored response.
+            new_outputs = [o for o in tool_outputs[batch_start:]
+                           if o["type"] == "function_call_output"]
+            stream = await self._create_stream(instructions, new_outputs,
+                                               stream_state.get("response_id"),
+                                               input_messages + tool_outputs)
+            async for value in self._consume_stream(stream, pending_tool_calls, stream_state):
+                yield value
+                if value.type == ChatEventType.ERROR:
+                    return
 
         yield state_event(ChatEventType.TOOLS_OUTPUT_STATE, json.dumps(tool_outputs))
         yield done_event()
 
-    def _create_tool_output(self, name, args_json, item_id) -> List[Dict[str, Any]]:
+    def _split_chained_history(self, messages: List[Message]) -> Tuple[Optional[str],
+                                                                        List[Message]]:
+        """
+        Splits the given messages into the id of the latest stored response, and the messages
+        sent after it.
+
+        :param messages: The messages of the conversation.
+        :return: The latest response id, or None if chaining is disabled or no message has one,
+            alongside the messages that should be sent with it.
+        """
+        if not self.chain_responses:
+            return None, messages
+        for i in range(len(messages) - 1, -1, -1):
+            if messages[i].response_id is not None:
+                if i == len(messages) - 1:
+                    break
+                return messages[i].response_id, messages[i + 1:]
+        return None, messages
+
+    async def _create_stream(self, instructions: str, new_input: List[Dict[str, Any]],
+                             previous_response_id: Optional[str],
+                             full_input: List[Dict[str, Any]]):
+        """
+        Creates a response stream, chained to the given previous response if chaining is enabled.
+
+        :param instructions: The instructions for the model.
+        :param new_input: The input items added since the previous response.
+        :param previous_response_id: The id of the previous response, or None.
+        :param full_input: The whole input, sent if the response could not be chained.
+        :return: The response stream.
+        """
+        if self.chain_responses and previous_response_id is not None:
+            try:
+                return await self.client.responses.create(model=self.model,
+                                                          instructions=instructions,
+                                                          input=new_input,
+                                                          previous_response_id=previous_response_id,
+                                                          tools=OPEN_AI_TOOL_SCHEMA, stream=True)
+            except (BadRequestError, NotFoundError):
+                pass  # The stored response expired or storing is disabled, resend everything.
+        return await self.client.responses.create(model=self.model, instructions=instructions,
+                                                  input=full_input, tools=OPEN_AI_TOOL_SCHEMA,
+                                                  stream=True)
+
+    async def _consume_stream(self, stream, pending_tool_calls: List[ChatEvent],
+                              stream_state: Dict[str, str]) -> AsyncGenerator[ChatEvent, None]:
+        """
+        Iterate over the stream, yielding the events to forward while collecting the tool calls
+        into pending_tool_calls and the response id into stream_state.
+
+        :param stream: The stream to iterate over.
+        :param pending_tool_calls: The list to fill with the tool calls.
+        :param stream_state: Dictionary updated with the id of the streamed response.
+        """
+        async for value in self._iterate_on_stream(stream):
+            if value.type == ChatEventType.TOOL_CALL_GENERATED:
+                pending_tool_calls.append(value)
+            elif value.type == ChatEventType.RESPONSE_CREATED:
+                stream_state["response_id"] = value.data["state"]
+            elif value.type == ChatEventType.TEXT_DONE and self.chain_responses:
+                yield ChatEvent(value.type,
+                                value.data | {"response_id": stream_state.get("response_id")})
+            else:
+                yield value
+
+    async def _create_tool_output(self, name, args_json, item_id) -> List[Dict[str, Any]]:
         """
         Creates a tool output array according to openAI schema for the given tool 
         call as outputed by the model.
@@ -122,7 +221,7 @@ class OpenAIToolResponseProvider(ResponseProvider):
         :param item_id: The id of the item.
         :return: The tool output array.
         """
-        result = self.tool_manager.call_tool(name, args_json)
+        output = await self.tool_manager.call_tool_json(name, args_json)
         return [{
             "type": "function_call",
             "call_id": item_id,
@@ -131,7 +230,7 @@ class OpenAIToolResponseProvider(ResponseProvider):
         }, {
             "type": "function_call_output",
             "call_id": item_id,
-            "output": json.dumps(result, ensure_ascii=False),
+            "output": output,
         }]
 
     async def _iterate_on_stream(self, stream) -> AsyncGenerator[ChatEvent, None]:
@@ -168,6 +267,8 @@ class OpenAIToolResponseProvider(ResponseProvider):
                 yield ChatEvent(ChatEventType.TOOL_CALL_GENERATED, {"name": name,
                                                                     "args": args_json,
                                                                     'call_id': call_id})
+            if event.type == OpenAIEventType.RESPONSE_CREATED.value:
+                yield state_event(ChatEventType.RESPONSE_CREATED, event.response.id)
             if event.type == OpenAIEventType.RESPONSE_COMPLETED.value:
                 yield state_event(ChatEventType.STATUS, "model_completed")
             if event.type == OpenAIEventType.ERROR.value:
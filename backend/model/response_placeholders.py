@@ -7,6 +7,7 @@ Functions:
     on_tool_invocation: Returns a placeholder response for the tool invocation.
     on_invalid_prompt_length: Returns a placeholder response for text who exceeded the maximal
         amount of tokens.
+    on_routed_intent: Returns the templated reply to a request answered by the intent router.
 """
 from backend.language_utils import *
 
@@ -60,6 +61,24 @@ TOOL_WAITING_MESSAGES_HE ={
     )
 }
 
+# Templated replies to the requests answered by the intent router, in english.
+ROUTED_INTENT_REPLIES = {
+    "list_stores": "These are the stores in the mall: {stores}.",
+    "navigate": "The way to {store} is now displayed on the screen next to you.",
+    "coupon": "The coupon code for {store} is {coupon}.",
+    "no_coupon": "Sorry, {store} has no coupon at the moment.",
+    "product": "You can find {item} at {stores}.",
+}
+
+# Templated replies to the requests answered by the intent router, in hebrew.
+ROUTED_INTENT_REPLIES_HE = {
+    "list_stores": "אלו החנויות בקניון: {stores}.",
+    "navigate": "הדרך אל {store} מוצגת עכשיו על המסך שלידך.",
+    "coupon": "קוד הקופון של {store} הוא {coupon}.",
+    "no_coupon": "מצטער, ל{store} אין כרגע קופון.",
+    "product": "אפשר למצוא {item} ב{stores}.",
+}
+
 
 def on_initial_prompt(text: str) -> str:
     """
@@ -96,4 +115,20 @@ def on_invalid_prompt_length(text: str) -> str:
     heb_str = "מצטער, אך אינני יכול לעבד הודעה באורך כזה, אנא קצר את ההודעה או שלח אותה בחלקים."
     eng_str = "Sorry, but I cannot process a message of this length. Please shorten the message" \
               " or send it in parts."
-    return heb_str if language == SupportedLanguages.HEBREW else eng_str
\ No newline at end of file
+    return heb_str if language == SupportedLanguages.HEBREW else eng_str
+
+
+def on_routed_intent(intent: str, text: str, **values: str) -> str:
+    """
+    Returns the templated reply to a request answered by the intent router, in the given text
+    language.
+
+    :param intent: The intent of the request.
+    :param text: The text to detect the language from.
+    :param values: The values filling the template, e.g. the store name.
+    :return: The string containing the response.
+    """
+    language = detect_supported_language(text)
+    templates = ROUTED_INTENT_REPLIES_HE if language == SupportedLanguages.HEBREW \
+        else ROUTED_INTENT_REPLIES
+    return templates[intent].format(**values)
@@ -23,3 +23,10 @@ class ResponseProvider(ABC):
             yield {}  # This signals to the IDE that this is an AsyncGenerator, silencing
             # warnings about this method being a coroutine.
         ...
+
+    async def warm_up(self) -> None:
+        """
+        Prepares the provider for the next request, e.g. by opening connections ahead of time.
+        Never called in the request path. Does nothing by default.
+        """
+        ...
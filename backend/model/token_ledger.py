@@ -0,0 +1,73 @@
+"""
+This module exposes the token accounting of a conversation.
+
+Classes:
+    TokenLedger: Running token totals over an append-only list of messages.
+"""
+import bisect
+from typing import Callable, List, Optional
+
+from backend.model.message import Message, MessageMetadata
+
+
+class TokenLedger:
+    """
+    Keeps the token counts of a conversation as prefix sums, so totals over any suffix of the
+    conversation cost O(1), and only messages appended since the last sync are counted.
+    Counts are memoized on each message metadata, so a message is never encoded twice.
+    """
+
+    def __init__(self, token_counter: Callable[[str], int]):
+        """
+        :param token_counter: Function used for counting the tokens of a text.
+        """
+        self.token_counter = token_counter
+        # _prefix[i] holds the total tokens of the first i messages.
+        self._prefix: List[int] = [0]
+        self._last: Optional[Message] = None
+
+    def count(self, message: Message) -> int:
+        """
+        :param message: The message to count the tokens of.
+        :return: The tokens of the message, counted once and stored in its metadata.
+        """
+        if message.metadata is None:
+            message.metadata = MessageMetadata(self.token_counter(message.content))
+        return message.metadata.tokens
+
+    def sync(self, messages: List[Message]) -> None:
+        """
+        Accounts for the messages appended since the last sync. If the given list is not an
+        extension of the synced one, the totals are rebuilt from the memoized counts.
+
+        :param messages: The messages of the conversation.
+        """
+        synced = len(self._prefix) - 1
+        if synced > len(messages) or (synced > 0 and messages[synced - 1] is not self._last):
+            self._prefix = [0]
+            synced = 0
+        for message in messages[synced:]:
+            self._prefix.append(self._prefix[-1] + self.count(message))
+        if messages:
+            self._last = messages[-1]
+
+    def total(self, start: int = 0) -> int:
+        """
+        :param start: Index of the first message to include.
+        :return: The total tokens of the synced messages from the given index.
+        """
+        return self._prefix[-1] - self._prefix[start]
+
+    def keep_count(self, start: int, token_budget: int) -> int:
+        """
+        Finds how many of the latest synced messages fit in the given token budget.
+
+        :param start: Index of the first message that may be kept.
+        :param token_budget: The maximal amount of tokens to keep.
+        :return: The number of latest messages to keep, at least 1 so the latest message is
+            always kept.
+        """
+        # The first index whose suffix total fits the budget.
+        first = bisect.bisect_left(self._prefix, self._prefix[-1] - token_budget, lo=start,
+                                   hi=len(self._prefix) - 1)
+        return max(1, len(self._prefix) - 1 - first)
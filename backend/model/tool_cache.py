@@ -0,0 +1,126 @@
+"""
+This module exposes a read-through cache for tool results.
+
+Classes:
+    CacheStats: Data class holding a snapshot of the cache metrics.
+    ToolResultCache: LRU and TTL bound cache invalidated by table versions.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable, Optional, Tuple
+
+from backend.db.table_versions import TableVersions
+
+
+@dataclass
+class CacheStats:
+    """
+    Data class holding a snapshot of the cache metrics.
+    """
+    size: int
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+
+
+@dataclass
+class _Entry:
+    """
+    Data class holding a cached value alongside what it depends on.
+    """
+    value: Any
+    tables: Tuple[str, ...]
+    versions: Tuple[int, ...]
+    expires_at: float
+
+
+class ToolResultCache:
+    """
+    Thread safe cache of results read from the database, e.g. tool results or chat answers.
+    Entries are evicted by LRU order past max_entries, expire after the TTL, and are invalidated
+    once any of the tables they were read from is written.
+    Cached values are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, table_versions: TableVersions, max_entries: int = 1024,
+                 ttl_s: float = 300.0):
+        """
+        :param table_versions: Versions of the database tables.
+        :param max_entries: Maximal number of cached results.
+        :param ttl_s: Time after which a cached result expires.
+        """
+        self.table_versions = table_versions
+        self.max_entries = max_entries
+        self.ttl = ttl_s
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        :param key: The key of the result.
+        :return: The cached result, or None if it is missing, expired or stale.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            if entry.expires_at < time.monotonic() or \
+                    self.table_versions.snapshot(entry.tables) != entry.versions:
+                del self._entries[key]
+                self._invalidations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry.value
+
+    def versions(self, tables: Tuple[str, ...]) -> Tuple[int, ...]:
+        """
+        Snapshots the versions of the given tables. Must be taken before computing a result, so
+        a write racing the computation invalidates it.
+
+        :param tables: The tables the result is read from.
+        :return: The current versions of the tables.
+        """
+        return self.table_versions.snapshot(tables)
+
+    def put(self, key: Hashable, value: Any, tables: Tuple[str, ...],
+            versions: Tuple[int, ...]) -> None:
+        """
+        Caches the given result.
+
+        :param key: The key of the result.
+        :param value: The result.
+        :param tables: The tables the result was read from.
+        :param versions: The versions of the tables, as returned by 'versions' before the result
+            was computed.
+        """
+        with self._lock:
+            self._entries[key] = _Entry(value, tables, versions, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        """
+        Drops all the cached results.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        """
+        :return: A snapshot of the cache metrics.
+        """
+        with self._lock:
+            return CacheStats(size=len(self._entries), hits=self._hits, misses=self._misses,
+                              evictions=self._evictions, invalidations=self._invalidations)
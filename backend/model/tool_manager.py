@@ -2,11 +2,16 @@
 This module exposes the tool manager, alongisde the tools mapping to actual functions.
 
 Classes:
-    ToolManager: Class that handles tools mapping to actual functions and calling them.
+    ToolManager: Class that handles tools mapping to actual functions and calling them, caching
+        the results of the catalog tools.
+    AsyncToolManager: Runs the tools of a ToolManager on a bounded thread pool.
 """
+import asyncio
 import json
-from typing import Any, Callable, Dict, Tuple, Type, Union
-from dataclasses import asdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Optional, Tuple, Type, Union
+from pydantic import ValidationError
 from backend.tools.schemas import *
 from backend.tools.stores import *
 from backend.tools.products import *
@@ -15,6 +20,7 @@ from backend.db.database_connection import DatabaseConnection
 from backend.db.connection_pool import ConnectionPool
 from backend.tools.error_dict_factory import error_output_with_message
 from backend.tools.models import CallOutput
+from backend.model.tool_cache import ToolResultCache
 
 # Type alias for tool functions
 tool_fn = Callable[[AppRequestArgsBaseModel, DatabaseConnection], CallOutput]
@@ -30,19 +36,39 @@ TOOL_FUNCS: Dict[str, Tuple[tool_fn, Type[AppRequestArgsBaseModel]]] = {
     "set_navigation_for_store": (set_navigation_for_store, IDArgs)
 }
 
+# Tables read by each cacheable tool. Tools that are not pure reads must not be listed here.
+CACHEABLE_TOOLS: Dict[str, Tuple[str, ...]] = {
+    "get_stores": ("stores",),
+    "get_store_by_id": ("stores",),
+    "get_coupon_for_store": ("coupons",),
+    "search_product": ("products", "stores"),
+    "get_products_by_store": ("products", "stores"),
+    "get_coupon_for_product": ("products", "coupons"),
+}
+
 
 class ToolManager:
     """
     Tool manager that handles the tools mapping to actual functions.
     """
 
-    def __init__(self, db_pool: ConnectionPool):
+    def __init__(self, db_pool: ConnectionPool,
+                 tool_overrides: Optional[Dict[str, tool_fn]] = None,
+                 cache: Optional[ToolResultCache] = None):
         """
         Initialize the tool manager with the given database connection pool.
 
         :param db_pool: The database connection pool to use.
+        :param tool_overrides: Optional mapping of tool names to functions implementing them
+            instead of the defaults, e.g. to pick the search_product implementation.
+        :param cache: Optional cache for the results of the tools in CACHEABLE_TOOLS. Its table
+            versions must be bumped by every write to the database.
         """
         self.db_pool = db_pool
+        self.cache = cache
+        self.tool_funcs = dict(TOOL_FUNCS)
+        for name, fn in (tool_overrides or {}).items():
+            self.tool_funcs[name] = (fn, TOOL_FUNCS[name][1])
 
     def call_tool(self, name: str, args_json: str) -> Dict[str, Any]:
         """
@@ -52,13 +78,155 @@ class ToolManager:
         :param args_json: The arguments to pass to the tool.
         :return: The result of the tool call.
         """
-        if name not in TOOL_FUNCS:
-            return asdict(error_output_with_message(f"Tool not found: {name}"))
+        return json.loads(self.call_tool_json(name, args_json))
+
+    def call_tool_json(self, name: str, args_json: str) -> str:
+        """
+        Call the tool with the given name and arguments, returning its result serialized as JSON.
+        This is the fast path for the model providers, the rows go straight from the cursor to the
+        JSON string, and cached results are returned without serializing them again.
+
+        :param name: The name of the tool to call.
+        :param args_json: The arguments to pass to the tool.
+        :return: The result of the tool call, as a JSON string. Invalid arguments and failures of
+            the tool are returned as error results, so the model sees them as a failed call.
+        """
+        if name not in self.tool_funcs:
+            return error_output_with_message(f"Tool not found: {name}").to_json()
         try:
-            args = TOOL_FUNCS[name][1](**json.loads(args_json)) if args_json else {}
+            args = self.tool_funcs[name][1](**json.loads(args_json)) if args_json else {}
         except json.JSONDecodeError:
-            return asdict(error_output_with_message("Invalid JSON arguments"))
-        print(args)
-        print(name)
+            return error_output_with_message("Invalid JSON arguments").to_json()
+        except (ValidationError, TypeError) as e:
+            return error_output_with_message(f"Invalid arguments for {name}: {e}").to_json()
+        try:
+            return self._call_validated(name, args)
+        except Exception as e:
+            # Covers the pool acquire timeout as well as the errors raised by the tools.
+            print(f"Tool {name} failed: {e!r}")
+            return error_output_with_message(f"Tool {name} failed.").to_json()
+
+    def _call_validated(self, name: str, args: AppRequestArgsBaseModel) -> str:
+        """
+        Calls the tool with the given name and validated arguments, through the cache if the tool
+        is cacheable.
+
+        :param name: The name of the tool to call.
+        :param args: The validated arguments to pass to the tool.
+        :return: The result of the tool call, as a JSON string.
+        """
+        tables = CACHEABLE_TOOLS.get(name)
+        if self.cache is None or tables is None:
+            return self._run_tool(name, args)
+        key = self._cache_key(name, args)
+        result = self.cache.get(key)
+        if result is None:
+            versions = self.cache.versions(tables)
+            result = self._run_tool(name, args)
+            self.cache.put(key, result, tables, versions)
+        return result
+
+    def _run_tool(self, name: str, args: AppRequestArgsBaseModel) -> str:
+        """
+        Runs the tool with the given name on a pooled connection.
+
+        :param name: The name of the tool to call.
+        :param args: The validated arguments to pass to the tool.
+        :return: The result of the tool call, as a JSON string.
+        """
         with self.db_pool.connection() as conn:
-            return asdict(TOOL_FUNCS[name][0](args, conn))
+            return self.tool_funcs[name][0](args, conn).to_json()
+
+    @staticmethod
+    def _cache_key(name: str, args: Any) -> Tuple[str, str]:
+        """
+        Builds the cache key of a tool call, so that calls differing only by the arguments order,
+        types that validate to the same values, or the case and spacing of the search query share
+        the same entry.
+
+        :param name: The name of the tool.
+        :param args: The validated arguments of the tool.
+        :return: The cache key.
+        """
+        values = args.model_dump() if isinstance(args, AppRequestArgsBaseModel) else {}
+        if isinstance(values.get("query"), str):
+            values["query"] = " ".join(values["query"].split()).lower()
+        return name, json.dumps(values, sort_keys=True, ensure_ascii=False)
+
+
+class AsyncToolManager:
+    """
+    Runs the tools of a ToolManager on a bounded thread pool, so that slow queries do not block
+    the event loop serving the other chat streams.
+    """
+
+    def __init__(self, tool_manager: ToolManager, max_workers: int = 8, timeout_s: float = 10.0,
+                 tool_limits: Optional[Dict[str, int]] = None):
+        """
+        Initialize the object with the given arguments.
+
+        :param tool_manager: The tool manager running the actual tools.
+        :param max_workers: Maximal number of tools running at the same time.
+        :param timeout_s: Time after which a tool call is abandoned and an error is returned
+            instead. The worker thread itself cannot be interrupted and runs to completion.
+        :param tool_limits: Optional mapping of tool names to the maximal number of concurrent
+            calls allowed for that tool. Tools not in the mapping are only bound by max_workers.
+        """
+        self.tool_manager = tool_manager
+        self.timeout = timeout_s
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+        self._tool_limits = tool_limits or {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    async def call_tool(self, name: str, args_json: str) -> Dict[str, Any]:
+        """
+        Call the tool with the given name and arguments on the thread pool.
+
+        :param name: The name of the tool to call.
+        :param args_json: The arguments to pass to the tool.
+        :return: The result of the tool call.
+        """
+        return json.loads(await self.call_tool_json(name, args_json))
+
+    async def call_tool_json(self, name: str, args_json: str) -> str:
+        """
+        Call the tool with the given name and arguments on the thread pool.
+
+        :param name: The name of the tool to call.
+        :param args_json: The arguments to pass to the tool.
+        :return: The result of the tool call, as a JSON string.
+        """
+        try:
+            return await asyncio.wait_for(self._run(name, args_json), self.timeout)
+        except asyncio.TimeoutError:
+            return error_output_with_message(f"Tool {name} timed out.").to_json()
+
+    async def _run(self, name: str, args_json: str) -> str:
+        """
+        Waits for the tool concurrency limit, then runs the tool on the thread pool.
+
+        :param name: The name of the tool to call.
+        :param args_json: The arguments to pass to the tool.
+        :return: The result of the tool call, as a JSON string.
+        """
+        loop = asyncio.get_running_loop()
+        async with self._get_semaphore(name):
+            return await loop.run_in_executor(self._executor, self.tool_manager.call_tool_json,
+                                              name, args_json)
+
+    def _get_semaphore(self, name: str):
+        """
+        :param name: The name of the tool.
+        :return: The semaphore limiting the given tool, or a no-op context if it is unlimited.
+        """
+        if name not in self._tool_limits:
+            return nullcontext()
+        if name not in self._semaphores:
+            self._semaphores[name] = asyncio.Semaphore(self._tool_limits[name])
+        return self._semaphores[name]
+
+    def close(self) -> None:
+        """
+        Shuts down the thread pool, waiting for running tools to finish.
+        """
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,99 @@
+"""
+This module exposes the compiled catalog of the ads displayed on the signage.
+
+Classes:
+    AdRecord: Immutable ad of a single product.
+    AdCatalog: The ad records of all the products, indexed by product.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+@dataclass(frozen=True, slots=True)
+class AdRecord:
+    """
+    Immutable ad of a single product. Frames are built from it per request, so overlays added to
+    a frame never leak into the catalog.
+    """
+    product_id: int
+    product_name: str
+    store_id: int
+    category: str
+    asset_url: Optional[str]
+    logo_url: Optional[str]
+    # The ad the asset comes from, its scheduling weight and impressions cap.
+    ad_id: Optional[int] = None
+    weight: float = 1.0
+    max_impressions_per_hour: Optional[int] = None
+
+    def to_frame(self, **overlay: Any) -> Dict[str, Any]:
+        """
+        :param overlay: Fields to add to the frame, e.g. uppertext or mapurl.
+        :return: A new signage frame of the ad.
+        """
+        store = {"product_name": self.product_name}
+        if self.logo_url is not None:
+            store["logourl"] = self.logo_url
+        if self.asset_url is not None:
+            store["asseturl"] = self.asset_url
+        store.update(overlay)
+        return {"store": store}
+
+
+class AdCatalog:
+    """
+    The ad records of all the products, compiled once in O(products + ads).
+    Each product is advertised with the oldest active ad of its store in its category, falling
+    back to the store default (the oldest active ad of the store), and with the logo of that
+    store default.
+    """
+
+    def __init__(self, products: Iterable[Dict[str, Any]], ads: Iterable[Dict[str, Any]]):
+        """
+        :param products: The products, as returned by GET_ALL_PRODUCTS.
+        :param ads: The ads, as returned by GET_ALL_ADS (newest first).
+        """
+        # GET_ALL_ADS is ordered newest first, so the last ad seen is the oldest.
+        store_default: Dict[int, Dict[str, Any]] = {}
+        store_category: Dict[Tuple[int, str], Dict[str, Any]] = {}
+        for ad in ads:
+            if not ad["is_active"]:
+                continue
+            store_default[ad["store_id"]] = ad
+            store_category[(ad["store_id"], ad["category"])] = ad
+
+        records: List[AdRecord] = []
+        for p in products:
+            default = store_default.get(p["store_id"])
+            ad = store_category.get((p["store_id"], p["category"]), default)
+            records.append(AdRecord(
+                product_id=p["product_id"], product_name=p["product_name"],
+                store_id=p["store_id"], category=p["category"],
+                asset_url=None if ad is None else ad["asset_url"],
+                logo_url=None if default is None else default["logo_url"],
+                ad_id=None if ad is None else ad["ad_id"],
+                weight=1.0 if ad is None else ad.get("weight", 1.0),
+                max_impressions_per_hour=None if ad is None else
+                ad.get("max_impressions_per_hour")))
+        self.records: Tuple[AdRecord, ...] = tuple(records)
+
+        self._by_product_id: Dict[int, int] = {}
+        self._by_product_name: Dict[str, int] = {}
+        for i, record in enumerate(self.records):
+            self._by_product_id[record.product_id] = i
+            self._by_product_name.setdefault(record.product_name, i)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def index_of(self, product: Dict[str, Any]) -> Optional[int]:
+        """
+        Finds the ad of the given product in constant time, by id if known, otherwise by name.
+
+        :param product: The product, e.g. as returned by the search_product tool.
+        :return: The index of the ad record, or None if the product has no ad.
+        """
+        if product.get("product_id") in self._by_product_id:
+            return self._by_product_id[product["product_id"]]
+        return self._by_product_name.get(product.get("product_name"))
+
@@ -1,76 +1,98 @@
-import random
 from abc import ABC, abstractmethod
-import numpy as np
+from typing import Any, Dict, Hashable, Tuple
 from backend.db.database_connection import DatabaseConnection
 from backend.tools.products import get_all_products
 from backend.tools.ads import get_all_ads
+from backend.server.ad_catalog import AdCatalog, AdRecord
+from backend.server.ad_scheduler import AdScheduler
+
+# The screen of single screen deployments, and of requests not naming a screen.
+DEFAULT_SCREEN = "default"
 
 
 class AdProvider(ABC):
 
     @abstractmethod
-    def get_ad(self):
+    def get_ad(self, screen: Hashable = DEFAULT_SCREEN):
+        """
+        :param screen: The id of the screen the ad is displayed on.
+        :return: A new frame of the next ad of the screen, which the caller may modify.
+        """
         ...
 
     @abstractmethod
-    def force_next_ad(self, product):
+    def force_next_ad(self, product, screen: Hashable = DEFAULT_SCREEN):
+        """
+        :param product: The product to advertise next.
+        :param screen: The id of the screen the ad is displayed on.
+        """
         ...
 
+    def reload(self, conn: DatabaseConnection):
+        """
+        Reloads the ads from the database, e.g. after they were modified.
+
+        :param conn: The database connection.
+        """
+        self.swap_ads(self.compile_ads(conn))
+
+    def compile_ads(self, conn: DatabaseConnection) -> Any:
+        """
+        Reads and compiles the ads from the database, without using them yet. Leaves the provider
+        untouched, so it may run on another thread than the one the ads are served from.
+
+        :param conn: The database connection.
+        :return: The compiled ads, to pass to 'swap_ads'.
+        """
+        return None
+
+    def swap_ads(self, compiled: Any) -> None:
+        """
+        Starts serving the given ads.
+
+        :param compiled: Ads returned by 'compile_ads'.
+        """
+        pass
+
 
 class MockAdProvider(AdProvider):
-    def __init__(self, conn: DatabaseConnection, window_size=5):
-        products = get_all_products(None, conn=conn)
-        assert window_size <= len(products), "Not enough products for the window size."
-        ads = get_all_ads(None, conn).data["ads"]
-        self.ads = self.build_ads(ads, products)
-        self.products = products
+    def __init__(self, conn: DatabaseConnection, window_size=5, batch_windows=64):
         self.window_size = window_size
-        self.probs = np.random.dirichlet(np.ones(len(products)), size=1)[0]
-        self.cur_selection = np.random.choice(self.ads, size=window_size, replace=False,
-                                              p=self.probs)
-        self.next_ad = 0
-        self.forced_ad = None
-
-    def get_ad(self):
-        if self.forced_ad is not None:
-            product = self.forced_ad
-            self.forced_ad = None
-            return product
-        product = self.cur_selection[self.next_ad]
-        self.next_ad += 1
-        if self.next_ad == self.window_size:
-            self.cur_selection = np.random.choice(self.ads, size=self.window_size,
-                                                  replace=False, p=self.probs)
-            self.next_ad = 0
-        return product
-
-    def force_next_ad(self, product):
-        for ad in self.ads:
-            if ad["product_name"] == product["product_name"]:
-                self.forced_ad = ad
-                return
-
-    def build_ads(self, ads, products):
-        new_ads = []
-        for p in products:
-            data = {
-                "store": {
-                    'product_name': p["product_name"]
-                }
-            }
-            found_cat = False
-            for ad in ads:
-                if p["store_id"] == ad["store_id"]:
-                    data["store"]["logourl"] = ad["logo_url"]
-                    if p['category'] == ad['category']:
-                        found_cat = True
-                        data["store"]["asseturl"] = ad["asset_url"]
-                    if not found_cat:
-                        data["store"]["asseturl"] = ad["asset_url"]
-            new_ads.append(data)
-        return new_ads
+        self.batch_windows = batch_windows
+        self.reload(conn)
 
+    def compile_ads(self, conn: DatabaseConnection) -> Tuple[AdCatalog, AdScheduler]:
+        """
+        Compiles the ad catalog from the database, alongside a rotation over it.
+
+        :param conn: The database connection.
+        :return: The ad catalog and its scheduler.
+        :raises ValueError: If there are fewer products than the window size.
+        """
+        products = get_all_products(None, conn=conn)
+        if len(products) < self.window_size:
+            raise ValueError(f"Not enough products ({len(products)}) for the window size "
+                             f"({self.window_size}).")
+        ads = get_all_ads(None, conn).data.get("ads", [])
+        catalog = AdCatalog(products, ads)
+        return catalog, AdScheduler(catalog, self.window_size, self.batch_windows)
 
+    def swap_ads(self, compiled: Tuple[AdCatalog, AdScheduler]) -> None:
+        """
+        Starts serving the given catalog, restarting the rotation and dropping the forced ads.
 
+        :param compiled: The ad catalog and its scheduler, as returned by 'compile_ads'.
+        """
+        self.catalog, self.scheduler = compiled
+        self.forced_ads: Dict[Hashable, AdRecord] = {}
 
+    def get_ad(self, screen: Hashable = DEFAULT_SCREEN):
+        record = self.forced_ads.pop(screen, None)
+        if record is None:
+            record = self.catalog.records[self.scheduler.next_ad(screen)]
+        return record.to_frame()
 
+    def force_next_ad(self, product, screen: Hashable = DEFAULT_SCREEN):
+        index = self.catalog.index_of(product)
+        if index is not None:
+            self.forced_ads[screen] = self.catalog.records[index]
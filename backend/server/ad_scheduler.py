@@ -0,0 +1,172 @@
+"""
+This module exposes the engine choosing which ad each screen displays next.
+
+Classes:
+    AdScheduler: Weighted ad rotation over NumPy arrays, with per screen windows and paced caps.
+"""
+import time
+from typing import Dict, Hashable, List, Optional
+
+import numpy as np
+
+from backend.server.ad_catalog import AdCatalog
+
+# Length of the period the impression caps apply to.
+PACING_PERIOD_S = 3600.0
+
+
+class AdScheduler:
+    """
+    Draws the ads of each screen in rotation windows: every window holds distinct ads, sampled
+    without replacement proportionally to their weights by successive sampling (see _refill),
+    and windows are drawn in batches so the sampling cost is amortized over many frames.
+    Ads with an hourly impressions cap are paced: within the hour, an ad may only have been
+    displayed its cap times the elapsed fraction of the hour, rounded down, plus one times (and
+    never more than its cap), so a capped ad is spread over the hour instead of exhausting its cap
+    at once. Impressions are counted across screens.
+    The scheduler is meant to be used from a single thread.
+    """
+
+    def __init__(self, catalog: AdCatalog, window_size: int = 5, batch_windows: int = 64,
+                 seed: Optional[int] = None):
+        """
+        :param catalog: The ads to schedule, each record is scheduled with its ad weight and cap.
+        :param window_size: The number of distinct ads in a rotation window.
+        :param batch_windows: The number of windows drawn at once for a screen.
+        :param seed: Seed of the random generator, for reproducible rotations.
+        """
+        if len(catalog) == 0:
+            raise ValueError("Cannot schedule an empty ad catalog.")
+        self.catalog = catalog
+        self.window_size = window_size
+        self.batch_windows = batch_windows
+        self._rng = np.random.default_rng(seed)
+
+        weights = np.array([r.weight for r in catalog.records], dtype=np.float64)
+        if not (weights > 0).any():
+            weights = np.ones_like(weights)
+        self._weights = weights
+        # Records sharing an ad share its impressions, records without one are never capped.
+        ad_index: Dict[Hashable, int] = {}
+        self._ad_of_record = np.array(
+            [ad_index.setdefault(("ad", r.ad_id) if r.ad_id is not None else ("record", i),
+                                 len(ad_index)) for i, r in enumerate(catalog.records)],
+            dtype=np.int64)
+        self._caps = np.full(len(ad_index), np.inf)
+        for r, ad in zip(catalog.records, self._ad_of_record):
+            if r.max_impressions_per_hour is not None:
+                self._caps[ad] = r.max_impressions_per_hour
+        capped = np.isfinite(self._caps[self._ad_of_record])
+        self._capped_records = frozenset(np.flatnonzero(capped).tolist())
+        self._impressions = np.zeros(len(ad_index), dtype=np.int64)
+        self._period_start = time.monotonic()
+
+        # Per screen rotation buffers, stored as rows of a single array grown on demand.
+        self._slots: Dict[Hashable, int] = {}
+        self._buffers = np.zeros((0, batch_windows * window_size), dtype=np.int64)
+        self._lengths: List[int] = []
+        self._cursors: List[int] = []
+
+    def next_ad(self, screen: Hashable = 0, now: Optional[float] = None) -> int:
+        """
+        Picks the next ad of the given screen and counts its impression. Ads whose cap was reached
+        since their window was drawn are skipped, unless every ad is capped.
+
+        :param screen: The id of the screen.
+        :param now: The current monotonic time, defaults to time.monotonic().
+        :return: The index of the ad record in the catalog.
+        """
+        now = time.monotonic() if now is None else now
+        if now - self._period_start >= PACING_PERIOD_S:
+            self._period_start = now
+            self._impressions[:] = 0
+        slot = self._slots.get(screen)
+        if slot is None:
+            slot = self._add_slot(screen)
+        allowed = self._allowed_impressions((now - self._period_start) / PACING_PERIOD_S)
+        record = -1
+        for _ in range(len(self.catalog) + self.window_size):
+            if self._cursors[slot] >= self._lengths[slot]:
+                self._refill(slot, allowed)
+            record = self._buffers[slot, self._cursors[slot]].item()
+            self._cursors[slot] += 1
+            if record not in self._capped_records:
+                break
+            ad = self._ad_of_record[record]
+            if self._impressions[ad] < allowed[ad]:
+                break
+        self._impressions[self._ad_of_record[record]] += 1
+        return record
+
+    def impressions(self) -> Dict[int, int]:
+        """
+        :return: The impressions of each ad in the current pacing period, by ad id.
+        """
+        counts: Dict[int, int] = {}
+        for r, ad in zip(self.catalog.records, self._ad_of_record):
+            if r.ad_id is not None:
+                counts[r.ad_id] = int(self._impressions[ad])
+        return counts
+
+    def _allowed_impressions(self, fraction: float) -> np.ndarray:
+        """
+        :param fraction: The elapsed fraction of the pacing period.
+        :return: The number of impressions each ad may have had so far, infinite if not capped.
+        """
+        allowed = self._caps.copy()
+        capped = np.isfinite(allowed)
+        allowed[capped] = np.minimum(allowed[capped], np.floor(allowed[capped] * fraction) + 1)
+        return allowed
+
+    def _add_slot(self, screen: Hashable) -> int:
+        """
+        :param screen: The id of a new screen.
+        :return: The row of the screen buffers, the buffers being grown if full.
+        """
+        slot = len(self._slots)
+        self._slots[screen] = slot
+        if slot == len(self._buffers):
+            self._buffers = np.resize(self._buffers, (max(4, 2 * slot), self._buffers.shape[1]))
+        self._lengths.append(0)
+        self._cursors.append(0)
+        return slot
+
+    def _refill(self, slot: int, allowed: np.ndarray) -> None:
+        """
+        Draws a batch of rotation windows for the given screen, out of the ads that are not
+        capped at the moment. Each window is drawn by successive sampling: candidates are drawn
+        with replacement proportionally to the weights, in logarithmic time through the weights
+        cumulative sum, and the first distinct ones are kept, which is distributed as weighted
+        sampling without replacement. The rare windows with too few distinct candidates are drawn
+        with the Gumbel top-k trick instead.
+
+        :param slot: The row of the screen buffers.
+        :param allowed: The number of impressions each ad may have had so far.
+        """
+        weights = np.where((self._impressions < allowed)[self._ad_of_record], self._weights, 0.0)
+        if not weights.any():
+            weights = self._weights
+        k = min(self.window_size, int(np.count_nonzero(weights)))
+        cumulative = np.cumsum(weights)
+        candidates = np.searchsorted(
+            cumulative, self._rng.random((self.batch_windows, 2 * k)) * cumulative[-1],
+            side="right")
+        # Marks the first occurrence of each candidate within its window.
+        order = np.argsort(candidates, axis=1, kind="stable")
+        ordered = np.take_along_axis(candidates, order, axis=1)
+        first = np.ones_like(ordered, dtype=bool)
+        first[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+        np.put_along_axis(first, order, first.copy(), axis=1)
+        kept = first & (np.cumsum(first, axis=1) <= k)
+        short = kept.sum(axis=1) < k
+        windows = np.empty((self.batch_windows, k), dtype=np.int64)
+        windows[~short] = candidates[~short][kept[~short]].reshape(-1, k)
+        if short.any():
+            with np.errstate(divide="ignore"):
+                keys = np.log(weights) + self._rng.gumbel(size=(int(short.sum()), len(weights)))
+            top = np.argpartition(-keys, k - 1, axis=1)[:, :k]
+            order = np.argsort(-np.take_along_axis(keys, top, axis=1), axis=1)
+            windows[short] = np.take_along_axis(top, order, axis=1)
+        self._buffers[slot, :windows.size] = windows.reshape(-1)
+        self._lengths[slot] = windows.size
+        self._cursors[slot] = 0
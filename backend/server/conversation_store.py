@@ -0,0 +1,159 @@
+"""
+This module exposes a store keeping the chat history of each session.
+
+Classes:
+    ConversationStore: Session keyed conversation store with TTL, LRU and memory bounds.
+"""
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from backend.model.message import Message
+
+
+@dataclass
+class _Session:
+    """
+    Data class holding the history of a single session.
+    """
+    messages: List[Message] = field(default_factory=list)
+    size: int = 0
+    last_access: float = 0.0
+
+
+class ConversationStore:
+    """
+    Keeps the messages of each chat session, so every request only carries its own history.
+    Sessions idle for longer than the TTL are evicted, and the least recently used sessions are
+    evicted once the session count or the estimated memory usage pass their bounds.
+    The store is meant to be used from the event loop thread only.
+    """
+
+    def __init__(self, ttl_s: float = 900.0, max_sessions: int = 1000,
+                 max_bytes: int = 32 * 1024 * 1024):
+        """
+        Initialize the store with the given bounds.
+
+        :param ttl_s: Time after which an idle session is evicted.
+        :param max_sessions: Maximal number of sessions kept.
+        :param max_bytes: Maximal estimated memory used by all the stored messages.
+        """
+        self.ttl = ttl_s
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._total_bytes = 0
+        self._evicted = 0
+
+    def get(self, session_id: str) -> List[Message]:
+        """
+        Returns the messages of the given session, creating it if needed. The returned list must
+        not be modified directly, use 'append' instead.
+
+        :param session_id: The id of the session.
+        :return: The messages of the session, oldest first.
+        """
+        return self._touch(session_id).messages
+
+    def has_session(self, session_id: str) -> bool:
+        """
+        :param session_id: The id of the session.
+        :return: Whether the session is kept, i.e. it was neither evicted nor expired.
+        """
+        self.evict_expired()
+        return session_id in self._sessions
+
+    def append(self, session_id: str, message: Message) -> None:
+        """
+        Appends the given message to the session history, evicting other sessions if needed.
+
+        :param session_id: The id of the session.
+        :param message: The message to append.
+        """
+        session = self._touch(session_id)
+        size = self._message_size(message)
+        session.messages.append(message)
+        session.size += size
+        self._total_bytes += size
+        self._enforce_bounds(session)
+
+    def evict_expired(self, now: Optional[float] = None) -> int:
+        """
+        Evicts all the sessions idle for longer than the TTL.
+
+        :param now: The current monotonic time, defaults to time.monotonic().
+        :return: The number of evicted sessions.
+        """
+        now = time.monotonic() if now is None else now
+        evicted = 0
+        # Sessions are ordered by last access, so the scan stops at the first live one.
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_access <= self.ttl:
+                break
+            self._evict(session_id)
+            evicted += 1
+        return evicted
+
+    def stats(self) -> Dict[str, int]:
+        """
+        :return: The number of sessions, their estimated memory usage and the eviction count.
+        """
+        return {"sessions": len(self._sessions), "bytes": self._total_bytes,
+                "evicted": self._evicted}
+
+    def _touch(self, session_id: str) -> _Session:
+        """
+        Marks the given session as the most recently used one, creating it if needed. Expired
+        sessions are dropped on the way, so a session past its TTL always starts over.
+
+        :param session_id: The id of the session.
+        :return: The session.
+        """
+        now = time.monotonic()
+        self.evict_expired(now)
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = _Session()
+            self._sessions[session_id] = session
+        else:
+            self._sessions.move_to_end(session_id)
+        session.last_access = now
+        return session
+
+    def _enforce_bounds(self, current: _Session) -> None:
+        """
+        Evicts the least recently used sessions until the bounds are met. The current session is
+        never evicted, instead its oldest messages are dropped if it alone exceeds the memory cap.
+
+        :param current: The session being updated.
+        """
+        while len(self._sessions) > self.max_sessions or self._total_bytes > self.max_bytes:
+            session_id, session = next(iter(self._sessions.items()))
+            if session is current:
+                break
+            self._evict(session_id)
+        while self._total_bytes > self.max_bytes and len(current.messages) > 1:
+            size = self._message_size(current.messages.pop(0))
+            current.size -= size
+            self._total_bytes -= size
+
+    def _evict(self, session_id: str) -> None:
+        """
+        Removes the given session from the store.
+
+        :param session_id: The id of the session.
+        """
+        session = self._sessions.pop(session_id)
+        self._total_bytes -= session.size
+        self._evicted += 1
+
+    @staticmethod
+    def _message_size(message: Message) -> int:
+        """
+        :param message: The message to measure.
+        :return: An estimate of the memory held by the message.
+        """
+        return sys.getsizeof(message.content) + sys.getsizeof(message.role)
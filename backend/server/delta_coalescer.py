@@ -0,0 +1,78 @@
+"""
+This module exposes the coalescing of the text deltas streamed by a response provider, so the
+chat stream sends one frame per time window rather than one frame per token.
+
+Functions:
+    coalesce_text_deltas: Merges the consecutive text deltas of a chat events stream.
+"""
+import asyncio
+from typing import AsyncGenerator, AsyncIterator, List, Optional
+
+from backend.model.chat_events_factory import ChatEvent, ChatEventType, chat_event
+
+
+async def coalesce_text_deltas(events: AsyncIterator[ChatEvent], window_s: float = 0.02,
+                               max_chars: int = 256) -> AsyncGenerator[ChatEvent, None]:
+    """
+    Merges the consecutive text deltas of the given stream. The first delta is passed through
+    right away, so the time to first token is unchanged. Later deltas are buffered until the
+    window since the first buffered delta elapses, the buffer reaches max_chars, or any other
+    event arrives, which is then passed through after the merged delta, preserving the order.
+
+    :param events: The chat events stream.
+    :param window_s: The maximal time a delta is held back, 0 disables the coalescing.
+    :param max_chars: The buffered text size after which the buffer is flushed early.
+    :return: The chat events stream, with the buffered deltas merged.
+    """
+    if window_s <= 0:
+        async for event in events:
+            yield event
+        return
+    loop = asyncio.get_running_loop()
+    iterator = events.__aiter__()
+    # The next event is awaited by a task that outlives the window timeouts, so no event is lost
+    # when a window elapses while waiting.
+    pending: Optional[asyncio.Future] = None
+    buffer: List[str] = []
+    buffered_chars = 0
+    role = "assistant"
+    deadline = 0.0
+    first_delta = True
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            timeout = max(0.0, deadline - loop.time()) if buffer else None
+            done, _ = await asyncio.wait((pending,), timeout=timeout)
+            if not done:
+                yield chat_event(ChatEventType.TEXT_DELTA, role, "".join(buffer))
+                buffer, buffered_chars = [], 0
+                continue
+            finished, pending = pending, None
+            try:
+                event = finished.result()
+            except StopAsyncIteration:
+                break
+            if event.type == ChatEventType.TEXT_DELTA and not first_delta:
+                if not buffer:
+                    deadline = loop.time() + window_s
+                    role = event.data.get("role", role)
+                buffer.append(event.data["content"])
+                buffered_chars += len(event.data["content"])
+                if buffered_chars >= max_chars:
+                    yield chat_event(ChatEventType.TEXT_DELTA, role, "".join(buffer))
+                    buffer, buffered_chars = [], 0
+                continue
+            if event.type == ChatEventType.TEXT_DELTA:
+                first_delta = False
+            if buffer:
+                yield chat_event(ChatEventType.TEXT_DELTA, role, "".join(buffer))
+                buffer, buffered_chars = [], 0
+            yield event
+        if buffer:
+            yield chat_event(ChatEventType.TEXT_DELTA, role, "".join(buffer))
+    finally:
+        if pending is not None:
+            pending.cancel()
+            # Lets the cancellation reach the upstream generator, so it may be closed right after.
+            await asyncio.gather(pending, return_exceptions=True)
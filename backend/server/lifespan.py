@@ -4,33 +4,52 @@ This module is used to set up the database pool and response provider in the app
 Functions:
     lifespan: Sets up the database pool and response provider in the app lifespan.
 """
+import asyncio
 from contextlib import asynccontextmanager
 from datetime import datetime
+from functools import partial
 
 from fastapi import FastAPI
 import httpx
 import os
 import json
-from typing import Dict, Any
+import time
+import traceback
+from typing import Dict, Any, List, Tuple
 # from backend.model.gemini.client import GeminiToolUsageClient, SimpleGeminiResponseProvider
 # from backend.model.gemini.summary_format_provider import create_gemini_summary_format
 from backend.model.openai.client import OpenAIToolResponseProvider, OpenAISimpleResponseProvider
 from backend.model.openai.tool_usage_parser import create_summary_format
 from backend.model.openai.chat_utils import count_tokens
-from backend.model.tool_manager import ToolManager
+from backend.model.tool_manager import ToolManager, AsyncToolManager
+from backend.model.tool_cache import ToolResultCache
+from backend.model.answer_cache import CachingResponseProvider
+from backend.model.intent_router import IntentRouter, ROUTER_TABLES
 from backend.model.chat_manager import ChatManager
 from backend.db.database_connection import DatabaseConnection
 from backend.db.init_db import init_db_if_needed
-from backend.db.sqlite_connection import get_db
-from backend.db.single_instance_pool import SingleInstancePool
+from backend.db.catalog_loader import CATALOG_TABLES
+from backend.db.catalog_validation import validate_catalog
+from backend.db.sqlite_connection import get_db, ConnectionProfile, DEFAULT_DB_PATH
+from backend.db.statement_registry import StatementRegistry
+from backend.db.sqlite_pool import SQLitePool
+from backend.tools.catalog_index import CatalogIndex
+from backend.tools.products import search_product_in_index, search_product_fts
 from backend.model.response_provider import ResponseProvider
-from backend.server.ad_provider import MockAdProvider
+from backend.server.ad_provider import MockAdProvider, DEFAULT_SCREEN
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from backend.server.novisign_provider import NovisignProvider
+from backend.server.conversation_store import ConversationStore
+from db import queries
 from db.queries import GET_NAVIGATION_ASSETS
 
+# Tables another process may write, bumped once such a write is detected. Includes every table
+# the router is compiled from, so its catalog is read again after external writes as well.
+EXTERNALLY_WRITTEN_TABLES = tuple(dict.fromkeys(tuple(CATALOG_TABLES) + ROUTER_TABLES))
 
-def _setup_openai_provider(cfg: Dict[str, str], tool_manager: ToolManager) -> ResponseProvider:
+
+def _setup_openai_provider(cfg: Dict[str, str],
+                           tool_manager: AsyncToolManager) -> ResponseProvider:
     """
     Sets up the OpenAI provider from the given cfg and tool_manager.
 
@@ -44,7 +63,14 @@ def _setup_openai_provider(cfg: Dict[str, str], tool_manager: ToolManager) -> Re
         api_key = ""
     model_name = cfg.get("MODEL_NAME", "gpt-5-nano")
     tool_response_provider = OpenAIToolResponseProvider(tool_manager=tool_manager,
-                                                        api_key=api_key, model_name=model_name)
+                                                        api_key=api_key, model_name=model_name,
+                                                        chain_responses=cfg.get("CHAIN_RESPONSES",
+                                                                                False),
+                                                        warm_up_model=cfg.get("WARMUP_MODEL",
+                                                                              False),
+                                                        base_url=cfg.get("OPENAI_BASE_URL"))
+    # The chat requests are not routed through ChatManager, which keeps the summary of a single
+    # conversation, while the server answers all the sessions with one provider.
     return tool_response_provider
     # simple_response_provider = OpenAISimpleResponseProvider(api_key, model_name)
     # return ChatManager(tool_response_provider, simple_response_provider, create_summary_format,
@@ -62,9 +88,9 @@ def _setup_openai_provider(cfg: Dict[str, str], tool_manager: ToolManager) -> Re
 #                        token_counter=None)
 
 
-def _setup_response_provider(tool_manager: ToolManager) -> ResponseProvider:
+def _setup_response_provider(tool_manager: AsyncToolManager) -> ResponseProvider:
     """
-    Sets up the response provider from the cfg.json file and the given ToolManager.
+    Sets up the response provider from the cfg.json file and the given AsyncToolManager.
 
     :param tool_manager: The tool manager to use.
     :return: The response provider.
@@ -83,13 +109,131 @@ def _setup_response_provider(tool_manager: ToolManager) -> ResponseProvider:
     return setup_method(cfg, tool_manager)
 
 
-def _setup_novisign_provider(conn: DatabaseConnection):
+def _read_navigation_assets(conn: DatabaseConnection) -> Dict[int, str]:
+    """
+    :param conn: The database connection.
+    :return: Mapping of store ids to their navigation asset.
+    """
+    rows = conn.cursor().execute(GET_NAVIGATION_ASSETS).fetchall()
+    return {r["store_id"]: r["route_path_d"] for r in rows}
+
+
+def _setup_novisign_provider(conn: DatabaseConnection, rotate_interval_s: float,
+                             screens: List[str]):
     ad_provider = MockAdProvider(conn)
-    cursor = conn.cursor()
-    rows = cursor.execute(GET_NAVIGATION_ASSETS).fetchall()
-    assets = {r["store_id"]: r["route_path_d"] for r in rows}
+    assets = _read_navigation_assets(conn)
     qr = "https://hackathon-2026.onrender.com/assets/qr-code.png"
-    return NovisignProvider(ad_provider, qr, assets)
+    # The default screen serves the requests not naming a screen, so it is always listed.
+    return NovisignProvider(ad_provider, qr, assets, rotate_interval_s=rotate_interval_s,
+                            screens=[DEFAULT_SCREEN, *screens])
+
+
+async def _rotate_signage(provider: NovisignProvider) -> None:
+    """
+    Rotates the signage frames that are due. A coroutine, so the scheduler runs it on the event
+    loop thread the provider is used from.
+
+    :param provider: The signage provider.
+    """
+    provider.tick()
+
+
+def _read_signage_catalog(db_pool: SQLitePool,
+                          provider: NovisignProvider) -> Tuple[Any, Dict[int, str]]:
+    """
+    Reads and compiles the ads and the navigation assets of the signage, without using them yet.
+
+    :param db_pool: The database pool.
+    :param provider: The signage provider.
+    :return: The compiled ads, alongside the navigation assets.
+    """
+    with db_pool.connection() as conn:
+        return provider.ad_provider.compile_ads(conn), _read_navigation_assets(conn)
+
+
+async def _poll_catalog_writes(app: FastAPI) -> None:
+    """
+    Detects the catalog writes made by other processes, e.g. the catalog loader, so the caches
+    and indexes depending on the table versions are refreshed, and reloads the ads and the
+    navigation assets of the signage once they changed. The poll and the reads run on worker
+    threads, and only swapping the results in runs on the event loop thread the signage provider
+    is used from. A failed reload keeps the previous signage catalog, and is retried on the next
+    poll.
+
+    :param app: The application.
+    """
+    loop = asyncio.get_running_loop()
+    if await loop.run_in_executor(None, app.state.db_pool.poll_external_writes,
+                                  EXTERNALLY_WRITTEN_TABLES):
+        print("Detected a catalog write by another process, reloading the catalog.")
+        app.state.signage_catalog_stale = True
+    if not app.state.signage_catalog_stale:
+        return
+    provider: NovisignProvider = app.state.novisign_provider
+    try:
+        ads, assets = await loop.run_in_executor(None, _read_signage_catalog,
+                                                 app.state.db_pool, provider)
+    except Exception:
+        print(f"Reloading the signage catalog failed, keeping the previous one:\n"
+              f"{traceback.format_exc()}")
+        return
+    provider.ad_provider.swap_ads(ads)
+    provider.set_navigation_assets(assets)
+    app.state.signage_catalog_stale = False
+
+
+def _setup_search_tool(search_mode: str, db_pool: SQLitePool) -> Dict[str, Any]:
+    """
+    Picks the search_product implementation for the given search mode.
+
+    :param search_mode: "index" for the in-memory catalog index, "fts" for the SQLite full text
+        index, or "like" for a plain scan of the products table.
+    :param db_pool: The database connection pool.
+    :return: The tool overrides to pass to the ToolManager.
+    """
+    if search_mode == "index":
+        catalog_index = CatalogIndex(db_pool.table_versions)
+        with db_pool.connection() as conn:
+            catalog_index.refresh(conn)
+        return {"search_product": partial(search_product_in_index, index=catalog_index)}
+    if search_mode == "fts":
+        return {"search_product": search_product_fts}
+    return {}
+
+
+async def _evict_expired_sessions(conversations: ConversationStore) -> None:
+    """
+    Evicts the expired sessions. A coroutine, so the scheduler runs it on the event loop thread
+    the store is used from, rather than on a worker thread.
+
+    :param conversations: The conversation store.
+    """
+    conversations.evict_expired()
+
+
+async def _warm_up(provider: ResponseProvider) -> None:
+    """
+    Warms up the given provider, logging instead of raising on failure.
+
+    :param provider: The provider to warm up.
+    """
+    try:
+        await provider.warm_up()
+    except Exception as e:
+        print(f"Response provider warm-up failed: {e}")
+
+
+async def _warm_up_if_idle(app: FastAPI, idle_s: float) -> None:
+    """
+    Warms up the response provider if no chat request was received for the given time, so the
+    connection to the model is still open when the next user arrives.
+
+    :param app: The application.
+    :param idle_s: Time without chat requests after which the provider is warmed up.
+    """
+    if time.monotonic() - app.state.last_chat_time >= idle_s:
+        await _warm_up(app.state.response_provider)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -98,11 +242,74 @@ async def lifespan(app: FastAPI):
     """
     cfg_path = "cfg.json"
     with open(cfg_path) as f:
-        app.state.use_openAI = json.load(f).get("USE_OPENAI", False)
-    app.state.db_pool = SingleInstancePool(get_db)
-    init_db_if_needed(app.state.db_pool.get_connection)
-    app.state.novisign_provider = _setup_novisign_provider(app.state.db_pool.get_connection())
-    app.state.response_provider = _setup_response_provider(ToolManager(app.state.db_pool))
-    app.state.messages = []
+        cfg = json.load(f)
+    app.state.use_openAI = cfg.get("USE_OPENAI", False)
+    profile = ConnectionProfile(**cfg.get("DB_PROFILE", {}))
+    db_path = cfg.get("DB_PATH", DEFAULT_DB_PATH)
+    app.state.db_pool = SQLitePool(partial(get_db, db_path, profile=profile),
+                                   partial(get_db, db_path, readonly=True, profile=profile),
+                                   size=cfg.get("DB_POOL_SIZE", 4),
+                                   acquire_timeout_s=cfg.get("DB_ACQUIRE_TIMEOUT_S", 5.0))
+    init_db_if_needed(app.state.db_pool.get_writer, db_path)
+    statements = StatementRegistry()
+    statements.register_module(queries)
+    with app.state.db_pool.connection() as conn:
+        # Checks the statements against the schema, the readers prepare them on first use.
+        statements.compile(conn)
+        validate_catalog(conn)
+        app.state.novisign_provider = _setup_novisign_provider(
+            conn, cfg.get("NOVISIGN_ROTATE_INTERVAL_S", 10),
+            cfg.get("NOVISIGN_SCREENS", []))
+    app.state.novisign_keepalive_s = cfg.get("NOVISIGN_KEEPALIVE_S", 15)
+    tool_overrides = _setup_search_tool(cfg.get("SEARCH_MODE", "index"), app.state.db_pool)
+    cache_size = cfg.get("TOOL_CACHE_SIZE", 1024)
+    tool_cache = ToolResultCache(app.state.db_pool.table_versions, max_entries=cache_size,
+                                 ttl_s=cfg.get("TOOL_CACHE_TTL_S", 300)) if cache_size else None
+    app.state.tool_manager = AsyncToolManager(ToolManager(app.state.db_pool, tool_overrides,
+                                                          tool_cache),
+                                              max_workers=cfg.get("TOOL_WORKERS", 8),
+                                              timeout_s=cfg.get("TOOL_TIMEOUT_S", 10.0),
+                                              tool_limits=cfg.get("TOOL_CONCURRENCY_LIMITS"))
+    app.state.response_provider = _setup_response_provider(app.state.tool_manager)
+    answer_cache_size = cfg.get("ANSWER_CACHE_SIZE", 256)
+    app.state.answer_cache = ToolResultCache(app.state.db_pool.table_versions,
+                                             max_entries=answer_cache_size,
+                                             ttl_s=cfg.get("ANSWER_CACHE_TTL_S", 3600)) \
+        if answer_cache_size else None
+    if app.state.answer_cache is not None:
+        app.state.response_provider = CachingResponseProvider(app.state.response_provider,
+                                                              app.state.answer_cache)
+    if cfg.get("INTENT_ROUTER", True):
+        # In front of the cache, as its local answers are cheaper than a cache lookup replay.
+        app.state.response_provider = IntentRouter(app.state.response_provider,
+                                                   app.state.tool_manager, app.state.db_pool)
+    app.state.sse_coalesce_s = cfg.get("SSE_COALESCE_MS", 20) / 1000
+    app.state.sse_coalesce_max_chars = cfg.get("SSE_COALESCE_MAX_CHARS", 256)
+    app.state.conversations = ConversationStore(ttl_s=cfg.get("SESSION_TTL_S", 900),
+                                                max_sessions=cfg.get("SESSION_MAX_COUNT", 1000),
+                                                max_bytes=cfg.get("SESSION_MAX_BYTES", 32 << 20))
+    scheduler = AsyncIOScheduler()
+    scheduler.add_job(_evict_expired_sessions, "interval", args=[app.state.conversations],
+                      seconds=cfg.get("SESSION_SWEEP_INTERVAL_S", 60))
+    # Frequent enough that navigation frames are held for about a full interval.
+    scheduler.add_job(_rotate_signage, "interval", args=[app.state.novisign_provider],
+                      seconds=1)
+    app.state.signage_catalog_stale = False
+    scheduler.add_job(_poll_catalog_writes, "interval", args=[app],
+                      seconds=cfg.get("CATALOG_POLL_INTERVAL_S", 2))
+    app.state.last_chat_time = time.monotonic()
+    if cfg.get("WARMUP_ON_STARTUP", True):
+        scheduler.add_job(_warm_up, args=[app.state.response_provider])
+    warm_up_interval = cfg.get("WARMUP_IDLE_INTERVAL_S", 240)
+    if warm_up_interval:
+        scheduler.add_job(_warm_up_if_idle, "interval", args=[app, warm_up_interval],
+                          seconds=warm_up_interval)
+    scheduler.start()
     yield
+    scheduler.shutdown(wait=False)
+    app.state.tool_manager.close()
+    with app.state.db_pool.writer() as conn:
+        # Refreshes the query planner statistics. The 0x10000 flag checks every table rather than
+        # only the ones queried through the writer, as the reads go through the pool readers.
+        conn.cursor().execute("PRAGMA optimize = 0x10002;")
     app.state.db_pool.close()
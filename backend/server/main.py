@@ -1,16 +1,31 @@
 """
 Server running the chat.
 """
-from fastapi import FastAPI, Request
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+import asyncio
+import json
+import os
+import re
+import time
 import traceback
+from contextlib import aclosing
+from dataclasses import asdict
+from typing import Optional
 from backend.model.message import Message
 from backend.model.response_provider import ResponseProvider
 from backend.server.lifespan import lifespan
+from backend.server.conversation_store import ConversationStore
+from backend.server.delta_coalescer import coalesce_text_deltas
+from backend.server.ad_provider import DEFAULT_SCREEN
+from backend.server.novisign_provider import NovisignProvider
 from backend.server.sse_factory import *
 from backend.model.chat_events_factory import ChatEventType
 
+# Session ids are generated by the kiosks, e.g. frontend/app.js.
+SESSION_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,128}")
+
 # The application server.
 app = FastAPI(lifespan=lifespan)
 
@@ -31,18 +46,128 @@ async def get_config():
     return {"name": "assistant" if app.state.use_openAI else "model"}
 
 
-def handle_tool_event(event):
+def handle_tool_event(event, screen_id):
+    # The output is the JSON string sent to the model.
+    output = json.loads(event.data["output"])
+    if output["status"] != "success":
+        return
     if event.data["name"] == "search_product":
-        data = event.data["output"]["data"]
-        app.state.novisign_provider.force_next_ad(data[0])
+        data = output["data"]["products"]
+        app.state.novisign_provider.force_next_ad(data[0], screen_id)
     if event.data["name"] == "set_navigation_for_store":
-        store_id = event.data["output"]["data"]["id"]
-        app.state.novisign_provider.set_data_for_navigation_asset(store_id)
+        store_id = output["data"]["id"]
+        app.state.novisign_provider.set_data_for_navigation_asset(store_id, screen_id)
+
+
+def check_screen(screen_id: str):
+    """
+    Checks that the given signage screen is one of the screens listed in cfg.json.
+
+    :param screen_id: The id of the screen.
+    :raises HTTPException: If the screen is unknown.
+    """
+    try:
+        app.state.novisign_provider.check_screen(screen_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Checks an If-None-Match header against the current ETag. The header may list several ETags,
+    or be "*", and is compared weakly, so the ETags a proxy marked as weak (W/) still match.
+
+    :param if_none_match: The If-None-Match header, if any.
+    :param etag: The current ETag.
+    :return: Whether the client already has the current representation.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def process_stats():
+    """
+    :return: The CPU time used by the server process so far, and its resident memory, which is
+             only known where /proc is available. Samples taken over time give the CPU usage.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            rss_bytes = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        rss_bytes = None
+    return {"cpu_s": time.process_time(), "wall_s": time.monotonic(), "rss_bytes": rss_bytes}
+
+
+@app.get("/metrics")
+async def metrics():
+    tool_cache = app.state.tool_manager.tool_manager.cache
+    return {"process": process_stats(),
+            "db_pool": asdict(app.state.db_pool.stats()),
+            "conversations": app.state.conversations.stats(),
+            "tool_cache": None if tool_cache is None else asdict(tool_cache.stats()),
+            "answer_cache": None if app.state.answer_cache is None
+            else asdict(app.state.answer_cache.stats()),
+            "novisign": app.state.novisign_provider.stats()}
 
 
 @app.get("/novisign")
-async def novisign_payload():
-    return app.state.novisign_provider.get_data()
+async def novisign_payload(req: Request, screen: str = DEFAULT_SCREEN):
+    """
+    Returns the current signage frame of the given screen, or 304 if the poller already has it.
+    The frames rotate every NOVISIGN_ROTATE_INTERVAL_S seconds, rather than on every poll.
+
+    :param req: The HTTP Request.
+    :param screen: The id of the screen.
+    """
+    provider: NovisignProvider = app.state.novisign_provider
+    check_screen(screen)
+    etag = provider.etag(screen)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(req.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    provider.record_delivery(provider.published_at(screen), screen)
+    return Response(provider.get_data_json(screen), media_type="application/json",
+                    headers=headers)
+
+
+@app.get("/novisign/stream")
+async def novisign_stream(req: Request, screen: str = DEFAULT_SCREEN):
+    """
+    Streams the signage frames of the given screen as SSE, starting with the current one.
+
+    :param req: The HTTP Request.
+    :param screen: The id of the screen.
+    """
+    provider: NovisignProvider = app.state.novisign_provider
+    keepalive_s = app.state.novisign_keepalive_s
+    check_screen(screen)
+
+    async def run():
+        queue = provider.subscribe(screen)
+        try:
+            while not await req.is_disconnected():
+                try:
+                    frame_json, published_at = await asyncio.wait_for(queue.get(), keepalive_s)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing the idle connection.
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {frame_json}\n\n"
+                provider.record_delivery(published_at, screen)
+        finally:
+            provider.unsubscribe(queue, screen)
+
+    return StreamingResponse(run(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
 
 
 @app.post("/chat/stream")
@@ -52,9 +177,17 @@ async def chat_stream(req: Request):
 
     :param req: The HTTP Request.
     """
+    app.state.last_chat_time = time.monotonic()
     body = await req.json()
     conversation = body.get("conversation", [])
-    messages = app.state.messages
+    session_id = body.get("session_id")
+    if session_id is not None and (not isinstance(session_id, str) or
+                                   SESSION_ID_PATTERN.fullmatch(session_id) is None):
+        raise HTTPException(status_code=400, detail="Invalid session_id.")
+    # The signage screen next to the kiosk, displaying the ads and navigations of its chat.
+    screen_id = str(body.get("screen_id", DEFAULT_SCREEN))
+    check_screen(screen_id)
+    conversations: ConversationStore = app.state.conversations
     # model_name_in_messages = "assistant" if app.state.use_openAI else "model"
     model_name_in_messages = "assistant"
 
@@ -64,39 +197,60 @@ async def chat_stream(req: Request):
             placeholder_id = f"placeholder-{len(conversation)}"
             message_id = f"msg-{len(conversation)}"
             user_message = Message(**conversation[-1])
-            messages.append(user_message)
+            if session_id is not None:
+                if not conversations.has_session(session_id):
+                    # The session was evicted or the server restarted, it starts over from the
+                    # history the client still sends.
+                    for message in conversation[:-1]:
+                        conversations.append(session_id, Message(**message))
+                # The turn is only stored once answered, so a failed turn can be retried.
+                messages = list(conversations.get(session_id)) + [user_message]
+            else:
+                # Without a session, the request carries its whole history.
+                messages = [Message(**m) for m in conversation]
             first_delta = True
-            async for event in response_provider.get_response(messages, SYSTEM_INSTRUCTIONS):
-                event_type = event.type
-                if event_type == ChatEventType.TOOL_CALL_GENERATED:
-                    yield tool_call_generated_event(event.data["name"], event.data["args"])
-                if event_type == ChatEventType.TOOL_OUTPUT_GENERATED:
-                    handle_tool_event(event)
-                    yield tool_output_generated_event(event.data["name"], event.data["output"])
-                if event_type == ChatEventType.PLACEHOLDER:
-                    replace_id = placeholder_id if first_delta else None
-                    yield UI_update_event(SSEEventTypes.RENDER, placeholder_id, "message",
-                                          model_name_in_messages,
-                                          text=event.data["content"], replace_id=replace_id)
-                elif event_type == ChatEventType.TEXT_DELTA:
-                    if first_delta:
-                        yield UI_update_event(SSEEventTypes.RENDER, message_id, "message",
-                                              model_name_in_messages,
-                                              replace_id=placeholder_id, text=event.data["content"])
-                        first_delta = False
-                    else:
-                        yield UI_update_event(SSEEventTypes.PATCH, message_id, "message",
-                                              model_name_in_messages,
-                                              op="append_text", text=event.data["content"])
-                elif event_type == ChatEventType.TEXT_DONE:
-                    messages.append(Message(role=event.data.get("role"),
-                                            content=event.data.get("content")))
-                    if first_delta:
-                        yield UI_update_event(SSEEventTypes.RENDER, message_id, "message",
+            append_text = append_text_encoder(message_id, "message", model_name_in_messages)
+            responses = response_provider.get_response(messages, SYSTEM_INSTRUCTIONS)
+            # Closed as soon as the stream ends, e.g. on client disconnect, releasing the model
+            # stream and the running tools rather than leaving them to the garbage collector.
+            async with aclosing(responses), aclosing(coalesce_text_deltas(
+                    responses, app.state.sse_coalesce_s,
+                    app.state.sse_coalesce_max_chars)) as events:
+                async for event in events:
+                    event_type = event.type
+                    if event_type == ChatEventType.TOOL_CALL_GENERATED:
+                        yield tool_call_generated_event(event.data["name"], event.data["args"])
+                    if event_type == ChatEventType.TOOL_OUTPUT_GENERATED:
+                        handle_tool_event(event, screen_id)
+                        yield tool_output_generated_event(event.data["name"], event.data["output"])
+                    if event_type == ChatEventType.PLACEHOLDER:
+                        replace_id = placeholder_id if first_delta else None
+                        yield UI_update_event(SSEEventTypes.RENDER, placeholder_id, "message",
                                               model_name_in_messages,
-                                              replace_id=placeholder_id,
-                                              text=event.data.get("content"))
-                        first_delta = False
+                                              text=event.data["content"], replace_id=replace_id)
+                    elif event_type == ChatEventType.TEXT_DELTA:
+                        if first_delta:
+                            yield UI_update_event(SSEEventTypes.RENDER, message_id, "message",
+                                                  model_name_in_messages,
+                                                  replace_id=placeholder_id,
+                                                  text=event.data["content"])
+                            first_delta = False
+                        else:
+                            yield append_text(event.data["content"])
+                    elif event_type == ChatEventType.TEXT_DONE:
+                        if session_id is not None:
+                            if user_message is not None:
+                                conversations.append(session_id, user_message)
+                                user_message = None
+                            conversations.append(session_id, Message(
+                                role=event.data.get("role"), content=event.data.get("content"),
+                                response_id=event.data.get("response_id")))
+                        if first_delta:
+                            yield UI_update_event(SSEEventTypes.RENDER, message_id, "message",
+                                                  model_name_in_messages,
+                                                  replace_id=placeholder_id,
+                                                  text=event.data.get("content"))
+                            first_delta = False
 
             yield done_event()
         except Exception as e:
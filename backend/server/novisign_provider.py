@@ -1,37 +1,307 @@
-from backend.server.ad_provider import AdProvider
+"""
+This module exposes the provider of the frames displayed by the novisign signage players.
+
+Classes:
+    NovisignProvider: Rotates the signage frames of each screen and pushes them to its streams.
+"""
+import asyncio
+import json
+import os
 import time
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from backend.server.ad_provider import AdProvider, DEFAULT_SCREEN
+
+QR_UPPERTEXT = "סרקו את הברקוד ותוכלו לקבל קופון הנחה!"
+
 
 class NovisignProvider:
+    """
+    Rotates the displayed ad of each screen on a fixed interval, and publishes every new frame to
+    the streams subscribed to that screen. Navigations are queued per screen: a navigation frame
+    is published right away unless another one is still displayed, and held for a full interval.
+    Each frame is serialized once, alongside an ETag, so polls of an unchanged frame cost nothing.
+    Only the screens given upfront are served, so clients cannot register screens of their own.
+    Their timings and latency counters are kept in arrays indexed by screen slot, so the rotation
+    of all the screens due is found in a single vectorized pass.
+    The provider is meant to be used from the event loop thread only.
+    """
+
     def __init__(self, ad_provider: AdProvider, qr_asset_url, navigation_assets,
-                 navigation_timeout_s=10):
+                 navigation_timeout_s=10, rotate_interval_s=10,
+                 screens: Iterable[Hashable] = (DEFAULT_SCREEN,), navigation_queue_size=4):
+        """
+        :param ad_provider: The provider of the ads to rotate.
+        :param qr_asset_url: The QR code image, displayed when no navigation happened recently.
+        :param navigation_assets: Mapping of store ids to their navigation asset.
+        :param navigation_timeout_s: Time after a navigation during which the QR code is hidden.
+        :param rotate_interval_s: Time each frame is displayed for.
+        :param screens: The ids of the screens served, each displaying its first ad right away.
+        :param navigation_queue_size: The number of pending navigations kept per screen, the
+                                      oldest are dropped beyond it.
+        """
         self.ad_provider = ad_provider
-        self._pending_nav_call = None
-        self._last_navigation_call = 0
         self.qr_asset = qr_asset_url
         self.navigation_assets = navigation_assets
         self.navigation_timeout = navigation_timeout_s
+        self.rotate_interval = rotate_interval_s
+        self.navigation_queue_size = navigation_queue_size
+        # Distinguishes the ETags of different server runs.
+        self._etag_prefix = os.urandom(4).hex()
+
+        self._slots: Dict[Hashable, int] = {}
+        self._screen_ids: List[Hashable] = []
+        self._frames: List[Dict[str, Any]] = []
+        self._frames_json: List[str] = []
+        self._versions: List[int] = []
+        self._subscribers: List[Set[asyncio.Queue]] = []
+        self._navigation_queues: List[Deque[Any]] = []
+        # Per slot timings (monotonic) and frame delivery counters.
+        self._published_at = np.zeros(0)
+        self._last_navigation = np.zeros(0)
+        self._showing_navigation = np.zeros(0, dtype=bool)
+        self._delivered = np.zeros(0, dtype=np.int64)
+        self._latency_sum = np.zeros(0)
+        self._latency_max = np.zeros(0)
+        for screen in screens:
+            if screen not in self._slots:
+                self._register(screen)
+
+    def etag(self, screen: Hashable = DEFAULT_SCREEN) -> str:
+        """
+        :param screen: The id of the screen.
+        :return: The ETag of the current frame of the screen.
+        """
+        slot = self._slot(screen)
+        return f'"{self._etag_prefix}-{slot}-{self._versions[slot]}"'
+
+    def get_data(self, screen: Hashable = DEFAULT_SCREEN) -> Dict[str, Any]:
+        """
+        :param screen: The id of the screen.
+        :return: The current frame of the screen.
+        """
+        return self._frames[self._slot(screen)]
+
+    def get_data_json(self, screen: Hashable = DEFAULT_SCREEN) -> str:
+        """
+        :param screen: The id of the screen.
+        :return: The current frame of the screen, serialized as JSON.
+        """
+        return self._frames_json[self._slot(screen)]
+
+    def published_at(self, screen: Hashable = DEFAULT_SCREEN) -> float:
+        """
+        :param screen: The id of the screen.
+        :return: The monotonic time the current frame of the screen was published at.
+        """
+        return float(self._published_at[self._slot(screen)])
+
+    def tick(self, now: Optional[float] = None) -> None:
+        """
+        Moves every screen whose frame was displayed for the rotation interval to its next
+        pending navigation, or to its next ad.
+
+        :param now: The current monotonic time, defaults to time.monotonic().
+        """
+        now = time.monotonic() if now is None else now
+        count = len(self._screen_ids)
+        due = np.flatnonzero(now - self._published_at[:count] >= self.rotate_interval)
+        for slot in due.tolist():
+            if self._navigation_queues[slot]:
+                self._publish_navigation(slot, now)
+            else:
+                self._publish(slot, self._next_ad_frame(slot, now), now)
+
+    def subscribe(self, screen: Hashable = DEFAULT_SCREEN) -> asyncio.Queue:
+        """
+        Subscribes to the frames published for the given screen. Only the latest frame is kept
+        for slow subscribers.
+
+        :param screen: The id of the screen.
+        :return: A queue receiving (frame JSON, publish monotonic time) for every published frame
+                 of the screen, starting with the current one.
+        """
+        slot = self._slot(screen)
+        queue = asyncio.Queue(maxsize=1)
+        queue.put_nowait((self._frames_json[slot], time.monotonic()))
+        self._subscribers[slot].add(queue)
+        return queue
 
-    def get_data(self):
-        if self._pending_nav_call is not None:
-            self._last_navigation_call = time.time()
-            call = self._pending_nav_call
-            self._pending_nav_call = None
-            return call
-        ad = self.ad_provider.get_ad()
-        if time.time() - self._last_navigation_call > self.navigation_timeout:
-            ad["store"]["uppertext"] = "סרקו את הברקוד ותוכלו לקבל קופון הנחה!"
+    def unsubscribe(self, queue: asyncio.Queue, screen: Hashable = DEFAULT_SCREEN) -> None:
+        """
+        :param queue: A queue returned by 'subscribe'.
+        :param screen: The id of the screen the queue was subscribed to.
+        """
+        self._subscribers[self._slot(screen)].discard(queue)
+
+    def record_delivery(self, published_at: float, screen: Hashable = DEFAULT_SCREEN,
+                        now: Optional[float] = None) -> None:
+        """
+        Records that a frame was sent to the given screen.
+
+        :param published_at: The monotonic time the frame was published at.
+        :param screen: The id of the screen.
+        :param now: The current monotonic time, defaults to time.monotonic().
+        """
+        slot = self._slot(screen)
+        latency = (time.monotonic() if now is None else now) - published_at
+        self._delivered[slot] += 1
+        self._latency_sum[slot] += latency
+        self._latency_max[slot] = max(self._latency_max[slot], latency)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        :return: The frame counters of each screen, by screen id. The latency is the time from a
+                 frame publication to its sending on the screen stream, or in a poll response.
+        """
+        stats = {}
+        for slot, screen in enumerate(self._screen_ids):
+            delivered = int(self._delivered[slot])
+            stats[str(screen)] = {
+                "frames_published": self._versions[slot],
+                "frames_delivered": delivered,
+                "mean_latency_ms": round(1000 * self._latency_sum[slot] / delivered, 3)
+                if delivered else None,
+                "max_latency_ms": round(1000 * float(self._latency_max[slot]), 3),
+                "subscribers": len(self._subscribers[slot]),
+                "pending_navigations": len(self._navigation_queues[slot])}
+        return stats
+
+    def check_screen(self, screen: Hashable) -> None:
+        """
+        :param screen: The id of the screen.
+        :raises ValueError: If the screen is not served.
+        """
+        self._slot(screen)
+
+    def set_navigation_assets(self, navigation_assets: Dict[Any, str]) -> None:
+        """
+        Replaces the navigation assets, e.g. after the catalog was reloaded. Pending navigations
+        to stores which no longer have an asset are dropped.
+
+        :param navigation_assets: Mapping of store ids to their navigation asset.
+        """
+        self.navigation_assets = navigation_assets
+        for queue in self._navigation_queues:
+            pending = [store_id for store_id in queue if store_id in navigation_assets]
+            if len(pending) != len(queue):
+                queue.clear()
+                queue.extend(pending)
+
+    def force_next_ad(self, product, screen: Hashable = DEFAULT_SCREEN):
+        self._slot(screen)
+        self.ad_provider.force_next_ad(product, screen)
+
+    def set_data_for_navigation_asset(self, store_id, screen: Hashable = DEFAULT_SCREEN):
+        """
+        Queues the navigation to the given store on the given screen, displayed right away unless
+        the screen is displaying another navigation.
+
+        :param store_id: The id of the store, ignored if it has no navigation asset.
+        :param screen: The id of the screen.
+        """
+        if store_id not in self.navigation_assets:
+            return
+        slot = self._slot(screen)
+        queue = self._navigation_queues[slot]
+        if len(queue) == self.navigation_queue_size:
+            queue.popleft()
+        queue.append(store_id)
+        now = time.monotonic()
+        if not self._showing_navigation[slot] or \
+                now - self._published_at[slot] >= self.rotate_interval:
+            self._publish_navigation(slot, now)
+
+    def _slot(self, screen: Hashable) -> int:
+        """
+        :param screen: The id of the screen.
+        :return: The slot of the screen.
+        :raises ValueError: If the screen is not served.
+        """
+        slot = self._slots.get(screen)
+        if slot is None:
+            raise ValueError(f"Unknown screen {screen!r}.")
+        return slot
+
+    def _register(self, screen: Hashable) -> None:
+        """
+        Allocates a slot to the given screen, with the next ad as its frame.
+
+        :param screen: The id of the screen.
+        """
+        slot = len(self._screen_ids)
+        if slot == len(self._published_at):
+            capacity = max(4, 2 * slot)
+            self._published_at = np.resize(self._published_at, capacity)
+            self._last_navigation = np.resize(self._last_navigation, capacity)
+            self._showing_navigation = np.resize(self._showing_navigation, capacity)
+            self._delivered = np.resize(self._delivered, capacity)
+            self._latency_sum = np.resize(self._latency_sum, capacity)
+            self._latency_max = np.resize(self._latency_max, capacity)
+        self._slots[screen] = slot
+        self._screen_ids.append(screen)
+        self._frames.append({})
+        self._frames_json.append("")
+        self._versions.append(0)
+        self._subscribers.append(set())
+        self._navigation_queues.append(deque())
+        # Far in the past, so the QR code is displayed until the first navigation.
+        self._last_navigation[slot] = -np.inf
+        self._delivered[slot] = 0
+        self._latency_sum[slot] = 0.0
+        self._latency_max[slot] = 0.0
+        now = time.monotonic()
+        self._publish(slot, self._next_ad_frame(slot, now), now)
+
+    def _next_ad_frame(self, slot: int, now: float) -> Dict[str, Any]:
+        """
+        :param slot: The slot of the screen.
+        :param now: The current monotonic time.
+        :return: A frame of the next ad of the screen, with the QR code unless a navigation
+                 happened recently on it.
+        """
+        ad = self.ad_provider.get_ad(self._screen_ids[slot])
+        if now - self._last_navigation[slot] > self.navigation_timeout:
+            ad["store"]["uppertext"] = QR_UPPERTEXT
             ad["store"]["mapurl"] = self.qr_asset
         return ad
 
-    def force_next_ad(self, product):
-        self.ad_provider.force_next_ad(product)
+    def _publish_navigation(self, slot: int, now: float) -> None:
+        """
+        Publishes the oldest pending navigation of the given screen.
 
-    def set_data_for_navigation_asset(self, store_id):
-        ad = self.ad_provider.get_ad()
-        nav_asset = self.navigation_assets[store_id]
+        :param slot: The slot of the screen.
+        :param now: The current monotonic time.
+        """
+        store_id = self._navigation_queues[slot].popleft()
+        ad = self.ad_provider.get_ad(self._screen_ids[slot])
         ad["store"]["uppertext"] = ""
-        ad["store"]["mapurl"] = nav_asset
-        self._pending_nav_call = ad
-
+        ad["store"]["mapurl"] = self.navigation_assets[store_id]
+        self._last_navigation[slot] = now
+        self._publish(slot, ad, now, navigation=True)
 
+    def _publish(self, slot: int, frame: Dict[str, Any], now: float,
+                 navigation: bool = False) -> None:
+        """
+        Makes the given frame the current one of the given screen, and pushes it to the screen
+        subscribers.
 
+        :param slot: The slot of the screen.
+        :param frame: The frame to publish.
+        :param now: The current monotonic time.
+        :param navigation: Whether the frame is a navigation frame.
+        """
+        frame_json = json.dumps(frame, ensure_ascii=False)
+        self._frames[slot] = frame
+        self._frames_json[slot] = frame_json
+        self._versions[slot] += 1
+        self._published_at[slot] = now
+        self._showing_navigation[slot] = navigation
+        item: Tuple[str, float] = (frame_json, now)
+        for queue in self._subscribers[slot]:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(item)
@@ -1,6 +1,7 @@
+import json
 from enum import Enum
 from backend.server.sse_utils import sse_event
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Optional
 
 
 class SSEEventTypes(Enum):
@@ -40,6 +41,27 @@ def UI_update_event(event_type: SSEEventTypes, id: str, kind: str, role: str, te
     })
 
 
+def append_text_encoder(id: str, kind: str, role: str) -> Callable[[str], str]:
+    """
+    Creates an encoder of the append_text patch events of a single message. The fixed fields are
+    serialized once, so encoding a patch only serializes its text. The encoded events are
+    identical to the ones created by UI_update_event.
+
+    :param id: The id of the message.
+    :param kind: The kind of the message.
+    :param role: The role of the message.
+    :return: A function returning the patch SSE event appending the given text to the message.
+    """
+    marker = "\0"
+    template = UI_update_event(SSEEventTypes.PATCH, id, kind, role, text=marker,
+                               op="append_text")
+    prefix, suffix = template.split(json.dumps(marker), 1)
+
+    def encode(text: str) -> str:
+        return prefix + json.dumps(text, ensure_ascii=False) + suffix
+    return encode
+
+
 def tool_call_generated_event(name: str, args: str) -> str:
     """
     Creates a tool call generated event.
@@ -55,19 +77,17 @@ def tool_call_generated_event(name: str, args: str) -> str:
     return sse_event({"type": SSEEventTypes.TOOL_CALL_GENERATED.value, "data": data})
 
 
-def tool_output_generated_event(name: str, result: str) -> str:
+def tool_output_generated_event(name: str, result_json: str) -> str:
     """
-    Creates a tool output generated event.
+    Creates a tool output generated event. The result is embedded as is, so the event carries
+    the result object without parsing and serializing it again.
 
     :param name: The name of the tool.
-    :param result: The result of the tool.
+    :param result_json: The result of the tool, serialized on a single line as sent to the model.
     :return: The tool output generated SSE event.
     """
-    data = {
-        "name": name,
-        "result": result
-    }
-    return sse_event({"type": SSEEventTypes.TOOL_OUTPUT_GENERATED.value, "data": data})
+    return (f'data: {{"type": "{SSEEventTypes.TOOL_OUTPUT_GENERATED.value}", "data": '
+            f'{{"name": {json.dumps(name, ensure_ascii=False)}, "result": {result_json}}}}}\n\n')
 
 
 def done_event() -> str:
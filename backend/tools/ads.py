@@ -9,10 +9,10 @@ from db.queries import GET_ALL_ADS, GET_DEFAULT_AD_BY_STORE, GET_BEST_AD_BY_STOR
 def get_all_ads(_: AppRequestArgsBaseModel,
                conn: DatabaseConnection) -> CallOutput:
     cursor = conn.cursor()
-    rows = cursor.execute(GET_ALL_ADS).fetchall()
-    if len(rows) == 0:
+    ads = [AllStoreAdEntry(**r).model_dump() for r in cursor.execute(GET_ALL_ADS).iter_dicts()]
+    if len(ads) == 0:
         return error_output_with_message("No ads found.")
-    return CallOutput("success", {"ads": [AllStoreAdEntry(**r).model_dump() for r in rows]})
+    return CallOutput("success", {"ads": ads})
 
 
 def get_default_ad_for_store(request_args: IDArgs, conn: DatabaseConnection) -> CallOutput:
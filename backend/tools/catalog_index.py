@@ -0,0 +1,244 @@
+"""
+This module exposes an in-memory search index over the products catalog.
+
+Classes:
+    CatalogIndex: Token and trigram inverted index over product names, categories and store names.
+
+Functions:
+    normalize_text: Normalizes hebrew and english text for matching.
+"""
+import bisect
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from backend.db.database_connection import DatabaseConnection
+from backend.db.table_versions import TableVersions
+from db.queries import GET_ALL_PRODUCTS
+
+# Tables the index is derived from.
+CATALOG_TABLES = ("products", "stores")
+
+# Weights of each indexed field, a match on the product name is the most relevant.
+FIELD_WEIGHTS = {"product_name": 3.0, "store_name": 2.0, "category": 1.0}
+
+# Relative scores of the different kinds of token matches.
+EXACT_MATCH_SCORE = 1.0
+PREFIX_MATCH_SCORE = 0.8
+FUZZY_MATCH_SCORE = 0.6
+
+# Minimal trigram similarity for a vocabulary token to be considered a fuzzy match.
+FUZZY_MATCH_THRESHOLD = 0.5
+
+# Hebrew final letters, mapped to their regular form.
+_HEBREW_FINALS = str.maketrans("ךםןףץ", "כמנפצ")
+# Hebrew single letter prefixes (and, the, in, to, from, that, as).
+_HEBREW_PREFIXES = "והבלמשכ"
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalizes the given text for matching: lower case, without diacritics (including hebrew
+    niqqud), with hebrew final letters replaced by their regular form and punctuation replaced
+    by spaces.
+
+    :param text: The text to normalize.
+    :return: The normalized text.
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _NON_WORD.sub(" ", stripped.lower().translate(_HEBREW_FINALS)).strip()
+
+
+def _trigrams(token: str) -> Set[str]:
+    """
+    :param token: A normalized token.
+    :return: The trigrams of the token, padded so short tokens still have some.
+    """
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CatalogIndex:
+    """
+    Token and trigram inverted index over the product name, category and store name of each
+    product, answering the search_product tool without scanning the tables.
+    Query tokens are matched exactly, as a prefix of an indexed token, or by trigram similarity,
+    and the results are ranked by the weighted sum of their best match per query token.
+    The index is thread safe, and refreshed when the catalog tables versions change, including on
+    writes made by other processes, which the database pool detects. A refresh reads the whole
+    products table, as the database does not record which rows changed, but only re-indexes the
+    products that were added, modified or removed.
+    """
+
+    def __init__(self, table_versions: Optional[TableVersions] = None):
+        """
+        Initialize an empty index.
+
+        :param table_versions: Versions of the database tables, used to detect that the index is
+            stale. If not provided, the index is only refreshed explicitly.
+        """
+        self.table_versions = table_versions
+        self._version: Optional[Tuple[int, ...]] = None
+        self._lock = threading.RLock()
+        self._products: Dict[int, Dict[str, Any]] = {}
+        # Tokens of each product, alongside the weight of the best field they appear in.
+        self._product_tokens: Dict[int, Dict[str, float]] = {}
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self._trigram_postings: Dict[str, Set[str]] = defaultdict(set)
+        self._vocabulary: List[str] = []
+
+    def refresh(self, conn: DatabaseConnection) -> None:
+        """
+        Reads the whole catalog and re-indexes only the products that were added, modified or
+        removed. The catalog is read before locking the index, so searches are only held for the
+        re-indexing.
+
+        :param conn: The database connection.
+        """
+        # Taken before reading, so writes made during the read leave the index stale.
+        version = None if self.table_versions is None else \
+            self.table_versions.snapshot(CATALOG_TABLES)
+        rows = {r["product_id"]: r for r in conn.cursor().execute(GET_ALL_PRODUCTS).iter_dicts()}
+        with self._lock:
+            for product_id in list(self._products):
+                if product_id not in rows:
+                    self.remove(product_id)
+            for product_id, row in rows.items():
+                if self._products.get(product_id) != row:
+                    self.upsert(row)
+            self._version = version
+
+    def refresh_if_stale(self, conn: DatabaseConnection) -> None:
+        """
+        Refreshes the index if the catalog tables were modified since the last refresh.
+
+        :param conn: The database connection.
+        """
+        if self.table_versions is None:
+            return
+        if self.table_versions.snapshot(CATALOG_TABLES) != self._version:
+            self.refresh(conn)
+
+    def upsert(self, product: Dict[str, Any]) -> None:
+        """
+        Indexes the given product, replacing its previous entry if any.
+
+        :param product: The product, as returned by GET_ALL_PRODUCTS.
+        """
+        with self._lock:
+            product_id = product["product_id"]
+            if product_id in self._products:
+                self.remove(product_id)
+            tokens: Dict[str, float] = {}
+            for field, weight in FIELD_WEIGHTS.items():
+                field_tokens = normalize_text(str(product[field])).split()
+                # The joined form lets "rayban" match "Ray-ban".
+                if len(field_tokens) > 1:
+                    field_tokens.append("".join(field_tokens))
+                for token in field_tokens:
+                    tokens[token] = max(tokens.get(token, 0.0), weight)
+            for token, weight in tokens.items():
+                if token not in self._postings:
+                    self._add_to_vocabulary(token)
+                self._postings[token][product_id] = weight
+            self._products[product_id] = dict(product)
+            self._product_tokens[product_id] = tokens
+
+    def remove(self, product_id: int) -> None:
+        """
+        Removes the given product from the index, if indexed.
+
+        :param product_id: The id of the product.
+        """
+        with self._lock:
+            self._products.pop(product_id, None)
+            for token in self._product_tokens.pop(product_id, {}):
+                postings = self._postings[token]
+                postings.pop(product_id, None)
+                if not postings:
+                    del self._postings[token]
+                    self._remove_from_vocabulary(token)
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Searches the catalog for the given free text.
+
+        :param query: The product, category or store name to search for.
+        :param limit: The maximal number of results.
+        :return: The matching products, best matches first.
+        """
+        with self._lock:
+            scores: Dict[int, float] = defaultdict(float)
+            for query_token in normalize_text(query).split():
+                best: Dict[int, float] = {}
+                for token, match_score in self._match_token(query_token):
+                    for product_id, weight in self._postings[token].items():
+                        score = match_score * weight
+                        if score > best.get(product_id, 0.0):
+                            best[product_id] = score
+                for product_id, score in best.items():
+                    scores[product_id] += score
+            ranked = sorted(scores, key=lambda pid: (-scores[pid],
+                                                     self._products[pid]["store_id"],
+                                                     self._products[pid]["product_name"]))
+            return [dict(self._products[pid]) for pid in ranked[:limit]]
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def _match_token(self, query_token: str) -> Iterable[Tuple[str, float]]:
+        """
+        Finds the indexed tokens matching the given query token.
+
+        :param query_token: A normalized query token.
+        :return: Pairs of matching indexed tokens and their match score.
+        """
+        candidates = [query_token]
+        # "בארומה" should match "ארומה", but the prefix is only stripped from long enough tokens.
+        if len(query_token) >= 4 and query_token[0] in _HEBREW_PREFIXES:
+            candidates.append(query_token[1:])
+        matches: Dict[str, float] = {}
+        for candidate in candidates:
+            if candidate in self._postings:
+                matches[candidate] = EXACT_MATCH_SCORE
+            start = bisect.bisect_left(self._vocabulary, candidate)
+            for token in self._vocabulary[start:]:
+                if not token.startswith(candidate):
+                    break
+                matches.setdefault(token, PREFIX_MATCH_SCORE)
+            query_trigrams = _trigrams(candidate)
+            overlaps: Dict[str, int] = defaultdict(int)
+            for trigram in query_trigrams:
+                for token in self._trigram_postings.get(trigram, ()):
+                    overlaps[token] += 1
+            for token, overlap in overlaps.items():
+                similarity = overlap / len(query_trigrams | _trigrams(token))
+                if similarity >= FUZZY_MATCH_THRESHOLD:
+                    matches.setdefault(token, FUZZY_MATCH_SCORE * similarity)
+        return matches.items()
+
+    def _add_to_vocabulary(self, token: str) -> None:
+        """
+        :param token: A new indexed token.
+        """
+        bisect.insort(self._vocabulary, token)
+        for trigram in _trigrams(token):
+            self._trigram_postings[trigram].add(token)
+
+    def _remove_from_vocabulary(self, token: str) -> None:
+        """
+        :param token: An indexed token no product contains anymore.
+        """
+        index = bisect.bisect_left(self._vocabulary, token)
+        if index < len(self._vocabulary) and self._vocabulary[index] == token:
+            del self._vocabulary[index]
+        for trigram in _trigrams(token):
+            tokens = self._trigram_postings.get(trigram)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._trigram_postings[trigram]
@@ -4,6 +4,7 @@ This module exposes the output models for different tool calls.
 Classes:
     CallOutput: Class that represents the output of a tool call.
 """
+import json
 from dataclasses import dataclass
 from typing import List, Dict, Any
 
@@ -12,6 +13,14 @@ from typing import List, Dict, Any
 class CallOutput:
     """
     Base model for tool call output.
+    The data holds the database rows as is, they are validated against the db_models when the
+    catalog is loaded or written rather than on every call.
     """
     status: str
     data: Dict[str, Any]
+
+    def to_json(self) -> str:
+        """
+        :return: The output serialized the way it is sent to the model.
+        """
+        return json.dumps({"status": self.status, "data": self.data}, ensure_ascii=False)
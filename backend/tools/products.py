@@ -1,9 +1,11 @@
-from backend.db.db_models import ProductEntry, StoreInventoryEntry, CouponEntry
+import re
 from backend.tools.schemas import ProductRequestArts, IDArgs, AppRequestArgsBaseModel
 from backend.db.database_connection import DatabaseConnection
 from backend.tools.models import CallOutput
 from backend.tools.error_dict_factory import *
-from db.queries import SEARCH_PRODUCTS, GET_PRODUCTS_BY_STORE, GET_COUPON_BY_PRODUCT, GET_ALL_PRODUCTS
+from backend.tools.catalog_index import CatalogIndex
+from db.queries import SEARCH_PRODUCTS, GET_PRODUCTS_BY_STORE, GET_COUPON_BY_PRODUCT, \
+    GET_ALL_PRODUCTS, SEARCH_PRODUCTS_FTS
 
 
 def search_product(request_args: ProductRequestArts,
@@ -13,13 +15,39 @@ def search_product(request_args: ProductRequestArts,
                                             request_args.query, request_args.limit)).fetchall()
     if len(rows) == 0:
         return error_output_with_message("No matching products found.")
-    return CallOutput("success", {"products": [ProductEntry(**r).model_dump() for r in rows]})
+    return CallOutput("success", {"products": rows})
+
+
+def search_product_fts(request_args: ProductRequestArts,
+                       conn: DatabaseConnection) -> CallOutput:
+    tokens = re.findall(r"\w+", request_args.query)
+    if len(tokens) == 0:
+        return error_output_with_message("No matching products found.")
+    cursor = conn.cursor()
+    # Every token must prefix match, falling back to any token matching.
+    rows = []
+    for operator in (" AND ", " OR "):
+        match = operator.join(f'"{token}"*' for token in tokens)
+        rows = cursor.execute(SEARCH_PRODUCTS_FTS, (match, request_args.limit)).fetchall()
+        if len(rows) > 0 or len(tokens) == 1:
+            break
+    if len(rows) == 0:
+        return error_output_with_message("No matching products found.")
+    return CallOutput("success", {"products": rows})
+
+
+def search_product_in_index(request_args: ProductRequestArts, conn: DatabaseConnection,
+                            index: CatalogIndex) -> CallOutput:
+    index.refresh_if_stale(conn)
+    products = index.search(request_args.query, request_args.limit)
+    if len(products) == 0:
+        return error_output_with_message("No matching products found.")
+    return CallOutput("success", {"products": products})
 
 
 def get_all_products(_: AppRequestArgsBaseModel, conn: DatabaseConnection):
     cursor = conn.cursor()
-    rows = cursor.execute(GET_ALL_PRODUCTS).fetchall()
-    return [ProductEntry(**r).model_dump() for r in rows]
+    return cursor.execute(GET_ALL_PRODUCTS).fetchall()
 
 
 def get_products_by_store(request_args: IDArgs, conn: DatabaseConnection) -> CallOutput:
@@ -27,7 +55,7 @@ def get_products_by_store(request_args: IDArgs, conn: DatabaseConnection) -> Cal
     rows = cursor.execute(GET_PRODUCTS_BY_STORE, (request_args.id,)).fetchall()
     if len(rows) == 0:
         return error_output_with_message("No matching products found.")
-    return CallOutput("success", {"products": [StoreInventoryEntry(**r).model_dump() for r in rows]})
+    return CallOutput("success", {"products": rows})
 
 
 def get_coupon_for_product(request_args: IDArgs, conn: DatabaseConnection) -> CallOutput:
@@ -35,4 +63,4 @@ def get_coupon_for_product(request_args: IDArgs, conn: DatabaseConnection) -> Ca
     rows = cursor.execute(GET_COUPON_BY_PRODUCT, (request_args.id,)).fetchall()
     if len(rows) == 0:
         return error_output_with_message("No matching coupon found.")
-    return CallOutput("success", {"coupon": [CouponEntry(**r).model_dump() for r in rows]})
+    return CallOutput("success", {"coupon": rows})
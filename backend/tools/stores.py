@@ -1,4 +1,3 @@
-from backend.db.db_models import StoreEntry, CouponEntry, NavigationEntry
 from backend.tools.schemas import AppRequestArgsBaseModel, IDArgs
 from backend.db.database_connection import DatabaseConnection
 from backend.tools.models import CallOutput
@@ -12,7 +11,7 @@ def get_stores(_: AppRequestArgsBaseModel,
     rows = cursor.execute(GET_STORES).fetchall()
     if len(rows) == 0:
         return error_output_with_message("No stores found.")
-    return CallOutput("success", {"stores": [StoreEntry(**r).model_dump() for r in rows]})
+    return CallOutput("success", {"stores": rows})
 
 
 def get_store_by_id(request_args: IDArgs, conn: DatabaseConnection) -> CallOutput:
@@ -20,7 +19,7 @@ def get_store_by_id(request_args: IDArgs, conn: DatabaseConnection) -> CallOutpu
     row = cursor.execute(GET_STORE_BY_ID, (request_args.id,)).fetchone()
     if not row:
         return error_output_with_message("No matching store found.")
-    return CallOutput("success", {"store": StoreEntry(**row).model_dump()})
+    return CallOutput("success", {"store": row})
 
 
 def get_coupon_for_store(request_args: IDArgs, conn: DatabaseConnection) -> CallOutput:
@@ -28,7 +27,7 @@ def get_coupon_for_store(request_args: IDArgs, conn: DatabaseConnection) -> Call
     row = cursor.execute(GET_COUPON_BY_STORE, (request_args.id,)).fetchone()
     if not row:
         return error_output_with_message("No matching coupon found.")
-    return CallOutput("success", {"coupon": CouponEntry(**row).model_dump()})
+    return CallOutput("success", {"coupon": row})
 
 
 def get_navigation_for_store(request_args: IDArgs, conn: DatabaseConnection) -> CallOutput:
@@ -36,7 +35,7 @@ def get_navigation_for_store(request_args: IDArgs, conn: DatabaseConnection) ->
     row = cursor.execute(GET_NAVIGATION_ASSET_BY_STORE, (request_args.id,)).fetchone()
     if not row:
         return error_output_with_message("No matching navigation asset found.")
-    return CallOutput("success", {"asset": NavigationEntry(**row).model_dump()})
+    return CallOutput("success", {"asset": row})
 
 
 def set_navigation_for_store(request_args: IDArgs, conn: DatabaseConnection) -> CallOutput:
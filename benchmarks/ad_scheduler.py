@@ -0,0 +1,96 @@
+"""
+Microbenchmark of the ad rotation, comparing the former per window draw (np.random.choice over
+the whole catalog every window_size frames) with the AdScheduler drawing batches of windows,
+for many screens sharing one catalog.
+
+Run from the repository root:
+    python -m benchmarks.ad_scheduler --products 2000 --screens 500
+"""
+import argparse
+import time
+
+import numpy as np
+
+from backend.server.ad_catalog import AdCatalog
+from backend.server.ad_scheduler import AdScheduler
+
+
+def _create_catalog(products: int, stores: int) -> AdCatalog:
+    """
+    :param products: The number of products.
+    :param stores: The number of stores, each advertising every category of its products.
+    :return: A catalog with varied weights, a tenth of the ads being capped.
+    """
+    rng = np.random.default_rng(0)
+    product_rows = [{"product_id": i, "product_name": f"מוצר {i}", "store_id": i % stores,
+                     "category": f"קטגוריה {i % 20}"} for i in range(products)]
+    ad_rows = [{"ad_id": i, "store_id": i % stores, "category": f"קטגוריה {i // stores}",
+                "asset_url": f"https://ads.example/{i}.png",
+                "logo_url": "https://ads.example/l.png", "is_active": True, "weight": float(rng.uniform(0.5, 5)),
+                "max_impressions_per_hour": 100 if i % 10 == 0 else None}
+               for i in range(stores * 20)]
+    return AdCatalog(product_rows, ad_rows)
+
+
+def _choice_rotation(catalog: AdCatalog, screens: int, frames: int, window_size: int) -> float:
+    """
+    The former rotation, one window per screen drawn every window_size frames.
+
+    :return: The elapsed time in seconds.
+    """
+    probs = np.random.dirichlet(np.ones(len(catalog)), size=1)[0]
+    windows = [np.random.choice(len(catalog), size=window_size, replace=False, p=probs)
+               for _ in range(screens)]
+    cursors = [0] * screens
+    start = time.perf_counter()
+    for frame in range(frames):
+        screen = frame % screens
+        _ = catalog.records[windows[screen][cursors[screen]]]
+        cursors[screen] += 1
+        if cursors[screen] == window_size:
+            windows[screen] = np.random.choice(len(catalog), size=window_size, replace=False,
+                                               p=probs)
+            cursors[screen] = 0
+    return time.perf_counter() - start
+
+
+def _scheduler_rotation(catalog: AdCatalog, screens: int, frames: int, window_size: int,
+                        batch_windows: int) -> float:
+    """
+    The current rotation, through the AdScheduler.
+
+    :return: The elapsed time in seconds.
+    """
+    scheduler = AdScheduler(catalog, window_size, batch_windows, seed=0)
+    now = time.monotonic()
+    start = time.perf_counter()
+    for frame in range(frames):
+        _ = catalog.records[scheduler.next_ad(frame % screens, now)]
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=2000, help="Number of products.")
+    parser.add_argument("--stores", type=int, default=50, help="Number of stores.")
+    parser.add_argument("--screens", type=int, default=500, help="Number of screens.")
+    parser.add_argument("--frames", type=int, default=200000, help="Number of frames served.")
+    parser.add_argument("--window-size", type=int, default=5, help="Ads per rotation window.")
+    parser.add_argument("--batch-windows", type=int, default=64,
+                        help="Windows drawn at once by the scheduler.")
+    args = parser.parse_args()
+
+    catalog = _create_catalog(args.products, args.stores)
+    results = {
+        "choice": _choice_rotation(catalog, args.screens, args.frames, args.window_size),
+        "scheduler": _scheduler_rotation(catalog, args.screens, args.frames, args.window_size,
+                                         args.batch_windows),
+    }
+    for name, elapsed in results.items():
+        print(f"{name:>9}: {args.frames / elapsed:12,.0f} frames/s")
+    print(f"  speedup: {results['choice'] / results['scheduler']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
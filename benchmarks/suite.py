@@ -0,0 +1,335 @@
+"""
+Microbenchmark suite of the request hot paths, run at the seed data size and at synthetic
+multiples of it. A scale of N holds N copies of the seed stores, with their products, coupons,
+navigation assets and ads, and N screens; the payload benchmarks (SSE encoding, language
+detection, token counting, tool usage summaries) repeat their seed inputs N times.
+Results can be saved as a JSON baseline, and compared with a previous baseline, flagging the
+benchmarks which got slower than the threshold. The comparison exits with status 1 on regressions.
+The timings are compared relative to the median change of all the benchmarks at the same scale,
+so a machine, or a run, uniformly faster or slower than the baseline one flags nothing; the
+median change is printed, as a slowdown shared by most benchmarks is not flagged either. The
+threshold is also widened by the spread of the timing rounds of each benchmark, so noisy
+benchmarks are only flagged on slowdowns larger than their noise.
+
+Run from the repository root:
+    python -m benchmarks.suite --scales 1 10 100 --compare benchmarks/baseline.json
+The committed baseline, benchmarks/baseline.json, is regenerated when an intended change moves
+the timings, or when benchmarks are added or removed, committing it alongside the change:
+    python -m benchmarks.suite --scales 1 10 100 --save benchmarks/baseline.json
+The relative comparison only corrects for the overall speed of a machine, so comparisons across
+machines remain approximate. For a precise comparison, save a baseline of the previous commit on
+the same machine first, e.g. to /tmp/baseline.json, and compare with it.
+"""
+import argparse
+import itertools
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+from collections import defaultdict
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.db.catalog_loader import load_catalog
+from backend.db.database_connection import DatabaseConnection
+from backend.db.init_db import init_db_if_needed
+from backend.db.sqlite_connection import get_db
+from backend.db.sqlite_pool import SQLitePool
+from backend.language_utils import detect_supported_language
+from backend.model.message import Message
+from backend.model.openai.chat_utils import count_tokens
+from backend.model.openai.tool_usage_parser import create_summary_format, parse_tool_usage
+from backend.model.tool_manager import ToolManager
+from backend.server.ad_catalog import AdCatalog
+from backend.server.ad_provider import MockAdProvider
+from backend.server.novisign_provider import NovisignProvider
+from backend.server.sse_factory import SSEEventTypes, UI_update_event
+from backend.server.sse_utils import sse_event
+from backend.tools.ads import get_all_ads
+from backend.tools.products import get_all_products
+from db.queries import GET_ALL_PRODUCTS, GET_NAVIGATION_ASSETS
+
+DEFAULT_SCALES = (1, 10, 100, 1000)
+
+# Number of benchmarks a scale needs for the timings to be compared relative to their median change.
+MIN_RELATIVE_BENCHMARKS = 3
+
+# Arguments of each tool call, picked to hit the seed data.
+TOOL_ARGS = {
+    "get_stores": "",
+    "get_store_by_id": '{"id": 1}',
+    "get_coupon_for_store": '{"id": 1}',
+    "search_product": '{"query": "נעלי"}',
+    "get_products_by_store": '{"id": 1}',
+    "get_coupon_for_product": '{"id": 1}',
+    "set_navigation_for_store": '{"id": 1}',
+}
+
+# Seed inputs of the payload benchmarks, repeated scale times.
+SEED_QUESTION = "איפה אפשר לקנות נעלי ריצה? I need them for the marathon."
+SEED_REPLY = "You can find running shoes at Teva Naot, on the first floor next to Aroma. "
+SEED_TOOL_USAGE = [
+    {"type": "function_call", "name": "search_product", "arguments": '{"query": "נעלי ריצה"}'},
+    {"type": "function_call_output",
+     "output": '{"status": "success", "data": {"products": [{"product_name": "נעלי ריצה", '
+               '"category": "הנעלה", "store_name": "טבע נאות"}]}}'},
+]
+SEED_MESSAGES = [Message("user", SEED_QUESTION), Message("assistant", SEED_REPLY)]
+
+# Tables copied when scaling the seed, in foreign key order, alongside their columns.
+SCALED_TABLES = {
+    "stores": ("store_id", "store_name"),
+    "store_navigation": ("store_id", "map_target_id", "route_path_d"),
+    "coupons": ("store_id", "coupon_code"),
+    "products": ("product_name", "category", "store_id"),
+    "ads": ("store_id", "ad_type", "asset_url", "logo_url", "category", "is_active", "weight",
+            "max_impressions_per_hour"),
+}
+
+
+def _create_db(path: Path, scale: int) -> None:
+    """
+    Creates a database holding the seed data, and scale - 1 copies of it with distinct store ids,
+    store names and coupon codes.
+
+    :param path: The path of the database.
+    :param scale: The number of copies of the seed data.
+    """
+    init_db_if_needed(partial(get_db, str(path)), str(path))
+    conn = get_db(str(path))
+    try:
+        cursor = conn.cursor()
+        seed = {table: cursor.execute(f"SELECT {', '.join(columns)} FROM {table};").fetchall()
+                for table, columns in SCALED_TABLES.items()}
+        offset = max(r["store_id"] for r in seed["stores"])
+        catalog = {table: [] for table in SCALED_TABLES}
+        for copy in range(1, scale):
+            for table, rows in seed.items():
+                for row in rows:
+                    row = dict(row, store_id=row["store_id"] + copy * offset)
+                    if table == "stores":
+                        row["store_name"] = f"{row['store_name']} {copy}"
+                    elif table == "coupons":
+                        row["coupon_code"] = f"{row['coupon_code']}_{copy}"
+                    catalog[table].append(row)
+        if scale > 1:
+            load_catalog(conn, catalog)
+    finally:
+        conn.close()
+
+
+def _time(fn: Callable[[], Any], repeat: int, min_time_s: float) -> Dict[str, Any]:
+    """
+    Times the given function, calling it enough times per round for the round to last at least
+    the given time.
+
+    :param fn: The function to time.
+    :param repeat: The number of timing rounds.
+    :param min_time_s: The minimal duration of a round.
+    :return: The best and median time per call in seconds, alongside the calls per round.
+    """
+    number = 1
+    elapsed = timeit.timeit(fn, number=number)
+    while elapsed < min_time_s:
+        number = max(number * 2, int(number * min_time_s / max(elapsed, 1e-9) * 1.1))
+        elapsed = timeit.timeit(fn, number=number)
+    timings = [elapsed] + timeit.repeat(fn, repeat=repeat - 1, number=number)
+    per_call = [t / number for t in timings]
+    return {"best_s": min(per_call), "median_s": statistics.median(per_call), "calls": number}
+
+
+def _tokens_available() -> bool:
+    """
+    :return: Whether count_tokens can run, as the encoding is downloaded on first use.
+    """
+    try:
+        count_tokens("")
+        return True
+    except Exception as e:
+        print(f"Skipping tokens.count_tokens, the encoding could not be loaded: {e}")
+        return False
+
+
+def _benchmarks(pool: SQLitePool, conn: DatabaseConnection, scale: int,
+                count_tokens_enabled: bool) -> Dict[str, Callable[[], Any]]:
+    """
+    :param pool: The pool of a database created by '_create_db' at the given scale.
+    :param conn: A connection borrowed from the pool, used by the benchmarks reading directly.
+    :param scale: The scale of the database and payloads.
+    :param count_tokens_enabled: Whether to benchmark count_tokens.
+    :return: The benchmarked functions, by benchmark name.
+    """
+    tool_manager = ToolManager(pool)
+    products = get_all_products(None, conn=conn)
+    ads = get_all_ads(None, conn).data.get("ads", [])
+    stores_output = tool_manager.call_tool("get_stores", "")
+    assets = {r["store_id"]: r["route_path_d"]
+              for r in conn.cursor().execute(GET_NAVIGATION_ASSETS).fetchall()}
+    screens = [f"screen-{i}" for i in range(scale)]
+    ad_provider = MockAdProvider(conn)
+    novisign = NovisignProvider(MockAdProvider(conn), "qr.png", assets, screens=screens)
+    ad_screens = itertools.cycle(screens)
+    # Every tick is a full rotation interval after the previous one, so it rotates all screens.
+    ticks = itertools.count(time.monotonic() + novisign.rotate_interval, novisign.rotate_interval)
+    question, reply = SEED_QUESTION * scale, SEED_REPLY * scale
+    tool_usage, messages = SEED_TOOL_USAGE * scale, SEED_MESSAGES * scale
+
+    benchmarks = {"db.fetchall": lambda: conn.cursor().execute(GET_ALL_PRODUCTS).fetchall()}
+    for name, args in TOOL_ARGS.items():
+        benchmarks[f"tool.{name}"] = partial(tool_manager.call_tool, name, args)
+    benchmarks.update({
+        "sse.sse_event": lambda: sse_event(stores_output),
+        "sse.UI_update_event": lambda: UI_update_event(SSEEventTypes.RENDER, "msg-1", "text",
+                                                       "assistant", reply),
+        "language.detect_supported_language": lambda: detect_supported_language(question),
+        "summary.parse_tool_usage": lambda: parse_tool_usage(tool_usage),
+        "summary.create_summary_format": lambda: create_summary_format(tool_usage, messages,
+                                                                       SEED_REPLY),
+        "ads.catalog_build": lambda: AdCatalog(products, ads),
+        # compile_ads replaced build_ads, it builds the catalog and the scheduler of the provider.
+        "ads.build_ads": partial(ad_provider.compile_ads, conn),
+        "ads.get_ad": lambda: ad_provider.get_ad(next(ad_screens)),
+        "novisign.tick": lambda: novisign.tick(next(ticks)),
+    })
+    if count_tokens_enabled:
+        benchmarks["tokens.count_tokens"] = lambda: count_tokens(question)
+    return benchmarks
+
+
+def run(scales: List[int], repeat: int, min_time_s: float,
+        name_filter: Optional[str] = None) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    Runs the suite at each of the given scales.
+
+    :param scales: The scales to run at.
+    :param repeat: The number of timing rounds of each benchmark.
+    :param min_time_s: The minimal duration of a timing round.
+    :param name_filter: Optional substring the names of the benchmarks to run must contain.
+    :return: The timings of each benchmark, by benchmark name and scale.
+    """
+    results: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    count_tokens_enabled = _tokens_available()
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in scales:
+            path = Path(directory) / f"scale_{scale}.db"
+            _create_db(path, scale)
+            pool = SQLitePool(partial(get_db, str(path)),
+                              partial(get_db, str(path), readonly=True), size=2)
+            try:
+                with pool.connection() as conn:
+                    benchmarks = _benchmarks(pool, conn, scale, count_tokens_enabled)
+                    for name, fn in benchmarks.items():
+                        if name_filter and name_filter not in name:
+                            continue
+                        timing = _time(fn, repeat, min_time_s)
+                        results.setdefault(name, {})[str(scale)] = timing
+                        print(f"{name:<36} x{scale:<5} {timing['best_s'] * 1e6:12.2f} us/call")
+            finally:
+                pool.close()
+    return results
+
+
+def compare(baseline: Dict[str, Dict[str, Dict[str, Any]]],
+            current: Dict[str, Dict[str, Dict[str, Any]]], threshold: float,
+            scales: Optional[List[int]] = None,
+            name_filter: Optional[str] = None) -> List[Tuple[str, str, float]]:
+    """
+    Compares the best times of the benchmarks found in both results, relative to the median
+    change of the best times at the same scale, unless fewer than MIN_RELATIVE_BENCHMARKS ran at
+    it, e.g. with a narrow filter. A benchmark is a regression when its relative
+    time grew by more than the threshold plus the spread of its timing rounds (the median over
+    the best time, in the noisier of the two results). The benchmarks found in only one of the
+    results are listed as well, e.g. count_tokens skipped while offline, at the scales and with
+    the filter of the current run.
+
+    :param baseline: The baseline results, as returned by 'run'.
+    :param current: The current results, as returned by 'run'.
+    :param threshold: The relative slowdown above which a benchmark is a regression, e.g. 0.25.
+    :param scales: The scales of the current run, defaults to the scales found in its results.
+    :param name_filter: The filter of the current run, the baseline benchmarks it excludes are
+                        not listed as missing.
+    :return: The regressions, as (benchmark name, scale, relative current / baseline time).
+    """
+    run_scales = {str(scale) for scale in scales} if scales is not None else \
+        {scale for timings in current.values() for scale in timings}
+    missing = [(name, scale) for name, scales in baseline.items() for scale in scales
+               if scale in run_scales and scale not in current.get(name, {}) and
+               (name_filter is None or name_filter in name)]
+    changes: Dict[str, List[float]] = defaultdict(list)
+    for name, scales in current.items():
+        for scale, timing in scales.items():
+            if scale in baseline.get(name, {}):
+                changes[scale].append(timing["best_s"] / baseline[name][scale]["best_s"])
+    median_change = {scale: statistics.median(ratios) for scale, ratios in changes.items()
+                     if len(ratios) >= MIN_RELATIVE_BENCHMARKS}
+    if median_change:
+        print("Median change of the best times, by scale: " + ", ".join(
+            f"x{scale} {ratio:.2f}x" for scale, ratio in sorted(median_change.items(),
+                                                                key=lambda item: int(item[0]))))
+    regressions = []
+    for name, scales in current.items():
+        for scale, timing in scales.items():
+            before = baseline.get(name, {}).get(scale)
+            if before is None:
+                print(f"{name:<36} x{scale:<5} {'':>12}    {timing['best_s'] * 1e6:12.2f} "
+                      f"us/call         no baseline")
+                continue
+            ratio = timing["best_s"] / before["best_s"] / median_change.get(scale, 1.0)
+            noise = max(t["median_s"] / t["best_s"] for t in (before, timing)) - 1
+            limit = 1 + threshold + noise
+            flag = "REGRESSION" if ratio > limit else "improved" if ratio < 1 / limit else ""
+            print(f"{name:<36} x{scale:<5} {before['best_s'] * 1e6:12.2f} -> "
+                  f"{timing['best_s'] * 1e6:12.2f} us/call {ratio:6.2f}x {flag}")
+            if flag == "REGRESSION":
+                regressions.append((name, scale, ratio))
+    for name, scale in missing:
+        print(f"{name:<36} x{scale:<5} {baseline[name][scale]['best_s'] * 1e6:12.2f} -> "
+              f"{'':>12}         MISSING, skipped or removed")
+    if missing:
+        print(f"{len(missing)} baseline benchmark(s) did not run.")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=list(DEFAULT_SCALES),
+                        help="Multiples of the seed data to run at.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timing rounds.")
+    parser.add_argument("--min-time-ms", type=float, default=50,
+                        help="Minimal duration of a timing round.")
+    parser.add_argument("--filter", help="Only run the benchmarks whose name contains this.")
+    parser.add_argument("--save", type=Path, help="Path to save the results to as a baseline.")
+    parser.add_argument("--compare", type=Path, help="Path of a baseline to compare with.")
+    parser.add_argument("--threshold", type=float, default=0.5,
+                        help="Relative slowdown above which a benchmark is a regression, on top "
+                             "of the spread of its timing rounds.")
+    args = parser.parse_args()
+
+    results = run(args.scales, args.repeat, args.min_time_ms / 1000, args.filter)
+    if args.save:
+        args.save.write_text(json.dumps({
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": results,
+        }, indent=2), encoding="utf-8")
+        print(f"Saved the results to {args.save}")
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        print(f"\nCompared with {args.compare} ({baseline.get('created_at')}):")
+        regressions = compare(baseline["results"], results, args.threshold, args.scales,
+                              args.filter)
+        if regressions:
+            print(f"{len(regressions)} regressions above {args.threshold:.0%}.")
+            sys.exit(1)
+        print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Microbenchmark of the tool output path, comparing the former per call pydantic round trip
+(model per row, model_dump, asdict, json.dumps) with the fast path serializing the cursor rows
+straight to the JSON string sent to the model.
+
+Run from the repository root:
+    python -m benchmarks.tool_output --products 5000
+"""
+import argparse
+import json
+import timeit
+from dataclasses import asdict
+from pathlib import Path
+
+from backend.db.db_models import StoreInventoryEntry
+from backend.db.db_utils import execute_sql_script
+from backend.db.sqlite_connection import SQLiteWrapper
+from backend.tools.models import CallOutput
+from backend.tools.products import get_products_by_store
+from backend.tools.schemas import IDArgs
+from db.queries import GET_PRODUCTS_BY_STORE
+
+SCHEMA_PATH = Path(__file__).resolve().parent.parent / "db" / "schema.sql"
+
+
+def _create_db(products: int) -> SQLiteWrapper:
+    """
+    :param products: The number of products of the single store.
+    :return: An in-memory database holding one store with the given number of products.
+    """
+    conn = SQLiteWrapper(":memory:")
+    execute_sql_script(conn, SCHEMA_PATH.read_text(encoding="utf-8"))
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO stores (store_id, store_name) VALUES (1, 'חנות');")
+    cursor.executemany("INSERT INTO products (product_name, category, store_id) VALUES (?, ?, 1);",
+                       ((f"מוצר {i}", f"קטגוריה {i % 20}") for i in range(products)))
+    conn.commit()
+    return conn
+
+
+def _pydantic_path(conn: SQLiteWrapper) -> str:
+    """
+    The former output path of get_products_by_store, as sent to the model.
+    """
+    rows = conn.cursor().execute(GET_PRODUCTS_BY_STORE, (1,)).fetchall()
+    output = CallOutput("success",
+                        {"products": [StoreInventoryEntry(**r).model_dump() for r in rows]})
+    return json.dumps(asdict(output), ensure_ascii=False)
+
+
+def _fast_path(conn: SQLiteWrapper) -> str:
+    """
+    The current output path of get_products_by_store, as sent to the model.
+    """
+    return get_products_by_store(IDArgs(id=1), conn).to_json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=5000,
+                        help="Number of products returned by the call.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timing rounds.")
+    parser.add_argument("--number", type=int, default=20, help="Calls per timing round.")
+    args = parser.parse_args()
+
+    conn = _create_db(args.products)
+    if _pydantic_path(conn) != _fast_path(conn):
+        raise RuntimeError("The fast path output differs from the pydantic path output.")
+    results = {}
+    for name, path in (("pydantic", _pydantic_path), ("fast", _fast_path)):
+        timings = timeit.repeat(lambda: path(conn), repeat=args.repeat, number=args.number)
+        results[name] = min(timings) / args.number
+        print(f"{name:>9}: {results[name] * 1000:8.3f} ms/call")
+    print(f"  savings: {(results['pydantic'] - results['fast']) * 1000:8.3f} ms/call "
+          f"({results['pydantic'] / results['fast']:.1f}x faster)")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
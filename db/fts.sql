@@ -0,0 +1,32 @@
+-- FULL TEXT SEARCH over products and the name of their store, the rowid is the product_id.
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+  product_name,
+  category,
+  store_name,
+  store_id UNINDEXED,
+  tokenize = 'unicode61 remove_diacritics 2'
+);
+
+-- Keep products_fts in sync with products and stores.
+CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+  INSERT INTO products_fts (rowid, product_name, category, store_name, store_id)
+  SELECT NEW.product_id, NEW.product_name, NEW.category, s.store_name, s.store_id
+  FROM stores s
+  WHERE s.store_id = NEW.store_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+  DELETE FROM products_fts WHERE rowid = OLD.product_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE ON products BEGIN
+  DELETE FROM products_fts WHERE rowid = OLD.product_id;
+  INSERT INTO products_fts (rowid, product_name, category, store_name, store_id)
+  SELECT NEW.product_id, NEW.product_name, NEW.category, s.store_name, s.store_id
+  FROM stores s
+  WHERE s.store_id = NEW.store_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stores_fts_update AFTER UPDATE OF store_name ON stores BEGIN
+  UPDATE products_fts SET store_name = NEW.store_name WHERE store_id = NEW.store_id;
+END;
@@ -46,6 +46,31 @@ ORDER BY s.store_id, p.product_name
 LIMIT ?;
 """
 
+# Search products through the full text index, ranked by bm25 with the product name weighted
+# the most, then the store name, then the category. The first parameter is an FTS5 query.
+SEARCH_PRODUCTS_FTS = """
+SELECT
+  rowid AS product_id,
+  product_name,
+  category,
+  store_id,
+  store_name
+FROM products_fts
+WHERE products_fts MATCH ?
+ORDER BY bm25(products_fts, 10.0, 1.0, 5.0, 0.0)
+LIMIT ?;
+"""
+
+CHECK_FTS_EXISTS = "SELECT name FROM sqlite_master WHERE type='table' AND name='products_fts';"
+
+# Fill the full text index from the current products (used when the index is first created)
+POPULATE_PRODUCTS_FTS = """
+INSERT INTO products_fts (rowid, product_name, category, store_name, store_id)
+SELECT p.product_id, p.product_name, p.category, s.store_name, s.store_id
+FROM products p
+JOIN stores s ON s.store_id = p.store_id;
+"""
+
 # Get all products for a specific store (optional helper endpoint)
 GET_PRODUCTS_BY_STORE = """
 SELECT
@@ -67,6 +92,26 @@ JOIN store_navigation n ON n.store_id = s.store_id
 WHERE s.store_id = ?;
 """
 
+# Get the navigation assets of all stores (used to validate the catalog)
+GET_ALL_NAVIGATION_ASSETS = """
+SELECT
+  s.store_id,
+  s.store_name,
+  n.map_target_id,
+  n.route_path_d
+FROM stores s
+JOIN store_navigation n ON n.store_id = s.store_id;
+"""
+
+# Columns of the ads table (used to add the scheduling columns to older databases)
+GET_ADS_COLUMNS = "SELECT name FROM pragma_table_info('ads');"
+
+# List the alternative names of the stores (used by the intent router)
+GET_STORE_ALIASES = """
+SELECT alias, store_id
+FROM store_aliases;
+"""
+
 CHECK_DB_EXISTS = "SELECT name FROM sqlite_master WHERE type='table' AND name='products';"
 
 # Get coupon by store ID
@@ -76,6 +121,12 @@ FROM coupons
 WHERE store_id = ?;
 """
 
+# List all coupons (used to validate the catalog)
+GET_ALL_COUPONS = """
+SELECT store_id, coupon_code
+FROM coupons;
+"""
+
 # Get coupon by product ID (because the flow is: product -> store -> coupon)
 GET_COUPON_BY_PRODUCT = """
 SELECT c.store_id, c.coupon_code
@@ -94,7 +145,9 @@ SELECT
   logo_url,
   category,
   is_active,
-  created_at
+  created_at,
+  weight,
+  max_impressions_per_hour
 FROM ads
 ORDER BY ad_id DESC;
 """
@@ -136,6 +189,10 @@ ad_id DESC
 LIMIT 1;
 """
 
+# Ad writes. The server itself does not write the ads: they are written by other processes, whose
+# commits running servers detect through 'SQLitePool.poll_external_writes'. In process writers
+# must go through 'SQLitePool.writer(("ads",))', so the ad caches are invalidated.
+
 # Disable an ad (soft delete)
 DISABLE_AD_BY_ID = """
 UPDATE ads
@@ -152,4 +209,45 @@ WHERE ad_id = ?;
 GET_NAVIGATION_ASSETS = """
 SELECT store_id, map_target_id, route_path_d
 FROM store_navigation
-"""
\ No newline at end of file
+"""
+
+# Bulk catalog load (used by the catalog loader, the parameters follow the column order)
+INSERT_STORE = """
+INSERT INTO stores (store_id, store_name)
+VALUES (?, ?);
+"""
+
+INSERT_STORE_NAVIGATION = """
+INSERT INTO store_navigation (store_id, map_target_id, route_path_d)
+VALUES (?, ?, ?);
+"""
+
+INSERT_COUPON = """
+INSERT INTO coupons (store_id, coupon_code)
+VALUES (?, ?);
+"""
+
+# Definitions of the indexes and triggers of a table (dropped and recreated around bulk loads)
+GET_TABLE_INDEXES_AND_TRIGGERS = """
+SELECT type, name, sql
+FROM sqlite_master
+WHERE tbl_name = ?
+  AND type IN ('index', 'trigger')
+  AND sql IS NOT NULL;
+"""
+
+# Empty the full text index (before populating it again from the products)
+CLEAR_PRODUCTS_FTS = """
+DELETE FROM products_fts;
+"""
+
+INSERT_PRODUCT = """
+INSERT INTO products (product_id, product_name, category, store_id)
+VALUES (?, ?, ?, ?);
+"""
+
+INSERT_AD = """
+INSERT INTO ads (ad_id, store_id, ad_type, asset_url, logo_url, category, is_active, weight,
+                 max_impressions_per_hour)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
+"""
@@ -42,6 +42,8 @@ CREATE TABLE IF NOT EXISTS ads (
   category    TEXT    NOT NULL,
   is_active  INTEGER NOT NULL DEFAULT 1 CHECK (is_active IN (0,1)),
   created_at TEXT    NOT NULL DEFAULT (datetime('now')),
+  weight     REAL    NOT NULL DEFAULT 1.0 CHECK (weight >= 0),
+  max_impressions_per_hour INTEGER,
   FOREIGN KEY (store_id) REFERENCES stores(store_id)
 );
 
@@ -0,0 +1,29 @@
+-- STORE ALIASES: alternative names of the stores (english names, spellings), matched by the
+-- intent router. The seed aliases are only added for the stores that exist.
+CREATE TABLE IF NOT EXISTS store_aliases (
+  alias      TEXT    PRIMARY KEY,
+  store_id   INTEGER NOT NULL,
+
+  FOREIGN KEY (store_id) REFERENCES stores(store_id) ON DELETE CASCADE
+);
+
+INSERT OR IGNORE INTO store_aliases (alias, store_id)
+SELECT a.column1, s.store_id
+FROM (VALUES
+  ('super pharm', 'סופר פארם'),
+  ('superpharm', 'סופר פארם'),
+  ('super-pharm', 'סופר פארם'),
+  ('סופרפארם', 'סופר פארם'),
+  ('סופר-פארם', 'סופר פארם'),
+  ('סופר פרם', 'סופר פארם'),
+  ('aroma', 'ארומה'),
+  ('aroma cafe', 'ארומה'),
+  ('קפה ארומה', 'ארומה'),
+  ('teva naot', 'טבע נאות'),
+  ('tevanaot', 'טבע נאות'),
+  ('טבע נעות', 'טבע נאות'),
+  ('opticana', 'אופטיקנה'),
+  ('optikana', 'אופטיקנה'),
+  ('אופטיקאנה', 'אופטיקנה')
+) a
+JOIN stores s ON s.store_name = a.column2;
@@ -5,6 +5,10 @@ const inputEl = document.getElementById("user-input");
 
 const appEl = document.getElementById("app");
 let conversation = [];
+// Identifies this page's conversation, so the backend keeps a separate history per kiosk.
+const sessionId = Date.now().toString(36) + Math.random().toString(36).slice(2);
+// The signage screen next to this kiosk, e.g. index.html?screen=entrance-1.
+const screenId = new URLSearchParams(window.location.search).get("screen") || "default";
 
 // Map of rendered items by id -> DOM element
 const elById = new Map();
@@ -100,7 +104,7 @@ async function streamOnce() {
   const resp = await fetch("/chat/stream", {
     method: "POST",
     headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ conversation }),
+    body: JSON.stringify({ conversation, session_id: sessionId, screen_id: screenId }),
   });
 
   if (!resp.ok || !resp.body) {
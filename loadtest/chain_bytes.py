@@ -0,0 +1,103 @@
+"""
+Compares the request bytes sent to the model with and without response chaining
+(CHAIN_RESPONSES in cfg.json), offline against the model stand-in of loadtest/openai_stub.py.
+Runs the same conversation once per mode: a few turns asking a question answered with two rounds
+of tool calls, as the kiosks do, with the tools running against a temporary copy of the seed
+database. The stub runs in process, so nothing has to be started beforehand:
+    python -m loadtest.chain_bytes --turns 3
+The instructions and the tool schemas are sent with every request in both modes, so chaining only
+saves the history, and saves more the longer the conversation.
+
+Functions:
+    run_conversation: Runs a conversation against the stub and returns the stub statistics.
+    main: Command line entry point printing the request bytes of both modes.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+from functools import partial
+from typing import Any, Dict
+
+import httpx
+from openai import AsyncOpenAI
+
+from backend.db.init_db import init_db_if_needed
+from backend.db.sqlite_connection import get_db
+from backend.db.sqlite_pool import SQLitePool
+from backend.model.chat_events_factory import ChatEventType
+from backend.model.message import Message
+from backend.model.openai.client import OpenAIToolResponseProvider
+from backend.model.tool_manager import ToolManager, AsyncToolManager
+from backend.server.main import SYSTEM_INSTRUCTIONS
+from loadtest.openai_stub import StubConfig, create_app
+
+# Matches the product scenario of the stub, answered after two rounds of tool calls.
+QUESTION = "I am looking for running shoes"
+
+
+async def run_conversation(pool: SQLitePool, chain_responses: bool,
+                           turns: int) -> Dict[str, Any]:
+    """
+    :param pool: The database pool the tools run against.
+    :param chain_responses: Whether the provider chains its requests to the stored responses.
+    :param turns: The number of turns of the conversation, each asking QUESTION.
+    :return: The statistics of a fresh stub after the conversation.
+    """
+    stub = create_app(StubConfig(latency_s=0, latency_jitter_s=0, tokens_per_s=0))
+    transport = httpx.ASGITransport(app=stub)
+    async with httpx.AsyncClient(transport=transport, base_url="http://stub") as http_client:
+        provider = OpenAIToolResponseProvider(AsyncToolManager(ToolManager(pool)), api_key="stub",
+                                              model_name="stub", chain_responses=chain_responses)
+        provider.client = AsyncOpenAI(api_key="stub", base_url="http://stub/v1",
+                                      http_client=http_client)
+        messages = []
+        for _ in range(turns):
+            messages.append(Message(role="user", content=QUESTION))
+            async for event in provider.get_response(messages, SYSTEM_INSTRUCTIONS):
+                if event.type == ChatEventType.ERROR:
+                    raise RuntimeError(f"The turn failed: {event.data}")
+                if event.type == ChatEventType.TEXT_DONE:
+                    messages.append(Message(role="assistant", content=event.data["content"],
+                                            response_id=event.data.get("response_id")))
+        return (await http_client.get("/stats")).json()
+
+
+async def _compare(turns: int) -> None:
+    """
+    Runs the conversation in both modes, and prints their request bytes.
+
+    :param turns: The number of turns of the conversation.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "pharmacy.db")
+        pool = SQLitePool(partial(get_db, path), partial(get_db, path, readonly=True))
+        init_db_if_needed(pool.get_writer, path)
+        try:
+            results = {mode: await run_conversation(pool, mode, turns) for mode in (False, True)}
+        finally:
+            pool.close()
+    print(f"{'CHAIN_RESPONSES':<16}{'requests':>10}{'chained':>10}{'bytes':>10}"
+          f"{'bytes/request':>15}")
+    for mode, stats in results.items():
+        print(f"{str(mode):<16}{stats['requests']:>10}{stats['chained_requests']:>10}"
+              f"{stats['bytes_received']:>10}"
+              f"{stats['bytes_received'] / max(1, stats['requests']):>15.0f}")
+    saved = 1 - results[True]["bytes_received"] / max(1, results[False]["bytes_received"])
+    print(f"Chaining sends {saved:.0%} fewer request bytes over {turns} turn(s).")
+
+
+def main():
+    """
+    Runs the comparison.
+    """
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=3,
+                        help="Number of turns of the conversation.")
+    args = parser.parse_args()
+    asyncio.run(_compare(args.turns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Measures the time to the first answer text of the chat turns going through ChatManager, offline
+against the model stand-in of loadtest/openai_stub.py, alongside the same turns sent to the tool
+provider directly. The difference is the latency ChatManager adds to each turn, which should stay
+close to zero as the summaries and the warm-up run outside of the request path.
+The server does not route the chat requests through ChatManager, so its time to first text, as
+measured by the load generator, does not depend on it; this script measures ChatManager directly.
+The stub is served in process, on a local port so its deltas are streamed, with the tools running
+against a temporary copy of the seed database:
+    python -m loadtest.chat_ttft --turns 10 --latency-ms 400
+
+Functions:
+    measure: Runs a conversation through a response provider and returns the turn timings.
+    main: Command line entry point printing the timings with and without ChatManager.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from functools import partial
+from typing import Dict, List
+
+import uvicorn
+from openai import AsyncOpenAI
+
+from backend.db.init_db import init_db_if_needed
+from backend.db.sqlite_connection import get_db
+from backend.db.sqlite_pool import SQLitePool
+from backend.model.chat_events_factory import ChatEventType
+from backend.model.chat_manager import ChatManager
+from backend.model.message import Message
+from backend.model.openai.client import OpenAIToolResponseProvider, OpenAISimpleResponseProvider
+from backend.model.openai.tool_usage_parser import create_summary_format
+from backend.model.response_provider import ResponseProvider
+from backend.model.tool_manager import ToolManager, AsyncToolManager
+from backend.server.main import SYSTEM_INSTRUCTIONS
+from loadtest.openai_stub import StubConfig, create_app
+
+# Matches the navigate scenario of the stub, answered after a round of tool calls.
+QUESTION = "where is Aroma?"
+
+
+async def measure(provider: ResponseProvider, turns: int) -> Dict[str, List[float]]:
+    """
+    :param provider: The provider answering the turns.
+    :param turns: The number of turns of the conversation, each asking QUESTION.
+    :return: The times to the first text delta and to the end of each turn, in seconds.
+    """
+    timings = {"first_text_s": [], "turn_s": []}
+    messages = []
+    for _ in range(turns):
+        messages.append(Message(role="user", content=QUESTION))
+        start = time.perf_counter()
+        first_text = None
+        async for event in provider.get_response(list(messages), SYSTEM_INSTRUCTIONS):
+            if event.type == ChatEventType.ERROR:
+                raise RuntimeError(f"The turn failed: {event.data}")
+            if event.type == ChatEventType.TEXT_DELTA and first_text is None:
+                first_text = time.perf_counter() - start
+            if event.type == ChatEventType.TEXT_DONE:
+                messages.append(Message(role="assistant", content=event.data["content"],
+                                        response_id=event.data.get("response_id")))
+        timings["first_text_s"].append(first_text)
+        timings["turn_s"].append(time.perf_counter() - start)
+    return timings
+
+
+async def _compare(turns: int, config: StubConfig, port: int) -> None:
+    """
+    Runs the conversation with and without ChatManager, and prints their timings.
+
+    :param turns: The number of turns of the conversation.
+    :param config: The configuration of the stub.
+    :param port: The local port to serve the stub on.
+    """
+    server = uvicorn.Server(uvicorn.Config(create_app(config), host="127.0.0.1", port=port,
+                                           log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        if serving.done():
+            raise RuntimeError(f"The stub could not be served on port {port}.")
+        await asyncio.sleep(0.05)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "pharmacy.db")
+        pool = SQLitePool(partial(get_db, path), partial(get_db, path, readonly=True))
+        init_db_if_needed(pool.get_writer, path)
+        client = AsyncOpenAI(api_key="stub", base_url=f"http://127.0.0.1:{port}/v1")
+        tool_provider = OpenAIToolResponseProvider(AsyncToolManager(ToolManager(pool)),
+                                                   api_key="stub", model_name="stub")
+        summary_provider = OpenAISimpleResponseProvider("stub", "stub")
+        tool_provider.client = summary_provider.client = client
+        # Limits above the conversation length, as the stub scenarios do not summarize.
+        chat_manager = ChatManager(tool_provider, summary_provider, create_summary_format,
+                                   messages_limit=4 * turns, keep_count=2 * turns)
+        try:
+            results = {"provider": await measure(tool_provider, turns),
+                       "ChatManager": await measure(chat_manager, turns)}
+        finally:
+            await client.close()
+            pool.close()
+            server.should_exit = True
+            await serving
+    print(f"{'':<14}{'first text median ms':>22}{'turn median ms':>16}")
+    for name, timings in results.items():
+        print(f"{name:<14}{1000 * statistics.median(timings['first_text_s']):>22.0f}"
+              f"{1000 * statistics.median(timings['turn_s']):>16.0f}")
+
+
+def main():
+    """
+    Runs the measurement.
+    """
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=10,
+                        help="Number of turns of the conversation.")
+    parser.add_argument("--latency-ms", type=float, default=400,
+                        help="Time before the first event of each stub response.")
+    parser.add_argument("--tokens-per-s", type=float, default=50,
+                        help="Text deltas streamed per second by the stub.")
+    parser.add_argument("--port", type=int, default=8011, help="Local port of the stub.")
+    args = parser.parse_args()
+    config = StubConfig(latency_s=args.latency_ms / 1000, latency_jitter_s=0,
+                        tokens_per_s=args.tokens_per_s)
+    asyncio.run(_compare(args.turns, config, args.port))
+
+
+if __name__ == "__main__":
+    main()
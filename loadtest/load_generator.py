@@ -0,0 +1,390 @@
+"""
+End-to-end load generator, simulating the kiosks chatting through /chat/stream and the signage
+screens polling /novisign, to size the hardware of a mall.
+Each kiosk holds a conversation of a few turns with its own session and screen, then starts a
+new one, and reads the chat streams as frontend/app.js does: SSE frames split on blank lines,
+"data: " lines parsed as JSON, and render/patch/done/error messages applied in order. Each
+screen polls its frame with the ETag of the previous one, as the signage players do.
+The report holds the time to the first placeholder, to the first answer text and to the end of
+the turn, the poll latencies, the error rates, and the server CPU usage and memory, sampled from
+/metrics.
+
+Meant to run against the local model stand-in, so no API calls are made:
+    python -m loadtest.openai_stub --port 8001
+    (cfg.json: "OPENAI_BASE_URL": "http://127.0.0.1:8001/v1", and the polled screens listed in
+     "NOVISIGN_SCREENS": ["load-0", "load-1", ...], as the server only serves those)
+    uvicorn backend.server.main:app --port 8000
+    python -m loadtest.load_generator --kiosks 50 --screens 50 --duration-s 60
+Repeated opening questions are answered by the answer cache and the intent router, disable them
+in cfg.json ("ANSWER_CACHE_SIZE": 0, "INTENT_ROUTER": false) to load the model path only.
+
+Classes:
+    TurnResult: Data class holding the timings and outcome of a single chat turn.
+    LoadStats: Data class holding the results gathered during a run.
+
+Functions:
+    run: Runs the load against a server and returns the gathered results.
+    report: Summarizes the gathered results.
+    main: Command line entry point running the load and printing the report.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+# Questions asked by the simulated users, matching the scenarios of the model stand-in.
+DEFAULT_QUESTIONS = (
+    "איפה נמצא ארומה?",
+    "where is Teva Naot?",
+    "I am looking for running shoes",
+    "מי מוכר עדשות מגע?",
+    "which stores are in the mall?",
+    "is there a coupon for Super Pharm?",
+    "hello, what can you do?",
+)
+
+
+@dataclass
+class TurnResult:
+    """
+    Data class holding the timings and outcome of a single chat turn, in seconds from the request.
+    """
+    # Time to the first placeholder rendered, None if the answer came without one.
+    first_placeholder_s: Optional[float] = None
+    # Time to the first render of the answer text.
+    first_text_s: Optional[float] = None
+    # Time to the end of the stream.
+    total_s: Optional[float] = None
+    status: Optional[int] = None
+    # Why the turn failed, None if it succeeded.
+    error: Optional[str] = None
+    text: str = ""
+
+
+@dataclass
+class LoadStats:
+    """
+    Data class holding the results gathered during a run.
+    """
+    turns: List[TurnResult] = field(default_factory=list)
+    # Latency of each poll alongside whether the frame changed (200) or not (304).
+    polls: List[Tuple[float, bool]] = field(default_factory=list)
+    poll_errors: int = 0
+    # The "process" entry of each /metrics sample.
+    process_samples: List[Dict[str, Any]] = field(default_factory=list)
+    duration_s: float = 0.0
+
+
+def _parse_sse_buffer(buffer: str, on_message: Callable[[Dict[str, Any]], None]) -> str:
+    """
+    Parses the complete SSE frames of the given buffer, as parseSseBuffer of frontend/app.js.
+
+    :param buffer: The text received and not parsed yet.
+    :param on_message: Called with every message parsed.
+    :return: The incomplete tail of the buffer.
+    """
+    parts = buffer.replace("\r\n", "\n").split("\n\n")
+    tail = parts.pop()
+    for part in parts:
+        for line in part.split("\n"):
+            if not line.startswith("data: "):
+                continue
+            try:
+                message = json.loads(line[6:].strip())
+            except json.JSONDecodeError:
+                print(f"Failed to parse SSE JSON: {line[6:]}")
+                continue
+            on_message(message)
+    return tail
+
+
+async def _chat_turn(client: httpx.AsyncClient, conversation: List[Dict[str, str]],
+                     session_id: str, screen_id: str, timeout_s: float) -> TurnResult:
+    """
+    Sends the given conversation to /chat/stream and reads the answer as frontend/app.js does.
+
+    :param client: The client of the server.
+    :param conversation: The conversation so far, ending with the user question.
+    :param session_id: The session of the kiosk.
+    :param screen_id: The signage screen of the kiosk.
+    :param timeout_s: Time after which the turn is abandoned.
+    :return: The result of the turn.
+    """
+    result = TurnResult()
+    start = time.perf_counter()
+    # Rendered assistant texts by id, to follow the patches as the page does.
+    texts: Dict[str, str] = {}
+    done = False
+
+    def on_message(message: Dict[str, Any]) -> None:
+        nonlocal done
+        elapsed = time.perf_counter() - start
+        data = message.get("data") or {}
+        if message.get("type") == "render":
+            texts.pop(data.get("replace_id"), None)
+            if str(data.get("id", "")).startswith("placeholder-"):
+                if result.first_placeholder_s is None:
+                    result.first_placeholder_s = elapsed
+            elif data.get("role") == "assistant" and isinstance(data.get("text"), str):
+                texts[data["id"]] = data["text"]
+                result.text = data["text"]
+                if result.first_text_s is None:
+                    result.first_text_s = elapsed
+        elif message.get("type") == "patch":
+            texts.pop(data.get("replace_id"), None)
+            if data.get("id") in texts:
+                texts[data["id"]] += data.get("text") or ""
+                result.text = texts[data["id"]]
+        elif message.get("type") == "done":
+            done = True
+        elif message.get("type") == "error":
+            result.error = f"error event: {data.get('message', 'unknown')}"
+
+    async def read() -> None:
+        async with client.stream("POST", "/chat/stream", json={
+                "conversation": conversation, "session_id": session_id,
+                "screen_id": screen_id}) as response:
+            result.status = response.status_code
+            if response.status_code != 200:
+                result.error = f"HTTP {response.status_code}"
+                return
+            buffer = ""
+            async for chunk in response.aiter_text():
+                buffer = _parse_sse_buffer(buffer + chunk, on_message)
+
+    try:
+        await asyncio.wait_for(read(), timeout_s)
+    except asyncio.TimeoutError:
+        result.error = "timeout"
+    except httpx.HTTPError as e:
+        result.error = f"{type(e).__name__}: {e}"
+    result.total_s = time.perf_counter() - start
+    if result.error is None and not done:
+        result.error = "stream ended without done"
+    elif result.error is None and not result.text.strip():
+        result.error = "empty answer"
+    return result
+
+
+async def _kiosk(client: httpx.AsyncClient, stats: LoadStats, screen_id: str, deadline: float,
+                 questions: Tuple[str, ...], turns: int, think_time_s: float,
+                 timeout_s: float) -> None:
+    """
+    Holds conversations of the given number of turns until the deadline, each with a new session.
+    """
+    while time.monotonic() < deadline:
+        session_id = uuid.uuid4().hex
+        conversation: List[Dict[str, str]] = []
+        for _ in range(turns):
+            if time.monotonic() >= deadline:
+                return
+            conversation.append({"role": "user", "content": random.choice(questions)})
+            result = await _chat_turn(client, conversation, session_id, screen_id, timeout_s)
+            stats.turns.append(result)
+            if result.text.strip():
+                conversation.append({"role": "assistant", "content": result.text})
+            await asyncio.sleep(random.uniform(0.5, 1.5) * think_time_s)
+
+
+async def _screen(client: httpx.AsyncClient, stats: LoadStats, screen_id: str, deadline: float,
+                  interval_s: float) -> None:
+    """
+    Polls the frame of the given screen until the deadline, sending the ETag of the last one.
+    """
+    etag = None
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            headers = {"If-None-Match": etag} if etag else {}
+            response = await client.get("/novisign", params={"screen": screen_id},
+                                        headers=headers)
+            if response.status_code not in (200, 304):
+                stats.poll_errors += 1
+            else:
+                etag = response.headers.get("etag", etag)
+                stats.polls.append((time.perf_counter() - start, response.status_code == 200))
+        except httpx.HTTPError:
+            stats.poll_errors += 1
+        await asyncio.sleep(max(0.0, interval_s - (time.perf_counter() - start)))
+
+
+async def _sample_metrics(client: httpx.AsyncClient, stats: LoadStats, deadline: float,
+                          interval_s: float) -> None:
+    """
+    Samples the server process usage from /metrics until the deadline, and once past it.
+    """
+    while True:
+        try:
+            response = await client.get("/metrics")
+            process = response.json().get("process")
+            if process is not None:
+                stats.process_samples.append(process)
+        except (httpx.HTTPError, ValueError):
+            pass
+        if time.monotonic() >= deadline:
+            return
+        await asyncio.sleep(min(interval_s, max(0.0, deadline - time.monotonic())))
+
+
+async def run(url: str, kiosks: int, screens: int, duration_s: float,
+              questions: Tuple[str, ...] = DEFAULT_QUESTIONS, turns: int = 3,
+              think_time_s: float = 2.0, poll_interval_s: float = 1.0,
+              turn_timeout_s: float = 60.0, metrics_interval_s: float = 1.0,
+              ramp_up_s: float = 0.0) -> LoadStats:
+    """
+    Runs the load against the given server.
+
+    :param url: The base URL of the server.
+    :param kiosks: The number of kiosks chatting at the same time.
+    :param screens: The number of signage screens polling, the kiosks share them round robin.
+    :param duration_s: Time during which new turns and polls are started.
+    :param questions: The questions picked at random by the kiosks.
+    :param turns: The number of turns of each conversation.
+    :param think_time_s: Mean time between a turn end and the next question.
+    :param poll_interval_s: Time between the polls of each screen.
+    :param turn_timeout_s: Time after which a turn is abandoned.
+    :param metrics_interval_s: Time between the samples of the server process usage.
+    :param ramp_up_s: Time over which the kiosks and screens are started.
+    :return: The gathered results.
+    """
+    stats = LoadStats()
+    screen_ids = [f"load-{i}" for i in range(screens)] or ["default"]
+    limits = httpx.Limits(max_connections=kiosks + screens + 1,
+                          max_keepalive_connections=kiosks + screens + 1)
+    async with httpx.AsyncClient(base_url=url, limits=limits,
+                                 timeout=httpx.Timeout(turn_timeout_s)) as client:
+        start = time.monotonic()
+        deadline = start + duration_s
+
+        async def delayed(coro_factory: Callable[[], Any], delay: float) -> None:
+            await asyncio.sleep(delay)
+            await coro_factory()
+
+        tasks = [_sample_metrics(client, stats, deadline, metrics_interval_s)]
+        users = kiosks + screens
+        for i in range(kiosks):
+            tasks.append(delayed(lambda i=i: _kiosk(
+                client, stats, screen_ids[i % len(screen_ids)], deadline, questions, turns,
+                think_time_s, turn_timeout_s), ramp_up_s * i / max(users, 1)))
+        for i in range(screens):
+            tasks.append(delayed(lambda i=i: _screen(client, stats, screen_ids[i], deadline,
+                                                     poll_interval_s),
+                                 ramp_up_s * (kiosks + i) / max(users, 1)))
+        await asyncio.gather(*tasks)
+        # The last sample is taken once the turns in flight completed.
+        await _sample_metrics(client, stats, time.monotonic(), metrics_interval_s)
+        stats.duration_s = time.monotonic() - start
+    return stats
+
+
+def _percentiles(values: List[float]) -> Optional[Dict[str, float]]:
+    """
+    :param values: Durations in seconds.
+    :return: The mean, median, 90th, 95th, 99th percentile and maximum, in milliseconds, or None
+             if there are no values.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    summary = {"mean": sum(ordered) / len(ordered), "p50": rank(50), "p90": rank(90),
+               "p95": rank(95), "p99": rank(99), "max": ordered[-1]}
+    return {k: round(v * 1000, 1) for k, v in summary.items()}
+
+
+def report(stats: LoadStats) -> Dict[str, Any]:
+    """
+    Summarizes the given results. The timings of the turns only cover the successful ones.
+
+    :param stats: The results of a run.
+    :return: The report, as a JSON serializable dictionary.
+    """
+    ok = [t for t in stats.turns if t.error is None]
+    errors: Dict[str, int] = {}
+    for turn in stats.turns:
+        if turn.error is not None:
+            kind = turn.error.split(":")[0]
+            errors[kind] = errors.get(kind, 0) + 1
+    polls = len(stats.polls) + stats.poll_errors
+    server = None
+    samples = stats.process_samples
+    if len(samples) >= 2:
+        wall = samples[-1]["wall_s"] - samples[0]["wall_s"]
+        rss = [s["rss_bytes"] for s in samples if s.get("rss_bytes") is not None]
+        server = {
+            "cpu_percent": round(100 * (samples[-1]["cpu_s"] - samples[0]["cpu_s"]) / wall, 1)
+            if wall > 0 else None,
+            "rss_start_mb": round(rss[0] / 2 ** 20, 1) if rss else None,
+            "rss_peak_mb": round(max(rss) / 2 ** 20, 1) if rss else None,
+            "rss_end_mb": round(rss[-1] / 2 ** 20, 1) if rss else None,
+        }
+    return {
+        "duration_s": round(stats.duration_s, 1),
+        "turns": len(stats.turns),
+        "turns_per_s": round(len(stats.turns) / stats.duration_s, 2) if stats.duration_s else 0,
+        "turn_error_rate": round(1 - len(ok) / len(stats.turns), 4) if stats.turns else 0,
+        "turn_errors": errors,
+        "turns_without_placeholder": sum(1 for t in ok if t.first_placeholder_s is None),
+        "time_to_first_placeholder_ms": _percentiles([t.first_placeholder_s for t in ok
+                                                      if t.first_placeholder_s is not None]),
+        "time_to_first_text_ms": _percentiles([t.first_text_s for t in ok
+                                               if t.first_text_s is not None]),
+        "turn_ms": _percentiles([t.total_s for t in ok]),
+        "polls": polls,
+        "poll_error_rate": round(stats.poll_errors / polls, 4) if polls else 0,
+        "polls_changed": sum(1 for _, changed in stats.polls if changed),
+        "poll_ms": _percentiles([latency for latency, _ in stats.polls]),
+        "server": server,
+    }
+
+
+def main():
+    """
+    Runs the load and prints the report.
+    """
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL of the server.")
+    parser.add_argument("--kiosks", type=int, default=10, help="Number of chatting kiosks.")
+    parser.add_argument("--screens", type=int, default=10,
+                        help="Number of polling screens, named load-0, load-1, ...")
+    parser.add_argument("--duration-s", type=float, default=60,
+                        help="Time during which new turns and polls are started.")
+    parser.add_argument("--turns", type=int, default=3, help="Turns of each conversation.")
+    parser.add_argument("--think-time-s", type=float, default=2.0,
+                        help="Mean time between a turn end and the next question.")
+    parser.add_argument("--poll-interval-s", type=float, default=1.0,
+                        help="Time between the polls of each screen.")
+    parser.add_argument("--turn-timeout-s", type=float, default=60.0,
+                        help="Time after which a turn is abandoned.")
+    parser.add_argument("--ramp-up-s", type=float, default=0.0,
+                        help="Time over which the kiosks and screens are started.")
+    parser.add_argument("--questions", help="JSON file of a list of questions to ask.")
+    parser.add_argument("--output", help="Path to save the report to as JSON.")
+    args = parser.parse_args()
+
+    questions = DEFAULT_QUESTIONS
+    if args.questions:
+        with open(args.questions, encoding="utf-8") as f:
+            questions = tuple(json.load(f))
+    stats = asyncio.run(run(args.url, args.kiosks, args.screens, args.duration_s, questions,
+                            args.turns, args.think_time_s, args.poll_interval_s,
+                            args.turn_timeout_s, ramp_up_s=args.ramp_up_s))
+    summary = report(stats)
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
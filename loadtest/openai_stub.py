@@ -0,0 +1,324 @@
+"""
+Local stand-in for the OpenAI Responses API, used to load test the chat path offline.
+It streams the events the OpenAI response providers parse (response.created,
+response.output_item.added, response.function_call_arguments.done, response.output_text.delta,
+response.output_text.done, response.completed), following scripted scenarios: the latest user
+message picks the scenario, which makes some rounds of tool calls and then replies, at a
+configurable latency and token rate. Responses are stored, so previous_response_id chaining works.
+/stats counts the requests and their body bytes, chained and full, to measure what chaining saves.
+
+Run from the repository root:
+    python -m loadtest.openai_stub --port 8001 --latency-ms 400 --tokens-per-s 50
+and point the server at it through cfg.json:
+    "OPENAI_BASE_URL": "http://127.0.0.1:8001/v1"
+
+Classes:
+    Scenario: Scripted answer to the requests whose latest user message matches a pattern.
+    StubConfig: Data class holding the configuration of the stub.
+
+Functions:
+    create_app: Creates the stub application.
+    main: Command line entry point running the stub.
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+@dataclass
+class Scenario:
+    """
+    Scripted answer to the requests whose latest user message matches a pattern. Each round of
+    tool calls is answered by a response holding its calls, then the reply is streamed.
+    """
+    name: str
+    # Regex searched in the latest user message, case insensitive. Empty matches every message.
+    match: str
+    reply: str
+    # Rounds of parallel tool calls, each call being {"name": ..., "arguments": {...}}.
+    tool_rounds: List[List[Dict[str, Any]]] = field(default_factory=list)
+
+    def __post_init__(self):
+        self._pattern = re.compile(self.match, re.IGNORECASE)
+
+    def matches(self, text: str) -> bool:
+        """
+        :param text: The latest user message.
+        :return: Whether the scenario answers the message.
+        """
+        return self._pattern.search(text) is not None
+
+
+# Built in scenarios, matching the kind of questions asked at the kiosks. The last one is the
+# fallback, replying without tools.
+DEFAULT_SCENARIOS = (
+    Scenario("navigate", r"where is|take me|navigate|איפה נמצא|איך מגיעים",
+             "The way to the store is now displayed on the screen next to you.",
+             [[{"name": "set_navigation_for_store", "arguments": {"id": 2}}]]),
+    Scenario("product", r"buy|sell|looking for|קונים|מוכר|מחפש",
+             "You can find it at the store displayed on the screen, it also has a coupon.",
+             [[{"name": "search_product", "arguments": {"query": "נעלי ריצה"}}],
+              [{"name": "get_coupon_for_store", "arguments": {"id": 3}}]]),
+    Scenario("stores", r"stores|shops|חנויות",
+             "These are the stores in the mall: Super Pharm, Aroma, Teva Naot and Opticana.",
+             [[{"name": "get_stores", "arguments": {}}]]),
+    Scenario("chat", r"",
+             "Hello! I can help you find stores, products, coupons and directions in the mall. "
+             "What are you looking for today?"),
+)
+
+
+@dataclass
+class StubConfig:
+    """
+    Data class holding the configuration of the stub.
+    """
+    # Time before the first event of a response, as the model thinking time.
+    latency_s: float = 0.4
+    # Uniform random variation added to the latency, up to this time.
+    latency_jitter_s: float = 0.1
+    # Text deltas streamed per second, 0 streams them all at once.
+    tokens_per_s: float = 50.0
+    scenarios: Tuple[Scenario, ...] = DEFAULT_SCENARIOS
+    # Maximal number of stored responses, the oldest are dropped beyond it.
+    max_stored_responses: int = 10000
+
+
+def _text_of(content: Any) -> str:
+    """
+    :param content: The content of an input message, a string or a list of content parts.
+    :return: The text of the content.
+    """
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") for part in content or [] if isinstance(part, dict))
+
+
+def _tokens(text: str) -> List[str]:
+    """
+    :param text: A reply.
+    :return: The reply split into word sized deltas, keeping their trailing whitespace.
+    """
+    return re.findall(r"\S+\s*", text) or [text]
+
+
+def _sse(event: Dict[str, Any]) -> bytes:
+    """
+    :param event: A response stream event.
+    :return: The event encoded as an SSE frame, as sent by the API.
+    """
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n" \
+        .encode("utf-8")
+
+
+def create_app(config: Optional[StubConfig] = None) -> FastAPI:
+    """
+    Creates the stub application, serving /v1/responses, /v1/models/{model} and /stats.
+
+    :param config: The configuration of the stub, defaults to StubConfig().
+    :return: The stub application.
+    """
+    config = config or StubConfig()
+    app = FastAPI()
+    # Stored responses, by id: the whole conversation items up to and including their output.
+    stored: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+    # Request bytes are the sizes of the request bodies, split between the requests chained
+    # through previous_response_id and the ones sending the whole conversation.
+    stats = {"requests": 0, "streams": 0, "active_streams": 0, "bytes_sent": 0,
+             "bytes_received": 0, "tool_calls": 0, "chained_requests": 0,
+             "chained_request_bytes": 0, "full_requests": 0, "full_request_bytes": 0,
+             "unknown_previous_responses": 0}
+
+    def pick(items: List[Dict[str, Any]]) -> Tuple[Scenario, int]:
+        """
+        :param items: The whole conversation items of the request.
+        :return: The scenario of the latest user message, alongside the number of its tool
+                 rounds already answered.
+        """
+        text, rounds = "", 0
+        for item in items:
+            if item.get("role") == "user":
+                text, rounds = _text_of(item.get("content")), 0
+            elif item.get("type") == "function_call_output":
+                rounds += 1
+        scenario = next(s for s in config.scenarios if s.matches(text))
+        # Parallel calls each have an output, count the rounds rather than the outputs.
+        answered, outputs = 0, rounds
+        while answered < len(scenario.tool_rounds) and outputs >= \
+                len(scenario.tool_rounds[answered]):
+            outputs -= len(scenario.tool_rounds[answered])
+            answered += 1
+        return scenario, answered
+
+    def respond(items: List[Dict[str, Any]],
+                model: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]], Optional[str]]:
+        """
+        :param items: The whole conversation items of the request.
+        :param model: The requested model.
+        :return: The response object, its output items, and its reply text if it is not a tool
+                 calls round.
+        """
+        scenario, answered = pick(items)
+        output: List[Dict[str, Any]] = []
+        reply = None
+        if answered < len(scenario.tool_rounds):
+            for call in scenario.tool_rounds[answered]:
+                output.append({"type": "function_call", "id": f"fc_{uuid.uuid4().hex}",
+                               "call_id": f"call_{uuid.uuid4().hex}", "name": call["name"],
+                               "arguments": json.dumps(call["arguments"], ensure_ascii=False),
+                               "status": "completed"})
+        else:
+            reply = scenario.reply
+            output.append({"type": "message", "id": f"msg_{uuid.uuid4().hex}",
+                           "status": "completed", "role": "assistant",
+                           "content": [{"type": "output_text", "text": reply,
+                                        "annotations": []}]})
+        response = {"id": f"resp_{uuid.uuid4().hex}", "object": "response",
+                    "created_at": int(time.time()), "model": model, "status": "completed",
+                    "output": output, "parallel_tool_calls": True, "tool_choice": "auto",
+                    "tools": []}
+        return response, output, reply
+
+    def store(response: Dict[str, Any], items: List[Dict[str, Any]],
+              output: List[Dict[str, Any]]) -> None:
+        stored[response["id"]] = items + output
+        while len(stored) > config.max_stored_responses:
+            stored.popitem(last=False)
+
+    async def stream(response: Dict[str, Any], output: List[Dict[str, Any]],
+                     reply: Optional[str]) -> AsyncGenerator[bytes, None]:
+        """
+        :return: The events of the given response, as SSE frames.
+        """
+        stats["active_streams"] += 1
+        sequence = 0
+
+        def event(event_type: str, **fields: Any) -> bytes:
+            nonlocal sequence
+            sequence += 1
+            frame = _sse({"type": event_type, "sequence_number": sequence, **fields})
+            stats["bytes_sent"] += len(frame)
+            return frame
+
+        try:
+            yield event("response.created", response=response | {"status": "in_progress",
+                                                                  "output": []})
+            await asyncio.sleep(config.latency_s + random.uniform(0, config.latency_jitter_s))
+            for index, item in enumerate(output):
+                if item["type"] == "function_call":
+                    stats["tool_calls"] += 1
+                    yield event("response.output_item.added", output_index=index,
+                                item=item | {"arguments": "", "status": "in_progress"})
+                    yield event("response.function_call_arguments.done", output_index=index,
+                                item_id=item["id"], name=item["name"],
+                                arguments=item["arguments"])
+                    yield event("response.output_item.done", output_index=index, item=item)
+                    continue
+                yield event("response.output_item.added", output_index=index,
+                            item=item | {"content": [], "status": "in_progress"})
+                delay = 1 / config.tokens_per_s if config.tokens_per_s > 0 else 0
+                for token in _tokens(reply):
+                    yield event("response.output_text.delta", output_index=index,
+                                content_index=0, item_id=item["id"], delta=token, logprobs=[])
+                    if delay:
+                        await asyncio.sleep(delay)
+                yield event("response.output_text.done", output_index=index, content_index=0,
+                            item_id=item["id"], text=reply, logprobs=[])
+                yield event("response.output_item.done", output_index=index, item=item)
+            yield event("response.completed", response=response)
+        finally:
+            stats["active_streams"] -= 1
+
+    @app.post("/v1/responses")
+    async def create_response(req: Request):
+        raw = await req.body()
+        body = json.loads(raw)
+        stats["requests"] += 1
+        stats["bytes_received"] += len(raw)
+        items = body.get("input", [])
+        if isinstance(items, str):
+            items = [{"role": "user", "content": items}]
+        previous = body.get("previous_response_id")
+        if previous is not None:
+            if previous not in stored:
+                stats["unknown_previous_responses"] += 1
+                return JSONResponse(status_code=404, content={"error": {
+                    "message": f"Previous response with id '{previous}' not found.",
+                    "type": "invalid_request_error", "param": "previous_response_id",
+                    "code": None}})
+            stats["chained_requests"] += 1
+            stats["chained_request_bytes"] += len(raw)
+            stored.move_to_end(previous)
+            items = stored[previous] + items
+        else:
+            stats["full_requests"] += 1
+            stats["full_request_bytes"] += len(raw)
+        response, output, reply = respond(items, body.get("model", "stub"))
+        if body.get("store", True):
+            store(response, items, output)
+        if not body.get("stream", False):
+            await asyncio.sleep(config.latency_s)
+            return response
+        stats["streams"] += 1
+        return StreamingResponse(stream(response, output, reply), media_type="text/event-stream")
+
+    @app.get("/v1/models/{model}")
+    async def retrieve_model(model: str):
+        return {"id": model, "object": "model", "created": 0, "owned_by": "stub"}
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats | {"stored_responses": len(stored)}
+
+    return app
+
+
+def _read_scenarios(path: str) -> Tuple[Scenario, ...]:
+    """
+    :param path: Path of a JSON list of scenarios, with the fields of Scenario.
+    :return: The scenarios, with a fallback replying to every message appended if missing.
+    """
+    with open(path, encoding="utf-8") as f:
+        scenarios = tuple(Scenario(**s) for s in json.load(f))
+    if not any(s.matches("") for s in scenarios):
+        scenarios += (DEFAULT_SCENARIOS[-1],)
+    return scenarios
+
+
+def main():
+    """
+    Runs the stub server.
+    """
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=8001, help="Port to listen on.")
+    parser.add_argument("--latency-ms", type=float, default=400,
+                        help="Time before the first event of each response.")
+    parser.add_argument("--jitter-ms", type=float, default=100,
+                        help="Random variation added to the latency, up to this time.")
+    parser.add_argument("--tokens-per-s", type=float, default=50,
+                        help="Text deltas streamed per second, 0 streams them at once.")
+    parser.add_argument("--scenarios", help="JSON file of scenarios replacing the built in ones.")
+    args = parser.parse_args()
+
+    config = StubConfig(latency_s=args.latency_ms / 1000, latency_jitter_s=args.jitter_ms / 1000,
+                        tokens_per_s=args.tokens_per_s,
+                        scenarios=_read_scenarios(args.scenarios) if args.scenarios
+                        else DEFAULT_SCENARIOS)
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
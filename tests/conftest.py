@@ -0,0 +1,31 @@
+"""
+Fixtures shared by the tests. The tests run from the repository root, where the database scripts
+are read from.
+"""
+from functools import partial
+
+import pytest
+
+from backend.db.init_db import init_db_if_needed
+from backend.db.sqlite_connection import get_db
+from backend.db.sqlite_pool import SQLitePool
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """
+    :return: The path of a database created from the schema and the demo seed.
+    """
+    path = str(tmp_path / "pharmacy.db")
+    init_db_if_needed(partial(get_db, path), path)
+    return path
+
+
+@pytest.fixture
+def pool(db_path):
+    """
+    :return: A pool over the seeded database, closed after the test.
+    """
+    pool = SQLitePool(partial(get_db, db_path), partial(get_db, db_path, readonly=True), size=2)
+    yield pool
+    pool.close()
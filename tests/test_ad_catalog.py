@@ -0,0 +1,41 @@
+from backend.server.ad_catalog import AdCatalog
+from backend.server.ad_provider import MockAdProvider
+
+PRODUCTS = [{"product_id": 1, "product_name": "p1", "store_id": 1, "category": "shoes"},
+            {"product_id": 2, "product_name": "p2", "store_id": 1, "category": "bags"},
+            {"product_id": 3, "product_name": "p3", "store_id": 2, "category": "food"}]
+
+
+def _ad(ad_id: int, category: str, is_active: int = 1):
+    return {"ad_id": ad_id, "store_id": 1, "category": category, "is_active": is_active,
+            "asset_url": f"asset-{ad_id}", "logo_url": f"logo-{ad_id}"}
+
+
+def test_products_get_the_oldest_active_ad_of_their_category_or_store():
+    # Newest first, as returned by GET_ALL_ADS.
+    catalog = AdCatalog(PRODUCTS, [_ad(4, "shoes", is_active=0), _ad(3, "shoes"),
+                                   _ad(2, "shoes"), _ad(1, "bags")])
+    shoes, bags, food = catalog.records
+    assert (shoes.ad_id, shoes.asset_url, shoes.logo_url) == (2, "asset-2", "logo-1")
+    assert (bags.ad_id, bags.asset_url) == (1, "asset-1")
+    assert (food.ad_id, food.asset_url, food.logo_url) == (None, None, None)
+    assert food.to_frame() == {"store": {"product_name": "p3"}}
+
+
+def test_products_are_found_by_id_then_by_name():
+    catalog = AdCatalog(PRODUCTS, [])
+    assert catalog.index_of({"product_id": 2}) == 1
+    assert catalog.index_of({"product_name": "p3"}) == 2
+    assert catalog.index_of({"product_id": 9, "product_name": "p1"}) == 0
+    assert catalog.index_of({"product_name": "missing"}) is None
+
+
+def test_forced_ads_are_shown_next_and_frames_are_copies(pool):
+    with pool.connection() as conn:
+        provider = MockAdProvider(conn)
+    product = {"product_name": provider.catalog.records[0].product_name}
+    provider.force_next_ad(product, "a")
+    assert provider.get_ad("a")["store"]["product_name"] == product["product_name"]
+    frame = provider.get_ad("a")
+    frame["store"]["mapurl"] = "overlay"
+    assert all("mapurl" not in provider.get_ad("a")["store"] for _ in range(10))
@@ -0,0 +1,51 @@
+import time
+
+from backend.server.ad_catalog import AdCatalog
+from backend.server.ad_scheduler import PACING_PERIOD_S, AdScheduler
+
+
+def _catalog(stores: int = 6, cap=None) -> AdCatalog:
+    """
+    One product and one ad per store, the ad of store 0 being heavily weighted and capped.
+    """
+    products = [{"product_id": i, "product_name": f"p{i}", "store_id": i, "category": "c"}
+                for i in range(stores)]
+    ads = [{"ad_id": i, "store_id": i, "category": "c", "is_active": 1, "asset_url": f"a{i}",
+            "logo_url": None, "weight": 100.0 if i == 0 else 1.0,
+            "max_impressions_per_hour": cap if i == 0 else None} for i in range(stores)]
+    return AdCatalog(products, ads)
+
+
+def test_windows_hold_distinct_ads():
+    scheduler = AdScheduler(_catalog(), window_size=4, batch_windows=8, seed=0)
+    now = time.monotonic()
+    for _ in range(20):
+        window = [scheduler.next_ad("screen", now) for _ in range(4)]
+        assert len(set(window)) == 4
+
+
+def test_capped_ads_are_paced_over_the_period():
+    scheduler = AdScheduler(_catalog(cap=10), window_size=2, batch_windows=4, seed=0)
+    start = time.monotonic()
+    for screen in range(50):
+        scheduler.next_ad(screen, start)
+    assert scheduler.impressions()[0] == 1
+
+    # A quarter of the period allows floor(10 * 0.25) + 1 impressions, across all screens.
+    quarter = start + PACING_PERIOD_S / 4
+    for frame in range(200):
+        scheduler.next_ad(frame % 3, quarter)
+    assert scheduler.impressions()[0] == 3
+
+    # The cap itself is never exceeded, and is reset with the next period.
+    for frame in range(200):
+        scheduler.next_ad(frame % 3, start + PACING_PERIOD_S - 1)
+    assert scheduler.impressions()[0] == 10
+    scheduler.next_ad(0, start + PACING_PERIOD_S + 1)
+    assert sum(scheduler.impressions().values()) == 1
+
+
+def test_capped_ads_are_shown_when_every_ad_is_capped():
+    scheduler = AdScheduler(_catalog(stores=1, cap=1), window_size=1, batch_windows=2, seed=0)
+    start = time.monotonic()
+    assert [scheduler.next_ad(0, start) for _ in range(3)] == [0, 0, 0]
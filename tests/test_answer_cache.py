@@ -0,0 +1,70 @@
+import asyncio
+
+from backend.db.table_versions import TableVersions
+from backend.model.answer_cache import CachingResponseProvider
+from backend.model.chat_events_factory import ChatEvent, ChatEventType, chat_event
+from backend.model.message import Message
+from backend.model.response_provider import ResponseProvider
+from backend.model.tool_cache import ToolResultCache
+
+
+class _Provider(ResponseProvider):
+    """
+    Answers with a tool call and a text, optionally failing, counting the requests.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.fail = False
+
+    async def get_response(self, messages, instructions):
+        self.requests += 1
+        yield ChatEvent(ChatEventType.TOOL_CALL_GENERATED, {"name": "get_stores", "args": ""})
+        if self.fail:
+            yield chat_event(ChatEventType.ERROR, "assistant", "failed")
+            return
+        yield ChatEvent(ChatEventType.TEXT_DONE,
+                        {"role": "assistant", "content": "answer", "response_id": "r1"})
+
+
+def _answer(provider: CachingResponseProvider, *texts: str):
+    messages = [Message("user" if i % 2 == 0 else "assistant", t) for i, t in enumerate(texts)]
+
+    async def collect():
+        return [e async for e in provider.get_response(messages, "instructions")]
+    return asyncio.run(collect())
+
+
+def _caching():
+    versions = TableVersions()
+    provider = _Provider()
+    return CachingResponseProvider(provider, ToolResultCache(versions)), provider, versions
+
+
+def test_opening_questions_are_replayed():
+    caching, provider, _ = _caching()
+    _answer(caching, "Where is Aroma?")
+    replayed = _answer(caching, "  where is AROMA ")
+    assert provider.requests == 1
+    assert [e.type for e in replayed] == [ChatEventType.TOOL_CALL_GENERATED,
+                                          ChatEventType.TEXT_DELTA, ChatEventType.TEXT_DONE,
+                                          ChatEventType.DONE]
+    assert replayed[1].data["content"] == "answer" and "response_id" not in replayed[2].data
+
+
+def test_follow_ups_failures_and_catalog_writes_are_not_served_from_the_cache():
+    caching, provider, versions = _caching()
+    _answer(caching, "hi", "hello", "where is Aroma?")
+    _answer(caching, "hi", "hello", "where is Aroma?")
+    assert provider.requests == 2
+
+    provider.fail = True
+    _answer(caching, "where is Aroma?")
+    provider.fail = False
+    _answer(caching, "where is Aroma?")
+    _answer(caching, "where is Aroma?")
+    assert provider.requests == 4
+
+    versions.bump("stores")
+    _answer(caching, "where is Aroma?")
+    assert provider.requests == 5
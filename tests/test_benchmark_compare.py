@@ -0,0 +1,40 @@
+from benchmarks.suite import compare
+
+
+def _timing(best_s: float, spread: float = 0.0):
+    return {"best_s": best_s, "median_s": best_s * (1 + spread), "calls": 1}
+
+
+def _results(**times):
+    return {name: {"1": _timing(*t) if isinstance(t, tuple) else _timing(t)}
+            for name, t in times.items()}
+
+
+def test_uniform_slowdowns_are_not_regressions():
+    baseline = _results(a=1.0, b=2.0, c=3.0)
+    current = _results(a=1.5, b=3.0, c=4.5)
+    assert compare(baseline, current, 0.25) == []
+
+
+def test_slowdowns_are_compared_to_the_median_change():
+    baseline = _results(a=1.0, b=2.0, c=3.0)
+    current = _results(a=1.0, b=2.0, c=6.0)
+    assert compare(baseline, current, 0.25) == [("c", "1", 2.0)]
+
+
+def test_noisy_benchmarks_are_given_their_spread():
+    baseline = _results(a=1.0, b=2.0, c=(3.0, 1.0))
+    current = _results(a=1.0, b=2.0, c=6.0)
+    assert compare(baseline, current, 0.25) == []
+
+
+def test_missing_benchmarks_are_not_regressions():
+    baseline = _results(a=1.0, b=2.0)
+    current = _results(a=1.0)
+    assert compare(baseline, current, 0.25) == []
+
+
+def test_narrow_runs_are_compared_directly():
+    baseline = _results(a=1.0, b=2.0, c=3.0)
+    current = _results(c=6.0)
+    assert compare(baseline, current, 0.25, name_filter="c") == [("c", "1", 2.0)]
@@ -0,0 +1,40 @@
+from backend.tools.catalog_index import CatalogIndex, normalize_text
+from db.queries import INSERT_PRODUCT
+
+
+def _names(results):
+    return [p["product_name"] for p in results]
+
+
+def test_text_is_normalized_for_matching():
+    assert normalize_text("Ray-Ban!") == "ray ban"
+    assert normalize_text("שָׁלוֹם") == "שלומ"
+
+
+def test_search_matches_exactly_by_prefix_and_fuzzily(pool):
+    index = CatalogIndex()
+    with pool.connection() as conn:
+        index.refresh(conn)
+    assert _names(index.search("נורופן"))[0] == "נורופן"
+    assert _names(index.search("נורו"))[0] == "נורופן"
+    assert _names(index.search("נורופנ"))[0] == "נורופן"
+    assert _names(index.search("rayban"))[0] == "Ray-ban"
+    # Store names match all the products of the store, and hebrew prefixes are stripped.
+    assert "אספרסו" in _names(index.search("בארומה"))
+    assert index.search("zzzz") == []
+
+
+def test_index_follows_the_catalog_writes(pool):
+    index = CatalogIndex(pool.table_versions)
+    with pool.connection() as conn:
+        index.refresh(conn)
+    size = len(index)
+    with pool.writer(("products",)) as conn:
+        conn.cursor().execute(INSERT_PRODUCT, (None, "מטריה", "אביזרים", 1))
+    with pool.connection() as conn:
+        index.refresh_if_stale(conn)
+    assert len(index) == size + 1 and _names(index.search("מטריה")) == ["מטריה"]
+
+    product_id = index.search("מטריה")[0]["product_id"]
+    index.remove(product_id)
+    assert index.search("מטריה") == []
@@ -0,0 +1,57 @@
+import asyncio
+from types import SimpleNamespace
+
+from backend.db.sqlite_connection import get_db
+from backend.server.ad_provider import MockAdProvider
+from backend.server.lifespan import _poll_catalog_writes, _read_navigation_assets
+from backend.server.novisign_provider import NovisignProvider
+
+
+def _app(pool):
+    with pool.connection() as conn:
+        provider = NovisignProvider(MockAdProvider(conn), "qr.png", _read_navigation_assets(conn))
+    pool.poll_external_writes(())
+    return SimpleNamespace(state=SimpleNamespace(db_pool=pool, novisign_provider=provider,
+                                                 signage_catalog_stale=False))
+
+
+def test_external_writes_reload_the_navigation_assets(pool, db_path):
+    app = _app(pool)
+    other = get_db(db_path)
+    other.cursor().execute("UPDATE store_navigation SET route_path_d = 'M 0 0' "
+                           "WHERE store_id = 1;")
+    other.commit()
+    asyncio.run(_poll_catalog_writes(app))
+    assert app.state.novisign_provider.navigation_assets[1] == "M 0 0"
+    assert not app.state.signage_catalog_stale
+
+
+def test_failed_reloads_keep_the_previous_catalog_and_are_retried(pool, db_path):
+    app = _app(pool)
+    ad_provider = app.state.novisign_provider.ad_provider
+    catalog, window_size = ad_provider.catalog, ad_provider.window_size
+    ad_provider.window_size = 10 ** 6
+    other = get_db(db_path)
+    other.cursor().execute("UPDATE ads SET is_active = 0 WHERE ad_id = 1;")
+    other.commit()
+    asyncio.run(_poll_catalog_writes(app))
+    assert ad_provider.catalog is catalog
+    assert app.state.signage_catalog_stale
+
+    ad_provider.window_size = window_size
+    asyncio.run(_poll_catalog_writes(app))
+    assert ad_provider.catalog is not catalog
+    assert not app.state.signage_catalog_stale
+
+
+def test_pending_navigations_to_removed_assets_are_dropped():
+    class Ads:
+        def get_ad(self, screen):
+            return {"store": {}}
+
+    provider = NovisignProvider(Ads(), "qr.png", {1: "a", 2: "b"}, rotate_interval_s=60)
+    provider.set_data_for_navigation_asset(1)
+    provider.set_data_for_navigation_asset(2)
+    provider.set_navigation_assets({1: "a"})
+    assert provider.stats()["default"]["pending_navigations"] == 0
+    provider.tick(now=float("inf"))
@@ -0,0 +1,90 @@
+import asyncio
+
+from backend.model.chat_events_factory import ChatEventType, chat_event
+from backend.model.chat_manager import ChatManager
+from backend.model.message import Message
+from backend.model.response_provider import ResponseProvider
+
+
+class _Provider(ResponseProvider):
+    """
+    Answers every request with the given reply, once released, recording the requests.
+    """
+
+    def __init__(self, reply: str, released: bool = True):
+        self.reply = reply
+        self.requests = []
+        self.released = asyncio.Event()
+        if released:
+            self.released.set()
+
+    async def get_response(self, messages, instructions):
+        self.requests.append((list(messages), instructions))
+        await self.released.wait()
+        yield chat_event(ChatEventType.TEXT_DONE, "assistant", self.reply)
+
+
+def _format(tools_used, messages, previous_summary):
+    return messages, "summarize"
+
+
+async def _turn(manager: ChatManager, messages, text: str):
+    messages.append(Message("user", text))
+    async for event in manager.get_response(messages, "instructions"):
+        if event.type == ChatEventType.TEXT_DONE:
+            messages.append(Message("assistant", event.data["content"]))
+
+
+def test_turns_do_not_call_the_summary_provider():
+    async def run():
+        main, summary = _Provider("answer"), _Provider("summary")
+        manager = ChatManager(main, summary, _format, messages_limit=10, keep_count=2)
+        messages = []
+        await _turn(manager, messages, "hi")
+        return main, summary
+
+    main, summary = asyncio.run(run())
+    assert len(main.requests) == 1 and summary.requests == []
+
+
+def test_summaries_run_in_the_background_and_apply_on_a_later_turn():
+    async def run():
+        main, summary = _Provider("answer"), _Provider("summary", released=False)
+        manager = ChatManager(main, summary, _format, messages_limit=10, keep_count=2)
+        messages = []
+        # Past the soft watermark of 8 messages, the summary starts but does not block the turn.
+        for i in range(5):
+            await asyncio.wait_for(_turn(manager, messages, f"q{i}"), 1)
+        assert len(summary.requests) == 1 and manager.previous_summary is None
+        assert len(main.requests[-1][0]) == len(messages) - 1
+        summary.released.set()
+        await asyncio.sleep(0)
+        await _turn(manager, messages, "q5")
+        return main, manager
+
+    main, manager = asyncio.run(run())
+    assert manager.previous_summary == "summary"
+    sent, instructions = main.requests[-1]
+    assert len(sent) == 2 + 2 and "summary" in instructions
+
+
+def test_history_is_truncated_when_the_summaries_fail():
+    class _FailingProvider(_Provider):
+        async def get_response(self, messages, instructions):
+            raise RuntimeError("unavailable")
+            yield
+
+    async def run():
+        main = _Provider("answer")
+        manager = ChatManager(main, _FailingProvider(""), _format, messages_limit=4, keep_count=2)
+        messages = []
+        for i in range(6):
+            await _turn(manager, messages, f"q{i}")
+            await asyncio.sleep(0)
+        # Logs the failure of the last summary, as the next turn would.
+        await asyncio.sleep(0)
+        manager._apply_finished_summary()
+        return main
+
+    main = asyncio.run(run())
+    assert all(len(sent) <= 4 for sent, _ in main.requests)
@@ -0,0 +1,20 @@
+from backend.model.message import Message
+from backend.server.conversation_store import ConversationStore
+
+
+def test_sessions_are_kept_until_their_ttl():
+    store = ConversationStore(ttl_s=60)
+    assert not store.has_session("a")
+    store.append("a", Message("user", "hi"))
+    assert store.has_session("a")
+    store.evict_expired(now=float("inf"))
+    assert not store.has_session("a")
+
+
+def test_least_recently_used_sessions_are_evicted():
+    store = ConversationStore(max_sessions=2)
+    for session_id in ("a", "b", "c"):
+        store.append(session_id, Message("user", session_id))
+    assert not store.has_session("a")
+    assert [m.content for m in store.get("c")] == ["c"]
+    assert store.stats()["evicted"] == 1
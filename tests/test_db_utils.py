@@ -0,0 +1,41 @@
+import pytest
+
+from backend.db.db_utils import execute_sql_scripts, split_sql_script
+from backend.db.sqlite_connection import get_db
+
+
+def test_split_keeps_semicolons_inside_statements():
+    script = """
+    -- A comment; with a semicolon
+    CREATE TABLE t (a TEXT);
+    INSERT INTO t VALUES ('x;y');
+    /* Another; comment */
+    CREATE TRIGGER tr AFTER INSERT ON t BEGIN
+        UPDATE t SET a = 'z;' WHERE a = 'w';
+        DELETE FROM t WHERE a = 'v';
+    END;
+    ;
+    SELECT 1
+    """
+    statements = split_sql_script(script)
+    assert len(statements) == 4
+    assert statements[1] == "INSERT INTO t VALUES ('x;y');"
+    assert statements[2].startswith("/* Another; comment */") and statements[2].endswith("END;")
+    # The trailing statement is completed, even without its semicolon.
+    assert statements[3].split() == ["SELECT", "1", ";"]
+
+
+def test_split_drops_comment_only_statements():
+    assert split_sql_script("-- nothing;\n/* here; */;\n") == []
+
+
+def test_scripts_run_in_one_transaction(tmp_path):
+    conn = get_db(str(tmp_path / "t.db"))
+    execute_sql_scripts(conn, ["CREATE INDEX t_a ON t (a); CREATE TABLE t (a INTEGER);",
+                               "INSERT INTO t VALUES (1);"])
+    assert conn.cursor().execute("SELECT COUNT(*) AS n FROM t;").fetchone()["n"] == 1
+
+    with pytest.raises(Exception):
+        execute_sql_scripts(conn, ["INSERT INTO t VALUES (2);", "INSERT INTO missing VALUES (3);"])
+    assert conn.cursor().execute("SELECT COUNT(*) AS n FROM t;").fetchone()["n"] == 1
+    conn.close()
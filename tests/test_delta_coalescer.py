@@ -0,0 +1,70 @@
+import asyncio
+
+from backend.model.chat_events_factory import ChatEventType, chat_event
+from backend.server.delta_coalescer import coalesce_text_deltas
+
+
+async def _stream(items):
+    """
+    Yields the given events, each given as (delay in seconds, event type, text).
+    """
+    for delay, event_type, text in items:
+        if delay:
+            await asyncio.sleep(delay)
+        yield chat_event(event_type, "assistant", text)
+
+
+def _coalesce(items, **kwargs):
+    async def collect():
+        return [(e.type, e.data["content"])
+                async for e in coalesce_text_deltas(_stream(items), **kwargs)]
+    return asyncio.run(collect())
+
+
+DELTA, DONE = ChatEventType.TEXT_DELTA, ChatEventType.TEXT_DONE
+
+
+def test_deltas_are_merged_after_the_first_one():
+    items = [(0, DELTA, "a"), (0, DELTA, "b"), (0, DELTA, "c"), (0, DONE, "abc")]
+    assert _coalesce(items, window_s=1) == [(DELTA, "a"), (DELTA, "bc"), (DONE, "abc")]
+
+
+def test_buffers_are_flushed_when_the_window_elapses():
+    items = [(0, DELTA, "a"), (0, DELTA, "b"), (0.2, DELTA, "c"), (0, DONE, "abc")]
+    assert _coalesce(items, window_s=0.05) == [(DELTA, "a"), (DELTA, "b"), (DELTA, "c"),
+                                               (DONE, "abc")]
+
+
+def test_buffers_are_flushed_at_max_chars():
+    items = [(0, DELTA, "a")] + [(0, DELTA, "bb")] * 3
+    assert _coalesce(items, window_s=1, max_chars=4) == [(DELTA, "a"), (DELTA, "bbbb"),
+                                                         (DELTA, "bb")]
+
+
+def test_coalescing_can_be_disabled():
+    items = [(0, DELTA, "a"), (0, DELTA, "b"), (0, DONE, "ab")]
+    assert _coalesce(items, window_s=0) == [(t, text) for _, t, text in items]
+
+
+def test_cancelling_the_stream_closes_the_upstream_stream():
+    closed = []
+
+    async def upstream():
+        try:
+            yield chat_event(DELTA, "assistant", "a")
+            await asyncio.sleep(10)
+            yield chat_event(DELTA, "assistant", "b")
+        finally:
+            closed.append(True)
+
+    async def read():
+        stream = coalesce_text_deltas(upstream(), window_s=1)
+        assert (await stream.__anext__()).data["content"] == "a"
+        try:
+            await asyncio.wait_for(stream.__anext__(), 0.05)
+        except asyncio.TimeoutError:
+            pass
+        # Checked before asyncio.run finalizes the generators left open.
+        return list(closed)
+
+    assert asyncio.run(read()) == [True]
@@ -0,0 +1,38 @@
+import sqlite3
+
+import pytest
+
+from backend.db.dict_cursor import DictCursor
+from backend.db.sqlite_connection import get_db
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = get_db(str(tmp_path / "t.db"))
+    conn.cursor().execute("CREATE TABLE t (a INTEGER, b TEXT);")
+    conn.cursor().executemany("INSERT INTO t VALUES (?, ?);", [(i, str(i)) for i in range(5)])
+    yield conn
+    conn.close()
+
+
+QUERY = "SELECT a, b FROM t ORDER BY a;"
+
+
+def test_rows_are_dictionaries_by_default(conn):
+    cursor = conn.cursor().execute(QUERY)
+    assert cursor.fetchone() == {"a": 0, "b": "0"}
+    assert cursor.fetchmany(2) == [{"a": 1, "b": "1"}, {"a": 2, "b": "2"}]
+    assert list(cursor) == [{"a": 3, "b": "3"}, {"a": 4, "b": "4"}]
+    assert cursor.fetchone() is None
+    assert [r["a"] for r in conn.cursor().execute(QUERY).iter_dicts(batch_size=2)] == \
+        list(range(5))
+    # The column names follow each statement.
+    assert conn.cursor().execute("SELECT b AS c FROM t LIMIT 1;").fetchall() == [{"c": "0"}]
+
+
+def test_other_row_modes(conn):
+    assert conn.cursor("tuple").execute(QUERY).fetchone() == (0, "0")
+    row = conn.cursor("row").execute(QUERY).fetchall()[1]
+    assert isinstance(row, sqlite3.Row) and row["b"] == "1"
+    with pytest.raises(ValueError):
+        DictCursor(None, "list")
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from backend.model.chat_events_factory import ChatEvent, ChatEventType, done_event
+from backend.model.intent_router import IntentRouter
+from backend.model.message import Message
+from backend.model.tool_manager import ToolManager, AsyncToolManager
+from backend.tools.error_dict_factory import error_output_with_message
+from backend.tools.models import CallOutput
+
+
+class _RecordingProvider:
+    """
+    Provider standing for the model, recording the requests passed to it.
+    """
+
+    def __init__(self):
+        self.requests = []
+
+    async def warm_up(self):
+        pass
+
+    async def get_response(self, messages, instructions):
+        self.requests.append(messages[-1].content)
+        yield ChatEvent(ChatEventType.TEXT_DONE, {"role": "assistant", "content": "model"})
+        yield done_event()
+
+
+@pytest.fixture
+def make_router(pool):
+    managers = []
+
+    def make(tool_overrides=None):
+        manager = AsyncToolManager(ToolManager(pool, tool_overrides))
+        managers.append(manager)
+        return IntentRouter(_RecordingProvider(), manager, pool)
+
+    yield make
+    for manager in managers:
+        manager.close()
+
+
+def _ask(router: IntentRouter, text: str):
+    async def collect():
+        return [e async for e in router.get_response([Message("user", text)], "")]
+    events = asyncio.run(collect())
+    calls = [e.data["name"] for e in events if e.type == ChatEventType.TOOL_CALL_GENERATED]
+    reply = next((e.data["content"] for e in events if e.type == ChatEventType.TEXT_DONE), None)
+    return calls, reply
+
+
+def test_routes_a_navigation_to_a_known_store(make_router):
+    router = make_router()
+    calls, reply = _ask(router, "where is aroma?")
+    assert calls == ["set_navigation_for_store"]
+    assert "ארומה" in reply
+    assert router.response_provider.requests == []
+
+
+def test_routes_the_store_list(make_router):
+    calls, reply = _ask(make_router(), "which stores are in the mall")
+    assert calls == ["get_stores"]
+    assert "ארומה" in reply
+
+
+def test_passes_unknown_entities_to_the_model(make_router):
+    router = make_router()
+    calls, reply = _ask(router, "where is the cinema?")
+    assert calls == [] and reply == "model"
+    assert router.response_provider.requests == ["where is the cinema?"]
+
+
+def test_passes_navigations_to_stores_without_asset_to_the_model(make_router, pool):
+    router = make_router()
+    with pool.connection() as conn:
+        store_id = conn.cursor().execute(
+            "SELECT store_id FROM stores WHERE store_name = 'ארומה';").fetchone()["store_id"]
+    with pool.writer(("store_navigation",)) as conn:
+        conn.cursor().execute("DELETE FROM store_navigation WHERE store_id = ?;", (store_id,))
+    calls, reply = _ask(router, "where is aroma?")
+    assert calls == [] and reply == "model"
+
+
+def test_builds_the_product_reply_from_the_tool_output(make_router):
+    def search(args, conn):
+        return CallOutput("success", {"products": [
+            {"product_name": "אקומול", "category": "תרופות", "store_name": "חנות אחרת"},
+            {"product_name": "נורופן", "category": "כאבים", "store_name": "לא קשורה"}]})
+
+    calls, reply = _ask(make_router({"search_product": search}), "who sells אקומול")
+    assert calls == ["search_product"]
+    assert "חנות אחרת" in reply and "לא קשורה" not in reply
+
+
+def test_passes_failed_product_searches_to_the_model(make_router):
+    def search(args, conn):
+        return error_output_with_message("No matching products found.")
+
+    router = make_router({"search_product": search})
+    calls, reply = _ask(router, "who sells אקומול")
+    assert calls == [] and reply == "model"
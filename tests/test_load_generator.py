@@ -0,0 +1,40 @@
+from loadtest.load_generator import LoadStats, TurnResult, _parse_sse_buffer, _percentiles, report
+
+
+def test_sse_buffer_keeps_the_incomplete_tail():
+    messages = []
+    tail = _parse_sse_buffer('data: {"a": 1}\r\n\r\ndata: not json\n\ndata: {"b"', messages.append)
+    assert messages == [{"a": 1}]
+    assert tail == 'data: {"b"'
+    assert _parse_sse_buffer(tail + ': 2}\n\n', messages.append) == ""
+    assert messages == [{"a": 1}, {"b": 2}]
+
+
+def test_percentiles_are_in_milliseconds():
+    assert _percentiles([]) is None
+    summary = _percentiles([i / 1000 for i in range(1, 101)])
+    assert summary == {"mean": 50.5, "p50": 51.0, "p90": 91.0, "p95": 96.0, "p99": 100.0,
+                       "max": 100.0}
+
+
+def test_report_only_times_the_successful_turns():
+    stats = LoadStats(
+        turns=[TurnResult(first_placeholder_s=0.1, first_text_s=0.2, total_s=0.5, status=200),
+               TurnResult(first_text_s=0.3, total_s=0.4, status=200),
+               TurnResult(status=500, error="status: 500"), TurnResult(error="timeout")],
+        polls=[(0.01, True), (0.02, False)], poll_errors=2,
+        process_samples=[{"wall_s": 0, "cpu_s": 0, "rss_bytes": 2 ** 20},
+                         {"wall_s": 2, "cpu_s": 1, "rss_bytes": 3 * 2 ** 20}],
+        duration_s=2)
+    result = report(stats)
+    assert result["turns"] == 4 and result["turns_per_s"] == 2
+    assert result["turn_error_rate"] == 0.5
+    assert result["turn_errors"] == {"status": 1, "timeout": 1}
+    assert result["turns_without_placeholder"] == 1
+    assert result["turn_ms"]["max"] == 500.0
+    assert result["time_to_first_placeholder_ms"]["p50"] == 100.0
+    assert result["polls"] == 4 and result["poll_error_rate"] == 0.5
+    assert result["polls_changed"] == 1
+    assert result["server"] == {"cpu_percent": 50.0, "rss_start_mb": 1.0, "rss_peak_mb": 3.0,
+                                "rss_end_mb": 3.0}
+    assert report(LoadStats())["server"] is None
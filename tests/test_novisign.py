@@ -0,0 +1,56 @@
+import asyncio
+import json
+
+import pytest
+from starlette.requests import Request
+
+from backend.server.ad_provider import MockAdProvider
+from backend.server.main import app, etag_matches, novisign_payload
+from backend.server.novisign_provider import NovisignProvider
+
+
+@pytest.fixture
+def provider(pool):
+    with pool.connection() as conn:
+        ad_provider = MockAdProvider(conn)
+    return NovisignProvider(ad_provider, "qr.png", {1: "route-1"}, screens=("a", "b"))
+
+
+def _poll(provider: NovisignProvider, screen: str, etag=None):
+    headers = [] if etag is None else [(b"if-none-match", etag.encode())]
+    request = Request({"type": "http", "method": "GET", "path": "/novisign", "headers": headers,
+                       "query_string": b""})
+    app.state.novisign_provider = provider
+    try:
+        return asyncio.run(novisign_payload(request, screen))
+    finally:
+        del app.state.novisign_provider
+
+
+def test_etags_match_in_lists_and_weakly():
+    etag = '"abc-0-3"'
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'W/{etag}', etag)
+    assert etag_matches(f'"abc-0-2", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"abc-0-2"', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches("", etag)
+
+
+def test_navigations_stay_on_their_screen(provider):
+    provider.set_data_for_navigation_asset(1, "a")
+    assert provider.get_data("a")["store"]["mapurl"] == "route-1"
+    assert provider.get_data("b")["store"]["mapurl"] == "qr.png"
+    with pytest.raises(ValueError):
+        provider.check_screen("c")
+
+
+def test_polls_record_the_frame_latency(provider):
+    response = _poll(provider, "a")
+    assert response.status_code == 200
+    assert json.loads(response.body) == provider.get_data("a")
+    assert _poll(provider, "a", response.headers["etag"]).status_code == 304
+    stats = provider.stats()
+    assert stats["a"]["frames_delivered"] == 1 and stats["a"]["mean_latency_ms"] >= 0
+    assert stats["b"]["frames_delivered"] == 0
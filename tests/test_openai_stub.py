@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+import httpx
+
+from loadtest.openai_stub import StubConfig, create_app
+
+
+def _events(body: str):
+    return [json.loads(line[len("data: "):]) for line in body.splitlines()
+            if line.startswith("data: ")]
+
+
+async def _conversation(question: str):
+    app = create_app(StubConfig(latency_s=0, latency_jitter_s=0, tokens_per_s=0))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://stub") as client:
+        turns = []
+        body = {"model": "stub", "stream": True, "input": question}
+        while True:
+            response = await client.post("/v1/responses", json=body)
+            events = _events(response.text)
+            turns.append(events)
+            completed = events[-1]["response"]
+            calls = [item for item in completed["output"] if item["type"] == "function_call"]
+            if not calls:
+                break
+            body = {"model": "stub", "stream": True, "previous_response_id": completed["id"],
+                    "input": [{"type": "function_call_output", "call_id": call["call_id"],
+                               "output": "{}"} for call in calls]}
+        stats = (await client.get("/stats")).json()
+        model = (await client.get("/v1/models/stub")).json()
+    return turns, stats, model
+
+
+def test_tool_rounds_are_answered_before_the_reply():
+    turns, stats, model = asyncio.run(_conversation("I am looking for running shoes"))
+    assert len(turns) == 3
+    assert [e["item"]["name"] for e in turns[0] if e["type"] == "response.output_item.done"] \
+        == ["search_product"]
+    reply = "".join(e["delta"] for e in turns[-1] if e["type"] == "response.output_text.delta")
+    done = next(e for e in turns[-1] if e["type"] == "response.output_text.done")
+    assert reply == done["text"]
+    assert [e["sequence_number"] for e in turns[-1]] == list(range(1, len(turns[-1]) + 1))
+    assert stats["requests"] == stats["streams"] == 3
+    assert stats["full_requests"] == 1 and stats["chained_requests"] == 2
+    assert stats["tool_calls"] == 2 and stats["active_streams"] == 0
+    assert stats["bytes_received"] == stats["full_request_bytes"] + stats["chained_request_bytes"]
+    assert model["id"] == "stub"
+
+
+def test_unknown_previous_response_is_not_found():
+    async def post():
+        app = create_app(StubConfig(latency_s=0, latency_jitter_s=0, tokens_per_s=0))
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://stub") as client:
+            response = await client.post("/v1/responses", json={
+                "model": "stub", "previous_response_id": "resp_missing", "input": "hi"})
+            return response, (await client.get("/stats")).json()
+
+    response, stats = asyncio.run(post())
+    assert response.status_code == 404
+    assert response.json()["error"]["param"] == "previous_response_id"
+    assert stats["unknown_previous_responses"] == 1 and stats["stored_responses"] == 0
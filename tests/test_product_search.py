@@ -0,0 +1,40 @@
+import pytest
+
+from backend.db.catalog_loader import load_catalog
+from backend.tools.products import search_product, search_product_fts
+from backend.tools.schemas import ProductRequestArts
+from db.queries import INSERT_PRODUCT
+
+
+def _names(output):
+    return [p["product_name"] for p in output.data.get("products", [])]
+
+
+@pytest.mark.parametrize("search", [search_product, search_product_fts])
+def test_search_finds_products_by_name_category_and_store(pool, search):
+    with pool.connection() as conn:
+        assert "נורופן" in _names(search(ProductRequestArts(query="נורופן"), conn))
+        assert set(_names(search(ProductRequestArts(query="אופטיקה"), conn))) >= \
+            {"ACUVUE", "Ray-ban"}
+        assert "אספרסו" in _names(search(ProductRequestArts(query="ארומה"), conn))
+        assert search(ProductRequestArts(query="zzzz"), conn).status != "success"
+
+
+def test_fts_ranks_name_matches_first_and_falls_back_to_any_token(pool):
+    with pool.connection() as conn:
+        assert _names(search_product_fts(ProductRequestArts(query="נורו"), conn))[0] == "נורופן"
+        assert _names(search_product_fts(ProductRequestArts(query="נורופן zzzz"), conn)) == \
+            ["נורופן"]
+        assert search_product_fts(ProductRequestArts(query="!!"), conn).status != "success"
+
+
+def test_fts_follows_the_products_writes(pool):
+    with pool.writer(("products",)) as conn:
+        conn.cursor().execute(INSERT_PRODUCT, (None, "מטריה", "אביזרים", 1))
+        conn.cursor().execute("DELETE FROM products WHERE product_name = 'נורופן';")
+    with pool.writer(("products",)) as conn:
+        load_catalog(conn, {"products": [{"product_name": "כובע", "category": "אביזרים",
+                                          "store_id": 3}]})
+    with pool.connection() as conn:
+        for query, names in (("מטריה", ["מטריה"]), ("כובע", ["כובע"]), ("נורופן", [])):
+            assert _names(search_product_fts(ProductRequestArts(query=query), conn)) == names
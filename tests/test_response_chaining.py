@@ -0,0 +1,59 @@
+import asyncio
+
+import httpx
+from openai import NotFoundError
+
+from backend.model.message import Message
+from backend.model.openai.client import OpenAIToolResponseProvider
+
+
+class _Responses:
+    """
+    Records the requests, failing the chained ones if asked to.
+    """
+
+    def __init__(self, fail_chained: bool = False):
+        self.fail_chained = fail_chained
+        self.requests = []
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        if self.fail_chained and kwargs.get("previous_response_id"):
+            response = httpx.Response(404, request=httpx.Request("POST", "http://stub"))
+            raise NotFoundError("expired", response=response, body=None)
+        return "stream"
+
+
+def _provider(chain_responses: bool = True, fail_chained: bool = False):
+    provider = OpenAIToolResponseProvider(None, api_key="stub", model_name="stub",
+                                          chain_responses=chain_responses)
+    provider.client.responses = _Responses(fail_chained)
+    return provider
+
+
+def _conversation():
+    return [Message("user", "a"), Message("assistant", "b", response_id="r1"),
+            Message("user", "c"), Message("assistant", "d", response_id="r2"),
+            Message("user", "e")]
+
+
+def test_history_is_split_after_the_latest_stored_response():
+    messages = _conversation()
+    assert _provider()._split_chained_history(messages) == ("r2", messages[4:])
+    assert _provider(chain_responses=False)._split_chained_history(messages) == (None, messages)
+    assert _provider()._split_chained_history(messages[:1]) == (None, messages[:1])
+    # A conversation ending with a stored response has nothing new to chain.
+    assert _provider()._split_chained_history(messages[:4]) == (None, messages[:4])
+
+
+def test_expired_responses_fall_back_to_the_whole_history():
+    provider = _provider(fail_chained=True)
+    assert asyncio.run(provider._create_stream("i", ["new"], "r2", ["all", "new"])) == "stream"
+    requests = provider.client.responses.requests
+    assert [r["input"] for r in requests] == [["new"], ["all", "new"]]
+    assert requests[0]["previous_response_id"] == "r2"
+    assert "previous_response_id" not in requests[1]
+
+    provider = _provider()
+    asyncio.run(provider._create_stream("i", ["new"], "r2", ["all", "new"]))
+    assert [r["input"] for r in provider.client.responses.requests] == [["new"]]
@@ -0,0 +1,60 @@
+import sqlite3
+import threading
+import time
+from functools import partial
+
+import pytest
+
+from backend.db.sqlite_connection import get_db
+from backend.db.sqlite_pool import SQLitePool
+
+
+def test_connections_are_bounded_and_reused(pool):
+    first, second = pool.get_connection(), pool.get_connection()
+    with pytest.raises(TimeoutError):
+        pool.get_connection(timeout=0.01)
+    pool.return_connection(second)
+    assert pool.get_connection() is second
+    pool.return_connection(second)
+    pool.return_connection(first)
+    stats = pool.stats()
+    assert (stats.open, stats.in_use, stats.idle, stats.timeouts) == (2, 0, 2, 1)
+
+
+def test_waiters_get_the_returned_connection(pool):
+    held = [pool.get_connection(), pool.get_connection()]
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.get_connection(timeout=5)))
+    waiter.start()
+    while pool.stats().waited == 0:
+        time.sleep(0.001)
+    pool.return_connection(held[0])
+    waiter.join(5)
+    assert got == [held[0]]
+
+
+def test_readers_are_read_only_and_writes_are_rolled_back(pool):
+    with pool.connection() as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.cursor().execute("DELETE FROM stores;")
+    with pytest.raises(RuntimeError):
+        with pool.writer(("stores",)) as conn:
+            conn.cursor().execute("DELETE FROM coupons;")
+            raise RuntimeError("failed")
+    with pool.connection() as conn:
+        assert conn.cursor().execute("SELECT COUNT(*) AS n FROM coupons;").fetchone()["n"] > 0
+    assert pool.table_versions.snapshot(("stores",)) == (0,)
+
+
+def test_broken_idle_connections_are_replaced(db_path):
+    pool = SQLitePool(partial(get_db, db_path), partial(get_db, db_path, readonly=True),
+                      size=1, health_check_interval_s=0)
+    conn = pool.get_connection()
+    pool.return_connection(conn)
+    conn.close()
+    replaced = pool.get_connection()
+    assert replaced is not conn and pool.stats().discarded == 1
+    pool.return_connection(replaced)
+    pool.close()
+    with pytest.raises(RuntimeError):
+        pool.get_connection()
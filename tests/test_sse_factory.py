@@ -0,0 +1,21 @@
+import json
+
+from backend.server.sse_factory import tool_output_generated_event
+from backend.tools.error_dict_factory import error_output_with_message
+
+
+def _data(event: str):
+    assert event.startswith("data: ") and event.endswith("\n\n") and "\n" not in event[:-2]
+    return json.loads(event[len("data: "):])
+
+
+def test_tool_outputs_are_sent_as_objects():
+    result = {"status": "success", "data": {"stores": [{"store_name": "טבע נאות"}]}}
+    event = _data(tool_output_generated_event("get_stores",
+                                              json.dumps(result, ensure_ascii=False)))
+    assert event == {"type": "tool_output_generated",
+                     "data": {"name": "get_stores", "result": result}}
+
+    error = error_output_with_message("Tool get_stores failed.")
+    event = _data(tool_output_generated_event("get_stores", error.to_json()))
+    assert event["data"]["result"]["status"] == error.status
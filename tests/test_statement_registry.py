@@ -0,0 +1,36 @@
+import pytest
+
+import db.queries
+from backend.db.sqlite_connection import ConnectionProfile, get_db
+from backend.db.statement_registry import StatementRegistry
+
+
+def test_the_application_statements_compile(pool):
+    registry = StatementRegistry()
+    assert registry.register_module(db.queries) > 10
+    with pool.connection() as conn:
+        assert registry.compile(conn) == len(registry.statements)
+
+
+def test_schema_drift_lists_every_failing_statement(pool):
+    registry = StatementRegistry()
+    registry.register("OK", "SELECT store_id FROM stores WHERE store_id = ?;")
+    registry.register("MISSING_TABLE", "SELECT * FROM nothing;")
+    registry.register("MISSING_COLUMN", "UPDATE stores SET nothing = ?;")
+    with pool.connection() as conn:
+        with pytest.raises(RuntimeError) as error:
+            registry.compile(conn)
+    assert "2 SQL statements" in str(error.value)
+    assert "MISSING_TABLE" in str(error.value) and "MISSING_COLUMN" in str(error.value)
+
+
+def test_connection_profiles_are_applied_and_checked(tmp_path):
+    conn = get_db(str(tmp_path / "t.db"), profile=ConnectionProfile(cache_size_kib=1024,
+                                                                    busy_timeout_ms=1234))
+    cursor = conn.cursor()
+    assert cursor.execute("PRAGMA cache_size;").fetchone()["cache_size"] == -1024
+    assert cursor.execute("PRAGMA busy_timeout;").fetchone()["timeout"] == 1234
+    assert cursor.execute("PRAGMA journal_mode;").fetchone()["journal_mode"] == "wal"
+    conn.close()
+    with pytest.raises(ValueError):
+        ConnectionProfile(synchronous="NORMAL; DROP TABLE stores")
@@ -0,0 +1,59 @@
+import random
+
+from backend.model.message import Message
+from backend.model.token_ledger import TokenLedger
+
+
+class _CountingCounter:
+    """
+    Counts the words of a text, and the texts it was called with.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, text: str) -> int:
+        self.calls += 1
+        return len(text.split())
+
+
+def _messages(*sizes: int):
+    return [Message("user", " ".join(["w"] * size)) for size in sizes]
+
+
+def test_messages_are_counted_once():
+    counter = _CountingCounter()
+    ledger = TokenLedger(counter)
+    messages = _messages(1, 2, 3)
+    ledger.sync(messages)
+    messages += _messages(4)
+    ledger.sync(messages)
+    ledger.sync(messages)
+    assert counter.calls == 4
+    assert ledger.total() == 10 and ledger.total(2) == 7
+
+    # A different list is rebuilt from the counts memoized on its messages.
+    ledger.sync(messages[1:])
+    assert counter.calls == 4
+    assert ledger.total() == 9
+
+
+def test_keep_count_matches_a_linear_scan():
+    rng = random.Random(0)
+    for _ in range(200):
+        sizes = [rng.randint(0, 20) for _ in range(rng.randint(1, 15))]
+        ledger = TokenLedger(_CountingCounter())
+        ledger.sync(_messages(*sizes))
+        start = rng.randint(0, len(sizes) - 1)
+        budget = rng.randint(0, 100)
+        expected = 0
+        while expected < len(sizes) - start and \
+                sum(sizes[len(sizes) - expected - 1:]) <= budget:
+            expected += 1
+        assert ledger.keep_count(start, budget) == max(1, expected)
+
+
+def test_keep_count_always_keeps_the_latest_message():
+    ledger = TokenLedger(_CountingCounter())
+    ledger.sync(_messages(5, 50))
+    assert ledger.keep_count(0, 10) == 1
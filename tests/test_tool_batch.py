@@ -0,0 +1,44 @@
+import asyncio
+import time
+
+from backend.model.chat_events_factory import ChatEvent, ChatEventType
+from backend.model.generic_tool_client import run_tool_batch
+
+
+def _calls(*delays: float):
+    return [ChatEvent(ChatEventType.TOOL_CALL_GENERATED,
+                      {"name": "get_stores", "args": str(delay), "call_id": f"call-{i}"})
+            for i, delay in enumerate(delays)]
+
+
+async def _create_tool_output(name: str, args: str, call_id: str):
+    await asyncio.sleep(float(args))
+    return [{"type": "function_call", "call_id": call_id},
+            {"type": "function_call_output", "call_id": call_id, "output": args}]
+
+
+def _run(calls):
+    tool_outputs = []
+
+    async def collect():
+        return [event async for event in run_tool_batch(calls, _create_tool_output, "hi",
+                                                        tool_outputs)]
+    start = time.perf_counter()
+    events = asyncio.run(collect())
+    return events, tool_outputs, time.perf_counter() - start
+
+
+def test_tool_calls_run_concurrently():
+    events, _, elapsed = _run(_calls(0.2, 0.2, 0.2))
+    assert elapsed < 0.5
+    assert sum(e.type == ChatEventType.TOOL_OUTPUT_GENERATED for e in events) == 3
+
+
+def test_outputs_are_yielded_as_completed_and_kept_in_call_order():
+    events, tool_outputs, _ = _run(_calls(0.1, 0))
+    kinds = [e.type for e in events if e.type != ChatEventType.PLACEHOLDER]
+    assert kinds[:2] == [ChatEventType.TOOL_CALL_GENERATED] * 2
+    outputs = [e.data["call_id"] for e in events
+               if e.type == ChatEventType.TOOL_OUTPUT_GENERATED]
+    assert outputs == ["call-1", "call-0"]
+    assert [o["call_id"] for o in tool_outputs] == ["call-0", "call-0", "call-1", "call-1"]
@@ -0,0 +1,70 @@
+from backend.db.sqlite_connection import get_db
+from backend.db.table_versions import TableVersions
+from backend.model.tool_cache import ToolResultCache
+from db.queries import DISABLE_AD_BY_ID
+
+
+def _put(cache: ToolResultCache, key: str, tables=("ads",)):
+    cache.put(key, key.upper(), tables, cache.versions(tables))
+
+
+def test_results_are_cached_until_their_tables_are_written():
+    versions = TableVersions()
+    cache = ToolResultCache(versions)
+    _put(cache, "a")
+    _put(cache, "b", ("stores",))
+    assert cache.get("a") == "A"
+    versions.bump("ads")
+    assert cache.get("a") is None
+    assert cache.get("b") == "B"
+    assert cache.stats().invalidations == 1
+
+
+def test_results_computed_during_a_write_are_stale():
+    versions = TableVersions()
+    cache = ToolResultCache(versions)
+    before = cache.versions(("ads",))
+    versions.bump("ads")
+    cache.put("a", "A", ("ads",), before)
+    assert cache.get("a") is None
+
+
+def test_results_expire_and_are_evicted_in_lru_order():
+    cache = ToolResultCache(TableVersions(), max_entries=2)
+    for key in ("a", "b"):
+        _put(cache, key)
+    cache.get("a")
+    _put(cache, "c")
+    assert cache.get("b") is None and cache.get("a") == "A"
+    assert cache.stats().evictions == 1
+
+    expiring = ToolResultCache(TableVersions(), ttl_s=-1)
+    _put(expiring, "a")
+    assert expiring.get("a") is None
+
+
+def test_pool_writes_invalidate_the_results_of_their_tables(pool):
+    cache = ToolResultCache(pool.table_versions)
+    _put(cache, "ads")
+    _put(cache, "stores", ("stores",))
+    with pool.writer(("ads",)) as conn:
+        conn.cursor().execute(DISABLE_AD_BY_ID, (1,))
+    assert cache.get("ads") is None
+    assert cache.get("stores") == "STORES"
+
+
+def test_writes_of_other_processes_are_detected_by_the_poll(pool, db_path):
+    cache = ToolResultCache(pool.table_versions)
+    assert not pool.poll_external_writes(("ads",))
+    _put(cache, "ads")
+    with pool.writer(()) as conn:
+        conn.cursor().execute(DISABLE_AD_BY_ID, (2,))
+    assert not pool.poll_external_writes(("ads",))
+    assert cache.get("ads") == "ADS"
+
+    other = get_db(db_path)
+    other.cursor().execute(DISABLE_AD_BY_ID, (3,))
+    other.commit()
+    assert pool.poll_external_writes(("ads",))
+    assert cache.get("ads") is None
+    assert not pool.poll_external_writes(("ads",))
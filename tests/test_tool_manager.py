@@ -0,0 +1,66 @@
+import asyncio
+import json
+from contextlib import contextmanager
+
+from backend.model.tool_cache import ToolResultCache
+from backend.model.tool_manager import ToolManager, AsyncToolManager
+
+
+def _status(result: str) -> str:
+    return json.loads(result)["status"]
+
+
+def test_call_tool_json_returns_results(pool):
+    result = json.loads(ToolManager(pool).call_tool_json("get_store_by_id", '{"id": 1}'))
+    assert result["status"] == "success"
+
+
+def test_invalid_arguments_are_error_results(pool):
+    manager = ToolManager(pool)
+    assert _status(manager.call_tool_json("get_store_by_id", '{"id": "abc"}')) == "error"
+    assert _status(manager.call_tool_json("get_store_by_id", "[1]")) == "error"
+    assert _status(manager.call_tool_json("get_store_by_id", "{")) == "error"
+    assert _status(manager.call_tool_json("no_such_tool", "{}")) == "error"
+
+
+def test_tool_exceptions_are_error_results(pool):
+    def failing_tool(args, conn):
+        raise RuntimeError("boom")
+
+    manager = ToolManager(pool, tool_overrides={"get_stores": failing_tool})
+    assert _status(manager.call_tool_json("get_stores", "")) == "error"
+
+
+def test_pool_timeouts_are_error_results():
+    class ExhaustedPool:
+        @contextmanager
+        def connection(self):
+            raise TimeoutError("No database connection was freed.")
+            yield
+
+    assert _status(ToolManager(ExhaustedPool()).call_tool_json("get_stores", "")) == "error"
+
+
+def test_failed_calls_are_not_cached(pool):
+    calls = []
+
+    def flaky_tool(args, conn):
+        calls.append(args)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return ToolManager(pool).tool_funcs["get_stores"][0](args, conn)
+
+    manager = ToolManager(pool, tool_overrides={"get_stores": flaky_tool},
+                          cache=ToolResultCache(pool.table_versions))
+    assert _status(manager.call_tool_json("get_stores", "")) == "error"
+    assert _status(manager.call_tool_json("get_stores", "")) == "success"
+    assert len(calls) == 2
+
+
+def test_async_tool_manager_returns_errors_instead_of_raising(pool):
+    manager = AsyncToolManager(ToolManager(pool))
+    try:
+        result = asyncio.run(manager.call_tool_json("get_store_by_id", '{"id": "abc"}'))
+    finally:
+        manager.close()
+    assert _status(result) == "error"